@@ -4,6 +4,8 @@ import os
 import pandas as pd
 import datetime
 
+from storage import save_spot_rates, npz_path
+
 def round_values(value):
     if isinstance(value, (int, float)) and pd.notna(value):
         return round(value, 2)
@@ -102,6 +104,7 @@ def export_spot_rates_to_json():
     try:
         with open(json_file_path, 'w') as f:
             json.dump(json_data, f, indent=2)
+        save_spot_rates(json_data, npz_path(json_file_path))
         print(f"✅ Fichier JSON exporté avec succès : {json_file_path}")
     except Exception as e:
         print(f"Erreur d'écriture du fichier JSON : {e}")
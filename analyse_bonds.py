@@ -1,74 +1,79 @@
-import json
 import os
+
+import pandas as pd
+import QuantLib as ql
 import xlwings as xw
 
+from excel_writer import OpenpyxlWorkbookWriter, XlwingsWorkbookWriter
+from gilt_builders import get_spot_curve_store
+from instrument_universe import InstrumentUniverse
+from portfolio_analytics import PortfolioAnalytics, load_portfolios
+
 # Define file paths
 json_isin_path = os.path.join(os.path.dirname(__file__), "Portfolio", "isin.json")
 json_gilts_path = os.path.join(os.path.dirname(__file__), "temp", "gilts.json")
+json_spot_path = os.path.join(os.path.dirname(__file__), "SpotRates", "SpotRates.json")
 excel_file = os.path.join(os.path.dirname(__file__), "obligation.xlsm")
+headless_file = os.path.join(os.path.dirname(__file__), "Results", "portfolio_analysis.xlsx")
+
+# None: latest date of SpotRates.json
+EVAL_DATE = None
 
-# Load ISINs from the JSON file
-with open(json_isin_path, 'r') as f:
-    isin_data = json.load(f)
-    selected_isins = isin_data["isins"]
+HEADERS = ["Description", "ISIN", "Coupon (%)", "Maturity Date", "Issue Date", "Next Coupon Date", "Amount",
+           "Nominal", "Clean Price", "Yield (%)", "Modified Duration", "Convexity", "PV01"]
 
-# Load gilts data from gilts.json
-with open(json_gilts_path, 'r') as f:
-    gilts_data = json.load(f)
 
-# Filter gilts data for selected ISINs
-selected_gilts = [gilt for gilt in gilts_data if gilt["isin"] in selected_isins]
+def portfolio_rows(analytics, portfolios):
+    """Constituent rows followed by one aggregated row per portfolio, in HEADERS order."""
+    summary = analytics.analyse(portfolios)
+    rows = []
+    for (name, holdings), (_, metrics) in zip(portfolios.items(), summary.iterrows()):
+        constituents = analytics.constituents(holdings)
+        for _, gilt in constituents.iterrows():
+            rows.append([gilt['description'], gilt['isin'], gilt['coupon'], gilt['maturity_date'],
+                         gilt['issue_date'], gilt['next_coupon_date'], gilt['amount'],
+                         gilt['Nominal'], gilt['Clean Price'], None, None, None, None])
+        if not constituents.empty:
+            # Simple average coupon and total amount outstanding, as before the portfolio metrics
+            rows.append([f"{name} ({len(constituents)} Gilts)", "AGGREGATED",
+                         pd.to_numeric(constituents['coupon']).mean(),
+                         constituents['maturity_date'].max(), constituents['issue_date'].min(),
+                         constituents['next_coupon_date'].dropna().min() if constituents['next_coupon_date'].notna().any() else "N/A",
+                         constituents['amount'].sum(), metrics['Nominal'], metrics['Clean Price'], metrics['Yield'],
+                         metrics['Modified Duration'], metrics['Convexity'], metrics['PV01']])
+        if metrics['missing']:
+            print(f"⚠ {name} : {metrics['missing']} ISIN(s) absents de gilts.json")
+    return rows
 
-# Aggregate data for a single gilt profile
-if selected_gilts:
-    total_amount = sum(float(gilt["amount"]) for gilt in selected_gilts)
-    avg_coupon = sum(gilt["coupon"] for gilt in selected_gilts) / len(selected_gilts)
-    latest_maturity = max(gilt["maturity_date"] for gilt in selected_gilts)
-    earliest_issue = min(gilt["issue_date"] for gilt in selected_gilts)
-    next_coupon = min((gilt["next_coupon_date"] for gilt in selected_gilts if gilt["next_coupon_date"]), default="N/A")
-    description = f"Aggregated Portfolio ({len(selected_gilts)} Gilts)"
 
-    aggregated_gilt = {
-        "description": description,
-        "isin": "AGGREGATED",
-        "coupon": avg_coupon,
-        "maturity_date": latest_maturity,
-        "issue_date": earliest_issue,
-        "next_coupon_date": next_coupon,
-        "amount": total_amount
-    }
+def main():
+    portfolios = load_portfolios(json_isin_path)
+    gilts = InstrumentUniverse.load(json_gilts_path)
 
-# Connect to Excel workbook
-wb = xw.Book(excel_file)
-try:
-    ws = wb.sheets["PortfolioForAnalyseBonds"]
-except:
-    wb.sheets.add("PortfolioForAnalyseBonds")
-    ws = wb.sheets["PortfolioForAnalyseBonds"]
+    store = get_spot_curve_store(json_spot_path)
+    eval_date_str = EVAL_DATE or store.dates[-1]
+    eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+    ql.Settings.instance().evaluationDate = eval_date_ql
+    analytics = PortfolioAnalytics(gilts, eval_date_ql, store.curve_handle(eval_date_str))
+    rows = portfolio_rows(analytics, portfolios)
 
-# Clear existing content
-ws.range("A1:Z1000").clear()
+    # Connect to Excel workbook, or write a headless copy when Excel is not reachable
+    try:
+        wb = xw.Book(excel_file)
+        writer = XlwingsWorkbookWriter(wb)
+    except Exception as e:
+        print(f"⚠ Excel non accessible via xlwings : {str(e)}. Écriture dans {headless_file}")
+        wb = None
+        writer = OpenpyxlWorkbookWriter(headless_file)
 
-# Set up table headers
-headers = ["Description", "ISIN", "Coupon (%)", "Maturity Date", "Issue Date", "Next Coupon Date", "Amount"]
-ws.range("A1").value = headers
+    # Whole table in one block; reruns only rewrite the rows that changed
+    writer.write_table("PortfolioForAnalyseBonds", HEADERS, rows)
 
-# Populate table with individual gilts and aggregated gilt
-all_gilts = selected_gilts + [aggregated_gilt] if selected_gilts else []
-for i, gilt in enumerate(all_gilts, start=2):
-    ws.range(f"A{i}").value = gilt["description"]
-    ws.range(f"B{i}").value = gilt["isin"]
-    ws.range(f"C{i}").value = gilt["coupon"]
-    ws.range(f"D{i}").value = gilt["maturity_date"]
-    ws.range(f"E{i}").value = gilt["issue_date"]
-    ws.range(f"F{i}").value = gilt["next_coupon_date"]
-    ws.range(f"G{i}").value = gilt["amount"]
+    # Save and close
+    writer.save()
+    if wb is not None:
+        wb.app.quit()
 
-# Format the table
-ws.range("A1:G1").font.bold = True
-ws.range("A1:G1").interior.color = (173, 216, 230)  # Light blue background
-ws.range("A1:G" + str(len(all_gilts) + 1)).columns.autofit()
 
-# Save and close
-wb.save()
-wb.app.quit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import QuantLib as ql
+
+from calculate_bonds import price_bonds_batch
+from gilt_builders import get_spot_curve_store
+from instrument_universe import InstrumentUniverse
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+default_output_dir = os.path.join(base_dir, "Backtests")
+
+# Per-process state, filled once by the pool initializer
+_worker_state = {}
+
+
+def business_dates(start_date_str, end_date_str, calendar=None):
+    """UK business days between two ISO dates, inclusive, as ISO strings."""
+    calendar = calendar or ql.UnitedKingdom()
+    start = ql.DateParser.parseISO(start_date_str)
+    end = ql.DateParser.parseISO(end_date_str)
+    return [d.ISO() for d in calendar.businessDayList(start, end)]
+
+
+def split_dates(dates, n_chunks):
+    """Split dates into at most n_chunks contiguous blocks of similar size."""
+    n_chunks = max(1, min(n_chunks, len(dates)))
+    size, extra = divmod(len(dates), n_chunks)
+    chunks, start = [], 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(dates[start:end])
+        start = end
+    return chunks
+
+
+def _init_worker(gilts, spot_path):
+    _worker_state['gilts'] = gilts
+    _worker_state['spot_path'] = spot_path
+
+
+def price_dates(dates, gilts=None, spot_path=None):
+    """
+    Price the full gilt list on each evaluation date in `dates`.
+    Each call owns the QuantLib evaluation date of its process, so it is safe
+    to run one call per worker. Returns a DataFrame with one row per (date, bond).
+    """
+    gilts = gilts if gilts is not None else _worker_state['gilts']
+    store = get_spot_curve_store(spot_path or _worker_state['spot_path'])
+
+    frames = []
+    for eval_date_str in dates:
+        eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+        ql.Settings.instance().evaluationDate = eval_date_ql
+        try:
+            curve_handle = store.curve_handle(eval_date_str)
+        except ValueError as e:
+            logging.warning(f"Skipping {eval_date_str}: {e}")
+            continue
+
+        results = price_bonds_batch(gilts, eval_date_ql, curve_handle)
+        for r in results:
+            r.pop('Cashflows', None)
+            r.pop('coupon_schedule', None)
+        frame = pd.DataFrame(results)
+        frame.insert(0, 'evaluation_date', eval_date_str)
+        frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def run_backtest(start_date_str, end_date_str, gilts_path=default_gilts_path,
+                 spot_path=default_spot_path, max_workers=None):
+    """
+    Reprice the gilt universe on every UK business day of the range, spreading
+    contiguous blocks of dates across a process pool. Results are merged into
+    one columnar DataFrame sorted by evaluation date.
+    """
+    dates = business_dates(start_date_str, end_date_str)
+    if not dates:
+        return pd.DataFrame()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = split_dates(dates, max_workers)
+    logging.info(f"Backtest {start_date_str} → {end_date_str}: {len(dates)} dates on {len(chunks)} workers")
+
+    # Load (and rebuild if stale) the .npz copies once here, so workers only read them
+    gilts = InstrumentUniverse.load(gilts_path)
+    get_spot_curve_store(spot_path)
+
+    with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker,
+                             initargs=(gilts, spot_path)) as executor:
+        frames = list(executor.map(price_dates, chunks))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values(['evaluation_date', 'isin'], kind='stable',
+                                                            ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice the gilt universe over a range of evaluation dates")
+    parser.add_argument("start_date", help="First evaluation date (YYYY-MM-DD)")
+    parser.add_argument("end_date", help="Last evaluation date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--gilts", default=default_gilts_path)
+    parser.add_argument("--spot", default=default_spot_path)
+    args = parser.parse_args()
+
+    for d in (args.start_date, args.end_date):
+        datetime.strptime(d, '%Y-%m-%d')
+
+    results = run_backtest(args.start_date, args.end_date, args.gilts, args.spot, args.workers)
+
+    os.makedirs(default_output_dir, exist_ok=True)
+    output_path = os.path.join(default_output_dir, f"backtest_{args.start_date}_{args.end_date}.csv")
+    results.to_csv(output_path, index=False)
+    print(f"💾 {len(results)} lignes sauvegardées dans {output_path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,385 @@
+"""
+Benchmark suite for the pricing pipeline on synthetic gilt universes.
+
+Each stage is timed separately (curve build, single-bond pricing, universe
+pricing, single-bond and portfolio projections, Excel write-back through the
+headless writer, and the calculate_bonds.main and projection_portfolio.main
+scripts end to end in a scratch directory) over configurable universe sizes
+and numbers of dates. Every repeat first clears the process-global caches
+(bond schedules, parsed dates), so `seconds` is the best cold run and
+`warm_seconds` the best immediate rerun. Memory is reported twice: the peak
+Python heap (tracemalloc, which does not see QuantLib's C++ allocations) and
+the peak RSS of a fresh process running only the setup and one cold run of
+the stage, with its growth over the setup (POSIX only; --no-rss skips it).
+Every run is appended to Benchmarks/results.json so versions can be
+compared:
+
+    python benchmarks.py --bonds 10 100 1000 --dates 1 10 100
+    python benchmarks.py --compare
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import QuantLib as ql
+
+import calculate_bonds
+import date_tables
+import excel_writer
+import gilt_builders
+import projection
+import projection_portfolio
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_results_path = os.path.join(base_dir, "Benchmarks", "results.json")
+
+EVALUATION_DATE = date(2024, 6, 3)
+SPOT_YEARS = [y / 2 for y in range(1, 81)]
+
+# Stages whose first call prepares their input (untimed)
+STAGES_WITH_SETUP = ('excel_write',)
+
+
+def synthetic_gilts(n_bonds, evaluation_date=EVALUATION_DATE, seed=0):
+    """Conventional gilt records shaped like temp/gilts.json."""
+    rng = np.random.default_rng(seed)
+    gilts = []
+    for i in range(n_bonds):
+        issue = evaluation_date - timedelta(days=int(rng.integers(30, 20 * 365)))
+        maturity = evaluation_date + timedelta(days=int(rng.integers(180, 50 * 365)))
+        maturity = maturity.replace(day=int(rng.choice([7, 22])))
+        coupon = float(rng.integers(1, 48)) / 8
+        other_month = (maturity.month + 5) % 12 + 1
+        gilts.append({
+            'description': f"{coupon}% Synthetic Gilt {maturity.year}",
+            'isin': f"GB00SYN{i:05d}",
+            'coupon': coupon,
+            'maturity_date': maturity.isoformat(),
+            'issue_date': issue.isoformat(),
+            'coupon_schedule': sorted([maturity.strftime('%m-%d'), f"{other_month:02d}-{maturity.day:02d}"]),
+            'next_coupon_date': None,
+            'amount': str(float(rng.integers(5000, 40000))),
+        })
+    return gilts
+
+
+def synthetic_spot_rates(n_dates, evaluation_date=EVALUATION_DATE, seed=0):
+    """SpotRates.json-shaped dict over n_dates consecutive weekdays ending on evaluation_date."""
+    rng = np.random.default_rng(seed)
+    dates = []
+    d = evaluation_date
+    while len(dates) < n_dates:
+        if d.weekday() < 5:
+            dates.append(d)
+        d -= timedelta(days=1)
+
+    spot = {}
+    level = 4.0
+    for d in reversed(dates):
+        level += rng.normal(0, 0.03)
+        spot[d.isoformat()] = [
+            {'year': y, 'rate': round(level + 0.8 * np.exp(-y / 10), 4)} for y in SPOT_YEARS
+        ]
+    return spot
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=base_dir,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def clear_caches():
+    """Process-global caches that would make repeats of a stage warmer than its first run."""
+    gilt_builders.clear_schedule_cache()
+    date_tables.iso_serial.cache_clear()
+
+
+def measure(fn, repeat=1):
+    """
+    Best cold and best warm wall time over `repeat` rounds (caches cleared,
+    then an immediate rerun), and the peak Python heap of the first cold run.
+    """
+    cold, warm = [], []
+    peak = 0
+    for i in range(repeat):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            clear_caches()
+            if i == 0:
+                tracemalloc.start()
+            start = time.perf_counter()
+            fn()
+            cold.append(time.perf_counter() - start)
+            if i == 0:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            start = time.perf_counter()
+            fn()
+            warm.append(time.perf_counter() - start)
+    return min(cold), min(warm), peak
+
+
+def peak_rss():
+    """Peak resident set size of this process so far, in bytes."""
+    # On Linux ru_maxrss survives fork/exec, so a spawned worker would start at
+    # its parent's peak; VmHWM belongs to the process's own address space
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def _stage_rss(n_bonds, n_dates, work_dir, name):
+    # Runs in a fresh process, C++ allocations included. ru_maxrss only ever
+    # grows, so small stages that fit under the setup's peak show no growth.
+    fn = stage_functions(n_bonds, n_dates, work_dir)[name][0]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if name in STAGES_WITH_SETUP:
+            fn()
+        clear_caches()
+        before = peak_rss()
+        fn()
+    after = peak_rss()
+    # The kernel syncs RSS counters lazily, so tiny stages can read slightly negative
+    return after, max(after - before, 0)
+
+
+def measure_rss(n_bonds, n_dates, work_dir, name):
+    """
+    (peak RSS, growth over the setup) in bytes of a fresh process running one
+    cold run of a stage; (None, None) without getrusage.
+    """
+    if resource is None:
+        return None, None
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_stage_rss, n_bonds, n_dates, work_dir, name).result()
+
+
+def stage_functions(n_bonds, n_dates, work_dir):
+    """{stage: (function, units processed per call, unit name)} on a synthetic universe."""
+    gilts = synthetic_gilts(n_bonds)
+    spot = synthetic_spot_rates(n_dates)
+    spot_path = os.path.join(work_dir, f"SpotRates_{n_dates}.json")
+    with open(spot_path, 'w') as f:
+        json.dump(spot, f)
+    curve_dates = sorted(spot)
+    eval_date_str = curve_dates[-1]
+    eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+    ql.Settings.instance().evaluationDate = eval_date_ql
+
+    curve_handle = gilt_builders.build_spot_curve(eval_date_ql, spot[eval_date_str], verbose=False)
+    projection_dates = [(EVALUATION_DATE + timedelta(days=30 * i)).isoformat() for i in range(n_dates)]
+
+    def curve_build():
+        store = gilt_builders.SpotCurveStore(spot_path, max_curves=len(curve_dates))
+        for d in curve_dates:
+            store.curve_handle(d)
+
+    def single_bond():
+        calculate_bonds.price_and_analyze_bond_with_spot(gilts[0], eval_date_ql, curve_handle)
+
+    def universe():
+        calculate_bonds.price_bonds_batch(gilts, eval_date_ql, curve_handle)
+
+    def bond_projection():
+        g = gilts[0]
+        projection.project_bond_values({
+            'isin': g['isin'], 'description': g['description'],
+            'evolution_date': EVALUATION_DATE.isoformat(),
+            'maturity_date': g['maturity_date'], 'issue_date': g['issue_date'],
+            'yield': 4.5, 'coupon_rate': g['coupon'] / 100, 'frequency': 2, 'proj_frequency': 'mensuelle',
+        })
+
+    portfolio_bonds = [{
+        'isin': g['isin'], 'coupon': g['coupon'],
+        'maturity_date': g['maturity_date'], 'issue_date': g['issue_date'],
+        'clean_price': 100.0, 'dirty_price': 100.0, 'implied_yield': 0.045,
+    } for g in gilts]
+
+    def portfolio_projection():
+        projection_portfolio.PortfolioProjector(portfolio_bonds).project(projection_dates)
+
+    # calculate_bonds.main prices 2024-06-01, interpolated between the last two curve dates
+    main_dir = os.path.join(work_dir, f"main_{n_bonds}_{n_dates}")
+    for name, data in (("temp/gilts.json", gilts), ("SpotRates/SpotRates.json", synthetic_spot_rates(max(n_dates, 2)))):
+        os.makedirs(os.path.dirname(os.path.join(main_dir, name)), exist_ok=True)
+        with open(os.path.join(main_dir, name), 'w') as f:
+            json.dump(data, f)
+
+    def calculate_main():
+        # Without the previous run's result cache and warm-start yields, every call reprices everything
+        for name in ("Cache", "Yields"):
+            shutil.rmtree(os.path.join(main_dir, name), ignore_errors=True)
+        calculate_bonds.main(main_dir)
+
+    portfolio_dir = os.path.join(work_dir, f"portfolio_{n_bonds}_{n_dates}")
+    os.makedirs(os.path.join(portfolio_dir, "Data"), exist_ok=True)
+    with open(os.path.join(portfolio_dir, "Data", "data.json"), 'w') as f:
+        json.dump({'evolution_date': EVALUATION_DATE.isoformat(), 'proj_frequency': 'mensuelle',
+                   'bonds': portfolio_bonds}, f)
+    main_projection_dates = projection_portfolio.generate_projection_dates(EVALUATION_DATE.isoformat(), 'mensuelle')
+
+    def portfolio_main():
+        # projection_portfolio.main reads and writes Data/ under the working directory
+        with working_directory(portfolio_dir):
+            projection_portfolio.main()
+
+    excel_table = {}
+
+    def excel_write():
+        if not excel_table:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results = calculate_bonds.price_bonds_batch(gilts, eval_date_ql, curve_handle)
+            excel_table['headers'] = sorted({k for r in results for k in r if k != 'Cashflows'})
+            excel_table['rows'] = [[r.get(k) for k in excel_table['headers']] for r in results]
+        headers, rows = excel_table['headers'], excel_table['rows']
+        path = os.path.join(work_dir, f"results_{n_bonds}_{n_dates}.xlsx")
+        if os.path.exists(path):
+            os.remove(path)
+        # First write, then an unchanged rerun (diffed, nothing rewritten)
+        for _ in range(2):
+            writer = excel_writer.OpenpyxlWorkbookWriter(path)
+            writer.write_table("Results", headers, rows)
+            writer.save()
+
+    return {
+        'curve_build': (curve_build, len(curve_dates), 'curves'),
+        'single_bond_pricing': (single_bond, 1, 'bonds'),
+        'universe_pricing': (universe, n_bonds, 'bonds'),
+        'bond_projection': (bond_projection, 1, 'bonds'),
+        'portfolio_projection': (portfolio_projection, n_bonds * len(projection_dates), 'bond-dates'),
+        'excel_write': (excel_write, n_bonds, 'bonds'),
+        'calculate_bonds_main': (calculate_main, n_bonds, 'bonds'),
+        'portfolio_main': (portfolio_main, n_bonds * len(main_projection_dates), 'bond-dates'),
+    }
+
+
+def run_stages(n_bonds, n_dates, work_dir, repeat=1, stages=None, rss=True):
+    results = []
+    for name, (fn, units, unit_name) in stage_functions(n_bonds, n_dates, work_dir).items():
+        if stages and name not in stages:
+            continue
+        if name in STAGES_WITH_SETUP:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                fn()  # e.g. price the Excel table outside the timed runs
+        seconds, warm_seconds, heap = measure(fn, repeat)
+        rss_peak, rss_growth = measure_rss(n_bonds, n_dates, work_dir, name) if rss else (None, None)
+        results.append({
+            'stage': name, 'bonds': n_bonds, 'dates': n_dates,
+            'seconds': seconds, 'warm_seconds': warm_seconds,
+            'throughput': units / seconds if seconds > 0 else None, 'unit': f"{unit_name}/s",
+            'python_heap_mb': heap / 2**20,
+            'peak_rss_mb': rss_peak / 2**20 if rss_peak is not None else None,
+            'rss_growth_mb': rss_growth / 2**20 if rss_growth is not None else None,
+        })
+    return results
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(current, previous):
+    """Time ratio current/previous per (stage, bonds, dates); > 1 means slower."""
+    previous_index = {(r['stage'], r['bonds'], r['dates']): r for r in previous['results']}
+    rows = []
+    for r in current['results']:
+        p = previous_index.get((r['stage'], r['bonds'], r['dates']))
+        if p and p['seconds'] > 0:
+            rows.append((r['stage'], r['bonds'], r['dates'], p['seconds'], r['seconds'], r['seconds'] / p['seconds']))
+    return rows
+
+
+def print_results(results):
+    print(f"{'stage':<22}{'bonds':>7}{'dates':>7}{'cold s':>11}{'warm s':>11}{'throughput':>14}  {'unit':<14}"
+          f"{'heap MB':>9}{'RSS MB':>9}{'+RSS MB':>9}")
+    for r in results:
+        throughput = f"{r['throughput']:.1f}" if r['throughput'] else "-"
+        rss, growth = (f"{r[k]:.2f}" if r[k] is not None else "-" for k in ('peak_rss_mb', 'rss_growth_mb'))
+        print(f"{r['stage']:<22}{r['bonds']:>7}{r['dates']:>7}{r['seconds']:>11.4f}{r['warm_seconds']:>11.4f}"
+              f"{throughput:>14}  {r['unit']:<14}{r['python_heap_mb']:>9.2f}{rss:>9}{growth:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each pricing stage on synthetic gilt universes")
+    parser.add_argument("--bonds", type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument("--dates", type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs='+', default=None)
+    parser.add_argument("--output", default=default_results_path)
+    parser.add_argument("--no-save", action='store_true')
+    parser.add_argument("--no-rss", action='store_true', help="Skip the per-stage RSS runs in fresh processes")
+    parser.add_argument("--compare", action='store_true', help="Compare the last two stored runs")
+    args = parser.parse_args()
+
+    history = load_history(args.output)
+    if args.compare:
+        if len(history) < 2:
+            print("Pas assez de runs enregistrés pour comparer.")
+            return
+        previous, current = history[-2], history[-1]
+        print(f"Comparaison {previous['revision']} → {current['revision']}")
+        for stage, bonds, dates, before, after, ratio in compare(current, previous):
+            flag = "⚠️" if ratio > 1.1 else ""
+            print(f"{stage:<22}{bonds:>7}{dates:>7}{before:>11.4f}{after:>11.4f}{ratio:>8.2f}x {flag}")
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_bonds in args.bonds:
+            for n_dates in args.dates:
+                results.extend(run_stages(n_bonds, n_dates, work_dir, args.repeat, args.stages,
+                                          rss=not args.no_rss))
+    print_results(results)
+
+    if not args.no_save:
+        history.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'quantlib': ql.__version__,
+            'results': results,
+        })
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(history, f, indent=2)
+        print(f"💾 Résultats ajoutés à {args.output}")
+
+
+if __name__ == "__main__":
+    main()
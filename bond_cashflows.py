@@ -0,0 +1,242 @@
+import numpy as np
+import QuantLib as ql
+
+from date_tables import iso_to_serials
+
+
+def remaining_cashflows(bond, settlement_date, day_count):
+    """
+    Extract the cashflows still to be paid after settlement_date in one pass:
+    payment serials, amounts and the yield-discounting times QuantLib uses in
+    BondFunctions (stepwise year fractions measured on each coupon's
+    reference period). day_count must be the coupons' own day counter: whole
+    accrual periods reuse the coupon's accrualPeriod().
+    Returns (serials, times, amounts) as NumPy arrays.
+    """
+    remaining = []
+    # Cashflows are sorted by date: walk back from the redemption to the last paid flow
+    for cf in reversed(bond.cashflows()):
+        cf_date = cf.date()
+        if cf_date <= settlement_date:
+            break
+        remaining.append((cf, cf_date))
+
+    serials = []
+    times = []
+    amounts = []
+    t = 0.0
+    last_date = settlement_date
+
+    for cf, cf_date in reversed(remaining):
+        coupon = ql.as_coupon(cf)
+        if coupon is not None:
+            accrual_start = coupon.accrualStartDate()
+            if last_date == accrual_start and cf_date == coupon.accrualEndDate():
+                # Whole accrual period: its year fraction is the coupon's own
+                step = coupon.accrualPeriod()
+            else:
+                ref_start = coupon.referencePeriodStart()
+                ref_end = coupon.referencePeriodEnd()
+                step = (day_count.yearFraction(accrual_start, cf_date, ref_start, ref_end)
+                        - day_count.yearFraction(accrual_start, last_date, ref_start, ref_end))
+        else:
+            ref_start = cf_date - ql.Period(1, ql.Years) if last_date == settlement_date else last_date
+            step = day_count.yearFraction(last_date, cf_date, ref_start, cf_date)
+
+        t += step
+        last_date = cf_date
+        serials.append(cf_date.serialNumber())
+        times.append(t)
+        amounts.append(cf.amount())
+
+    return np.array(serials, dtype=np.int64), np.array(times, dtype=float), np.array(amounts, dtype=float)
+
+
+def yield_cashflows(bond, settlement_date, day_count):
+    """Yield-discounting (times, amounts) of remaining_cashflows."""
+    _, times, amounts = remaining_cashflows(bond, settlement_date, day_count)
+    return times, amounts
+
+
+def pad_cashflows(times_list, amounts_list):
+    """
+    Stack ragged per-bond cashflows into dense (bonds x max cashflows) arrays.
+    Padding slots have zero amount so they drop out of every sum.
+    """
+    n_bonds = len(times_list)
+    width = max((len(t) for t in times_list), default=0)
+    times = np.zeros((n_bonds, width))
+    amounts = np.zeros((n_bonds, width))
+    for i, (t, a) in enumerate(zip(times_list, amounts_list)):
+        times[i, :len(t)] = t
+        amounts[i, :len(a)] = a
+    return times, amounts
+
+
+class CashflowSchedule:
+    """
+    Full cashflow schedule of a fixed-rate bond as NumPy arrays.
+
+    Yield discounting in QuantLib measures time coupon period by coupon period
+    on each coupon's reference period. That is captured by a piecewise-linear
+    "clock" running over the accrual periods, so the time from any settlement
+    date to any cashflow is clock(payment date) - clock(settlement), which
+    makes pricing over many dates a single array operation.
+    """
+
+    def __init__(self, bond, day_count):
+        starts, ends, taus, coupon_amounts = [], [], [], []
+        pay_dates, amounts = [], []
+
+        for cf in bond.cashflows():
+            coupon = ql.as_coupon(cf)
+            if coupon is not None:
+                start, end = coupon.accrualStartDate(), coupon.accrualEndDate()
+                starts.append(start.serialNumber())
+                ends.append(end.serialNumber())
+                taus.append(day_count.yearFraction(start, end, coupon.referencePeriodStart(),
+                                                   coupon.referencePeriodEnd()))
+                coupon_amounts.append(cf.amount())
+            pay_dates.append(cf.date().serialNumber())
+            amounts.append(cf.amount())
+
+        self.accrual_starts = np.array(starts, dtype=np.int64)
+        self.accrual_ends = np.array(ends, dtype=np.int64)
+        self.accrual_times = np.array(taus, dtype=float)
+        self.coupon_amounts = np.array(coupon_amounts, dtype=float)
+        self.payment_dates = np.array(pay_dates, dtype=np.int64)
+        self.amounts = np.array(amounts, dtype=float)
+
+        self._clock_x = np.concatenate([self.accrual_starts[:1], self.accrual_ends]).astype(float)
+        self._clock_y = np.concatenate([[0.0], np.cumsum(self.accrual_times)])
+        self.payment_clock = self.clock(self.payment_dates)
+
+    @property
+    def maturity(self):
+        return int(self.payment_dates.max())
+
+    def clock(self, serials):
+        serials = np.asarray(serials, dtype=float)
+        clock = np.interp(serials, self._clock_x, self._clock_y)
+        # Before the first accrual start QuantLib keeps the first period's day rate
+        slope = self._clock_y[1] / (self._clock_x[1] - self._clock_x[0])
+        return np.where(serials < self._clock_x[0], (serials - self._clock_x[0]) * slope, clock)
+
+    def times(self, settlement_serials):
+        """(dates x cashflows) discounting times; cashflows paid on or before settlement are masked out."""
+        settlement_serials = np.asarray(settlement_serials)
+        t = self.payment_clock[None, :] - self.clock(settlement_serials)[:, None]
+        alive = self.payment_dates[None, :] > settlement_serials[:, None]
+        return t, alive
+
+    def accrued(self, settlement_serials):
+        settlement_serials = np.asarray(settlement_serials)
+        k = np.searchsorted(self.accrual_ends, settlement_serials, side='right')
+        in_range = k < len(self.accrual_ends)
+        k = np.minimum(k, len(self.accrual_ends) - 1)
+        elapsed = self.clock(settlement_serials) - (self._clock_y[k + 1] - self.accrual_times[k])
+        accrued = self.coupon_amounts[k] * elapsed / self.accrual_times[k]
+        started = settlement_serials > self.accrual_starts[k]
+        return np.where(in_range & started, accrued, 0.0)
+
+
+class CashflowMatrix:
+    """
+    Sparse (bonds x unique payment dates) cashflow matrix for a universe,
+    stored CSR-style: bond i owns entries offsets[i]:offsets[i+1] of
+    `columns` (index into `dates`) and `amounts`.
+
+    Pricing against a curve is one gather and row-sum of the discount vector
+    over the matrix; portfolio cashflows are a weighted column sum.
+    """
+
+    def __init__(self, isins, dates, offsets, columns, amounts):
+        self.isins = list(isins)
+        self.index = {isin: i for i, isin in enumerate(self.isins)}
+        self.dates = np.asarray(dates, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.amounts = np.asarray(amounts, dtype=float)
+        self.rows = np.repeat(np.arange(len(self.isins)), np.diff(self.offsets))
+
+    @classmethod
+    def from_flows(cls, isins, flows):
+        """flows: one (serials, amounts) pair per bond; same-date flows of a bond are summed."""
+        serials = [np.asarray(s, dtype=np.int64) for s, _ in flows]
+        dates = np.unique(np.concatenate(serials)) if serials else np.array([], dtype=np.int64)
+
+        offsets, columns, amounts = [0], [], []
+        for s, a in zip(serials, (np.asarray(a, dtype=float) for _, a in flows)):
+            cols, inverse = np.unique(np.searchsorted(dates, s), return_inverse=True)
+            columns.append(cols)
+            amounts.append(np.bincount(inverse, weights=a, minlength=len(cols)))
+            offsets.append(offsets[-1] + len(cols))
+
+        empty = np.array([], dtype=np.int64)
+        return cls(isins, dates, offsets,
+                   np.concatenate(columns) if columns else empty,
+                   np.concatenate(amounts) if amounts else empty.astype(float))
+
+    @classmethod
+    def from_bonds(cls, isins, bonds, settlement_date):
+        """Cashflows paid strictly after settlement_date of QuantLib bonds."""
+        flows = []
+        for bond in bonds:
+            paid = [(cf.date().serialNumber(), cf.amount()) for cf in bond.cashflows()
+                    if cf.date() > settlement_date]
+            flows.append(([s for s, _ in paid], [a for _, a in paid]))
+        return cls.from_flows(isins, flows)
+
+    @classmethod
+    def from_cashflows_by_isin(cls, cashflows_by_isin):
+        """From the {isin: [{'Date', 'Amount'}, ...]} layout of CashFlows/cashflows.json."""
+        flows = []
+        for cashflows in cashflows_by_isin.values():
+            serials = iso_to_serials([cf['Date'] for cf in cashflows])
+            flows.append((serials, [cf['Amount'] for cf in cashflows]))
+        return cls.from_flows(list(cashflows_by_isin), flows)
+
+    @property
+    def shape(self):
+        return len(self.isins), len(self.dates)
+
+    def to_dense(self):
+        dense = np.zeros(self.shape)
+        dense[self.rows, self.columns] = self.amounts
+        return dense
+
+    def subset(self, isins):
+        rows = [self.index[isin] for isin in isins]
+        flows = [(self.dates[self.columns[self.offsets[i]:self.offsets[i + 1]]],
+                  self.amounts[self.offsets[i]:self.offsets[i + 1]]) for i in rows]
+        return CashflowMatrix.from_flows(list(isins), flows)
+
+    def discount_vector(self, curve_handle):
+        return np.array([curve_handle.discount(ql.Date(int(d))) for d in self.dates])
+
+    def curve_times(self, curve_handle):
+        return np.array([curve_handle.timeFromReference(ql.Date(int(d))) for d in self.dates])
+
+    def price(self, discounts):
+        """Present value of each bond for one discount vector aligned on `dates`."""
+        return np.bincount(self.rows, weights=self.amounts * np.asarray(discounts)[self.columns],
+                           minlength=len(self.isins))
+
+    def price_many(self, discount_matrix):
+        """(curves x bonds) present values for a (curves x dates) discount matrix."""
+        discount_matrix = np.atleast_2d(discount_matrix)
+        values = np.zeros((discount_matrix.shape[0], len(self.isins)))
+        contributions = discount_matrix[:, self.columns] * self.amounts
+        non_empty = np.flatnonzero(np.diff(self.offsets) > 0)
+        if non_empty.size:
+            values[:, non_empty] = np.add.reduceat(contributions, self.offsets[non_empty], axis=1)
+        return values
+
+    def dirty_prices(self, curve_handle, settlement_date):
+        """Dirty prices per 100 at settlement, as DiscountingBondEngine computes them."""
+        return self.price(self.discount_vector(curve_handle)) / curve_handle.discount(settlement_date)
+
+    def aggregate(self, weights):
+        """Weighted cashflows per date (e.g. nominal holdings / 100 for a portfolio)."""
+        weights = np.asarray(weights, dtype=float)
+        return np.bincount(self.columns, weights=self.amounts * weights[self.rows], minlength=len(self.dates))
@@ -1,135 +1,82 @@
 import xlwings as xw
+import numpy as np
 import pandas as pd
 import QuantLib as ql
 from datetime import datetime
 import json
 from pathlib import Path
+import logging
 import os
 
-def interpolate_curve(spot_data, date_before_str, date_after_str, target_date_str):
-    fmt = "%Y-%m-%d"
-    date_before = datetime.strptime(date_before_str, fmt)
-    date_after = datetime.strptime(date_after_str, fmt)
-    date_target = datetime.strptime(target_date_str, fmt)
+from bond_cashflows import remaining_cashflows
+from curve_fitting import load_fitted_curve
+from date_tables import serials_to_iso, settlement_date as uk_settlement_date
+from excel_writer import XlwingsWorkbookWriter, OpenpyxlWorkbookWriter
+from gilt_builders import build_fixed_rate_bond, get_spot_curve_store, load_spot_curve_from_json, universe_bonds
+from instrument_universe import InstrumentUniverse
+from instrumentation import configure, count, finish_run, get_logger, stage
+from key_rates import key_rate_table
+from result_cache import ResultCache, bond_fingerprint, curve_fingerprint
+from sensitivities import DEFAULT_YIELD_SHIFTS, sensitivity_grid, sensitivity_columns
+from storage import save_cashflows, npz_path
+from yield_solver import solver_inputs, solve_yields, yield_metrics, load_warm_start, save_yields
 
-    alpha = (date_target - date_before).days / (date_after - date_before).days
+log = get_logger(__name__)
 
-    curve_before = {e["year"]: e["rate"] for e in spot_data[date_before_str]}
-    curve_after = {e["year"]: e["rate"] for e in spot_data[date_after_str]}
+YIELD_SHIFTS = DEFAULT_YIELD_SHIFTS
 
-    interpolated = []
-    for year in curve_before:
-        if year in curve_after:
-            rate = curve_before[year] + alpha * (curve_after[year] - curve_before[year])
-            interpolated.append({"year": year, "rate": rate})
-    return interpolated
+# "spot": ZeroCurve from SpotRates.json; "nss": curve fitted by curve_fitting.py for the same date
+CURVE_MODEL = "spot"
 
-def load_spot_curve_from_json(filename, eval_date_str):
-    print(f"📂 Chargement du fichier JSON: {filename}")
-    
-    eval_dt = ql.DateParser.parseISO(eval_date_str)
-    ql.Settings.instance().evaluationDate = eval_dt
-    print(f"📅 Date d'évaluation : {eval_dt}")
-
-    with open(filename, 'r') as f:
-        data = json.load(f)
-
-    spot_list = data.get(eval_date_str, [])
-    
-    if not spot_list:
-        print(f"⚠ Pas de données pour {eval_date_str}, tentative d'interpolation...")
-        all_dates = sorted(data.keys())
-        before = None
-        after = None
-
-        for d in all_dates:
-            if d < eval_date_str:
-                before = d
-            elif d > eval_date_str and before:
-                after = d
-                break
+# Without a reachable Excel, results go to this workbook (relative to the script; None to disable)
+HEADLESS_RESULTS_PATH = os.path.join("Results", "results.xlsx")
 
-        if not before or not after:
-            raise ValueError(f"❌ Impossible d'interpoler : il manque une date avant ou après {eval_date_str}")
+# Incremental reruns: results cached per (ISIN, date, curve); None to always reprice everything
+RESULT_CACHE_PATH = os.path.join("Cache", "results_cache.json")
 
-        print(f"🔄 Interpolation entre {before} et {after} pour {eval_date_str}")
-        spot_list = interpolate_curve(data, before, after, eval_date_str)
+# cashflows.npz is always written; the JSON copy is kept for Excel/frontend consumers
+EXPORT_CASHFLOWS_JSON = True
 
-    print(f"📊 Données de spot obtenues : {len(spot_list)} entrées")
-    for e in spot_list:
-        print(f"   - Year: {e['year']} | Rate: {e['rate']}")
+# Detailed logging ("DEBUG", "INFO"; None = warnings only, or GILTS_LOG_LEVEL) and
+# per-run trace files (directory relative to the script, e.g. "Profiles"; None = off, or
+# GILTS_PROFILE_DIR), see instrumentation.py
+LOG_LEVEL = None
+PROFILE_DIR = None
 
-    calendar = ql.UnitedKingdom()
-    day_count = ql.ActualActual(ql.ActualActual.ISMA)
-    dates = [eval_dt]
-    rates = [spot_list[0]["rate"] / 100.0]
+def universe_isins(bond_data_list):
+    """ISINs of an InstrumentUniverse or of a list of gilts.json records."""
+    if isinstance(bond_data_list, InstrumentUniverse):
+        return bond_data_list.isins.tolist()
+    return [bond_data.get('isin') for bond_data in bond_data_list]
 
-    for entry in spot_list:
-        try:
-            years = float(entry["year"])
-            rate = entry["rate"] / 100
-
-            if years <= 0:
-                print(f"⚠ Ignoré: maturité non positive ({years} ans)")
-                continue
-
-            days = int(round(years * 365))
-            date = calendar.advance(eval_dt, ql.Period(days, ql.Days))
-
-            if date <= eval_dt:
-                print(f"⚠ Ignoré: Date {date} antérieure ou égale à {eval_dt}")
-                continue
-
-            print(f"✅ Ajout : {date} | {rate:.4%} | Maturité: {years} ans")
-            dates.append(date)
-            rates.append(rate)
-
-        except (KeyError, ValueError, TypeError) as e:
-            print(f"⚠ Erreur dans une entrée de spot rate: {entry} | Exception: {e}")
-
-    print(f"📆 Total dates valides : {len(dates)}")
-    print(f"📈 Total rates valides : {len(rates)}")
-
-    if len(dates) < 2:
-        raise ValueError("❌ Pas assez de dates valides pour construire la courbe de taux")
-
-    try:
-        spot_curve = ql.ZeroCurve(dates, rates, day_count, calendar)
-        print("✅ Courbe ZeroCurve construite avec succès")
-    except Exception as e:
-        print("❌ Erreur lors de la création de la ZeroCurve:", e)
-        raise
-
-    return ql.YieldTermStructureHandle(spot_curve)
-
-def price_and_analyze_bond_with_spot(bond_data, eval_date_ql, spot_curve_handle):
-    calendar = ql.UnitedKingdom()
-    day_count = ql.ActualActual(ql.ActualActual.ISMA)
-    
-    issue_date = pd.to_datetime(bond_data['issue_date'], format='%Y-%m-%d', errors='coerce')
-    maturity_date = pd.to_datetime(bond_data['maturity_date'], format='%Y-%m-%d', errors='coerce')
-    
-    if pd.isna(issue_date) or pd.isna(maturity_date):
-        return {**bond_data, 'Error': "Format de date invalide dans Issue Date ou Maturity"}
+def bond_cashflow_list(bond, settlement_date):
+    cashflows = []
+    for cf in bond.cashflows():
+        cf_date = cf.date()
+        if cf_date > settlement_date:
+            cashflows.append({
+                'Date': cf_date.ISO(),
+                'Amount': round(cf.amount(), 6)
+            })
+    return cashflows
 
-    issue_date_ql = ql.Date(issue_date.day, issue_date.month, issue_date.year)
-    maturity_date_ql = ql.Date(maturity_date.day, maturity_date.month, maturity_date.year)
+def cashflow_records(serials, amounts):
+    """bond_cashflow_list from extracted payment serials and amounts."""
+    return [{'Date': d, 'Amount': round(a, 6)} for d, a in zip(serials_to_iso(serials).tolist(), amounts.tolist())]
 
-    print(f"🔍 Debug - Eval Date: {eval_date_ql}, Maturity Date: {maturity_date_ql}")
-    if eval_date_ql >= maturity_date_ql:
-        return {**bond_data, 'Error': "Bond has reached maturity"}
+def price_and_analyze_bond_with_spot(bond_data, eval_date_ql, spot_curve_handle,
+                                     calendar=None, day_count=None, engine=None, settlement_date=None):
+    calendar = calendar or ql.UnitedKingdom()
+    day_count = day_count or ql.ActualActual(ql.ActualActual.ISMA)
 
-    schedule = ql.Schedule(
-        issue_date_ql, maturity_date_ql, ql.Period(ql.Semiannual), calendar,
-        ql.Following, ql.Following, ql.DateGeneration.Backward, False
-    )
-    
-    coupon_rate = bond_data['coupon'] / 100 if bond_data['coupon'] is not None else 0.0
-    bond = ql.FixedRateBond(1, 100, schedule, [coupon_rate], day_count)
+    bond, error = build_fixed_rate_bond(bond_data, eval_date_ql, calendar, day_count)
+    if error:
+        return {**bond_data, 'Error': error}
 
-    settlement_date = calendar.advance(eval_date_ql, 1, ql.Days)
+    if settlement_date is None:
+        settlement_date = uk_settlement_date(eval_date_ql)
 
-    bond.setPricingEngine(ql.DiscountingBondEngine(spot_curve_handle))
+    bond.setPricingEngine(engine or ql.DiscountingBondEngine(spot_curve_handle))
 
     clean_price = bond.cleanPrice()
     dirty_price = bond.dirtyPrice()
@@ -146,30 +93,6 @@ def price_and_analyze_bond_with_spot(bond_data, eval_date_ql, spot_curve_handle)
 
     pv01 = bond.cleanPrice(implied_yield - 0.0001, day_count, ql.Compounded, ql.Semiannual, settlement_date) - clean_price
 
-    # Expanded sensitivity analysis (excluding Trend)
-    P0 = clean_price
-    D = modified_duration
-    C = convexity
-    yield_shifts = [-0.02, -0.015, -0.01, -0.005, 0.0, 0.005, 0.01, 0.015, 0.02]
-    sensitivities = {}
-    for dy in yield_shifts:
-        deltaP = -D * dy * P0 + 0.5 * C * (dy**2) * P0
-        P_new = P0 + deltaP
-        sensitivities[f"{dy*100:+.1f}%"] = {
-            "Price Approx": round(P_new, 6),
-            "ΔP": round(deltaP, 6),
-            "ΔP (%)": round(deltaP / P0 * 100, 4)
-        }
-
-    cashflows = []
-    for cf in bond.cashflows():
-        cf_date = cf.date()
-        if cf_date > settlement_date:
-            cashflows.append({
-                'Date': cf_date.ISO(),
-                'Amount': round(cf.amount(), 6)
-            })
-
     return {
         **bond_data,
         'Clean Price Calculated': clean_price,
@@ -178,25 +101,122 @@ def price_and_analyze_bond_with_spot(bond_data, eval_date_ql, spot_curve_handle)
         'Modified Duration Calculated': modified_duration,
         'Convexity Calculated': convexity,
         'PV01 Calculated': pv01,
-        'Sensitivities (Approx)': sensitivities,
         'Implied Yield': implied_yield * 100,
-        'Cashflows': cashflows
+        'Cashflows': bond_cashflow_list(bond, settlement_date)
     }
 
-def create_fresh_results_sheet(wb):
-    try:
-        for sheet_name in ["Results"]:
-            if sheet_name in [sheet.name for sheet in wb.sheets]:
-                wb.sheets[sheet_name].delete()
-                print(f"🗑 Existing '{sheet_name}' sheet deleted.")
-        results_sht = wb.sheets.add(name="Results", after=wb.sheets[-1])
-        print("📄 New 'Results' sheet created.")
-        return results_sht
-    except Exception as e:
-        print(f"❌ Error managing sheets: {str(e)}")
-        raise
+def price_bonds_batch(bond_data_list, eval_date_ql, spot_curve_handle, initial_yields=None):
+    """
+    Price a whole gilt universe (InstrumentUniverse or list of gilts.json
+    records) against one curve handle.
+    Calendar, day counter, settlement date and pricing engine are built once
+    and shared by every bond; schedules come from the schedule cache.
+    Implied yields are solved for all bonds at once with vectorized Newton
+    steps, warm-started from initial_yields ({isin: decimal yield}) when given,
+    and duration, convexity and PV01 follow from the same cashflow matrix.
+    Each bond's remaining cashflows are extracted once and feed both the
+    solver and the 'Cashflows' records.
+    """
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    engine = ql.DiscountingBondEngine(spot_curve_handle)
+    settlement_date = uk_settlement_date(eval_date_ql)
+
+    results = [None] * len(bond_data_list)
+    priced = []
+    with stage("pricing", bonds=len(bond_data_list)):
+        if isinstance(bond_data_list, InstrumentUniverse):
+            built = universe_bonds(bond_data_list, eval_date_ql, calendar, day_count)
+        else:
+            built = (build_fixed_rate_bond(bond_data, eval_date_ql, calendar, day_count)
+                     for bond_data in bond_data_list)
+        for i, (bond, error) in enumerate(built):
+            if error:
+                results[i] = {**bond_data_list[i], 'Error': error}
+                log.debug("%s non valorisée : %s", results[i].get('isin'), error)
+                continue
+            bond.setPricingEngine(engine)
+            priced.append((i, bond))
+        count("bonds_skipped", len(bond_data_list) - len(priced))
+
+        if not priced:
+            return results
+
+        bonds = [bond for _, bond in priced]
+        clean_prices = np.array([bond.cleanPrice() for bond in bonds])
+        dirty_prices = np.array([bond.dirtyPrice() for bond in bonds])
+        extracted = [remaining_cashflows(bond, settlement_date, day_count) for bond in bonds]
+        times, amounts, accrued = solver_inputs(bonds, settlement_date, day_count, extracted)
+    count("bonds_priced", len(priced))
+
+    warm_start = None
+    if initial_yields:
+        isins = universe_isins(bond_data_list)
+        warm_start = [initial_yields.get(isins[i], np.nan) for i, _ in priced]
+    with stage("solve", bonds=len(priced)):
+        yields, iterations = solve_yields(times, amounts, accrued, clean_prices, warm_start)
+        metrics = yield_metrics(times, amounts, accrued, yields)
+    count("solver_iterations", int(iterations))
+
+    for k, (i, bond) in enumerate(priced):
+        if not np.isfinite(yields[k]):
+            # Repli sur le solveur scalaire de QuantLib
+            count("scalar_fallbacks")
+            results[i] = price_and_analyze_bond_with_spot(
+                bond_data_list[i], eval_date_ql, spot_curve_handle,
+                calendar=calendar, day_count=day_count, engine=engine, settlement_date=settlement_date
+            )
+            continue
+        results[i] = {
+            **bond_data_list[i],
+            'Clean Price Calculated': float(clean_prices[k]),
+            'Dirty Price Calculated': float(dirty_prices[k]),
+            'Accrued Interest Calculated': float(accrued[k]),
+            'Modified Duration Calculated': float(metrics['modified_duration'][k]),
+            'Convexity Calculated': float(metrics['convexity'][k]),
+            'PV01 Calculated': float(metrics['pv01'][k]),
+            'Implied Yield': float(yields[k]) * 100,
+            'Cashflows': cashflow_records(extracted[k][0], extracted[k][2])
+        }
+    return results
+
+def price_bonds_incremental(bond_data_list, eval_date_ql, spot_curve_handle, cache, initial_yields=None):
+    """
+    price_bonds_batch through a ResultCache: only bonds whose record, curve or
+    evaluation date changed since they were cached are repriced.
+    Returns (results, repriced ISINs, signature of the whole run's inputs).
+    """
+    eval_date_str = eval_date_ql.ISO()
+    curve_hash = curve_fingerprint(spot_curve_handle)
+    bond_hashes = [bond_fingerprint(bond_data) for bond_data in bond_data_list]
+    isins = universe_isins(bond_data_list)
+
+    results = [None] * len(bond_data_list)
+    stale = []
+    for i, (isin, bond_hash) in enumerate(zip(isins, bond_hashes)):
+        results[i] = cache.get(isin, eval_date_str, curve_hash, bond_hash)
+        if results[i] is None:
+            stale.append(i)
+
+    count("cache_hits", len(bond_data_list) - len(stale))
+    if stale:
+        if isinstance(bond_data_list, InstrumentUniverse):
+            stale_bonds = bond_data_list.take(stale)
+        else:
+            stale_bonds = [bond_data_list[i] for i in stale]
+        repriced = price_bonds_batch(stale_bonds, eval_date_ql, spot_curve_handle, initial_yields)
+        for i, result in zip(stale, repriced):
+            results[i] = result
+            cache.put(isins[i], eval_date_str, curve_hash, bond_hashes[i], result)
+
+    signature = bond_fingerprint([eval_date_str, curve_hash] + bond_hashes)
+    return results, [isins[i] for i in stale], signature
+
+def main(script_dir=None):
+    """Price temp/gilts.json under script_dir (default: this script's directory) and write the outputs there."""
+    script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
+    configure(LOG_LEVEL, PROFILE_DIR and os.path.join(script_dir, PROFILE_DIR))
 
-def main():
     # Set evaluation date to July 1, 2024
     eval_date = datetime(2024, 6, 1)
     eval_date_str = eval_date.strftime('%Y-%m-%d')
@@ -205,50 +225,109 @@ def main():
     print(f"📅 Date d'évaluation : {eval_date_str}")
 
     # Load spot curve from SpotRates/SpotRates.json
-    script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, "SpotRates", "SpotRates.json")
     try:
+        with stage("ingest"):
+            get_spot_curve_store(json_path)
         spot_curve_handle = load_spot_curve_from_json(json_path, eval_date_str)
     except Exception as e:
         print(f"❌ Erreur lors du chargement de la courbe de taux spot : {str(e)}")
         return
 
+    pricing_curve_handle = spot_curve_handle
+    if CURVE_MODEL == "nss":
+        try:
+            pricing_curve_handle = load_fitted_curve(
+                os.path.join(script_dir, "FittedCurves", "nss_params.json"), eval_date_str)
+            print("📈 Pricing sur la courbe NSS ajustée")
+        except Exception as e:
+            print(f"❌ Erreur lors du chargement de la courbe NSS : {str(e)}")
+            return
+
     # Load JSON data
     json_path_gilts = os.path.join(script_dir, "temp", "gilts.json")
     json_file = Path(json_path_gilts)
-    if not json_file.exists():
+    if not json_file.exists() and not Path(npz_path(json_path_gilts)).exists():
         print(f"❌ Fichier {json_file} non trouvé.")
         return
 
-    with open(json_file, 'r', encoding='utf-8') as f:
-        bond_data_list = json.load(f)
+    # Rendements de la veille pour démarrer le solveur
+    yields_path = os.path.join(script_dir, "Yields", "implied_yields.json")
+    with stage("ingest"):
+        bond_data_list = InstrumentUniverse.load(json_path_gilts)
+        isins = bond_data_list.isins.tolist()
+        warm_start = load_warm_start(yields_path, eval_date_str, isins)
+    count("bonds", len(bond_data_list))
 
     results = []
     cashflows_by_isin = {}
-    for bond_data in bond_data_list:
-        bond_metrics = price_and_analyze_bond_with_spot(bond_data, eval_date_ql, spot_curve_handle)
-        print(f"📊 Résultats pour {bond_data.get('description', 'Unknown')}: {bond_metrics}")
-        
+    initial_yields = dict(zip(isins, warm_start)) if warm_start is not None else None
+
+    cache = None
+    if RESULT_CACHE_PATH:
+        cache = ResultCache(os.path.join(script_dir, RESULT_CACHE_PATH))
+        all_metrics, repriced, run_signature = price_bonds_incremental(
+            bond_data_list, eval_date_ql, pricing_curve_handle, cache, initial_yields)
+        print(f"♻️ {len(bond_data_list) - len(repriced)} résultats repris du cache, {len(repriced)} recalculés")
+    else:
+        all_metrics = price_bonds_batch(bond_data_list, eval_date_ql, pricing_curve_handle, initial_yields)
+        run_signature = None
+    save_yields(yields_path, eval_date_str, isins,
+                [m.get('Implied Yield', np.nan) / 100 for m in all_metrics])
+    for isin, description, bond_metrics in zip(isins, bond_data_list.descriptions.tolist(), all_metrics):
         cashflows = bond_metrics.pop('Cashflows', [])
         results.append(bond_metrics)
 
         if not cashflows:
-            print(f"⚠ Aucun cashflow généré pour {bond_data.get('description', 'Unknown')}")
+            log.debug("Aucun cashflow généré pour %s", description)
         else:
-            print(f"💰 {len(cashflows)} cashflows générés pour {bond_data.get('description', 'Unknown')}")
-            isin = bond_data.get('isin', 'Unknown')
             cashflows_by_isin[isin] = cashflows
+    missing_cashflows = len(results) - len(cashflows_by_isin)
+    if missing_cashflows:
+        print(f"⚠ Aucun cashflow généré pour {missing_cashflows} gilt(s)")
 
     # Save cashflows to JSON file
     cashflows_dir = os.path.join(script_dir, "CashFlows")
     os.makedirs(cashflows_dir, exist_ok=True)  # Create CashFlows directory if it doesn't exist
     cashflows_json_path = os.path.join(cashflows_dir, "cashflows.json")
+    key_rates_path = os.path.join(script_dir, "KeyRates", f"key_rates_{eval_date_str}.csv")
+    outputs_current = (
+        cache is not None and cache.meta.get('outputs') == run_signature
+        and os.path.exists(npz_path(cashflows_json_path)) and os.path.exists(key_rates_path)
+    )
+    if outputs_current:
+        print("♻️ Entrées inchangées : cashflows et key rates non réécrits")
     try:
-        with open(cashflows_json_path, 'w', encoding='utf-8') as f:
-            json.dump(cashflows_by_isin, f, indent=4)
-        print(f"💾 Cashflows saved to {cashflows_json_path}")
+        if not outputs_current:
+            with stage("write_back", output="cashflows"):
+                if EXPORT_CASHFLOWS_JSON:
+                    with open(cashflows_json_path, 'w', encoding='utf-8') as f:
+                        json.dump(cashflows_by_isin, f, indent=4)
+                    print(f"💾 Cashflows saved to {cashflows_json_path}")
+                # The .npz goes last: readers only trust it when it is not older than the JSON
+                save_cashflows(cashflows_by_isin, npz_path(cashflows_json_path))
+                print(f"💾 Cashflows saved to {npz_path(cashflows_json_path)}")
     except Exception as e:
         print(f"❌ Error saving cashflows to JSON: {str(e)}")
+        run_signature = None  # force a rewrite on the next run
+
+    # Key-rate PV01 / durations on the spot curve nodes
+    try:
+        if not outputs_current:
+            spot_list = get_spot_curve_store(json_path).spot_list(eval_date_str)
+            with stage("key_rates"):
+                key_rates_df = key_rate_table(bond_data_list, eval_date_ql, spot_curve_handle, spot_list)
+            with stage("write_back", output="key_rates"):
+                os.makedirs(os.path.dirname(key_rates_path), exist_ok=True)
+                key_rates_df.to_csv(key_rates_path, index=False)
+            print(f"💾 Key-rate durations saved to {key_rates_path}")
+        if cache is not None:
+            cache.set_meta('outputs', run_signature)
+    except Exception as e:
+        print(f"❌ Error computing key-rate durations: {str(e)}")
+
+    if cache is not None:
+        cache.save()
 
     # Prepare results DataFrame with sensitivity columns (excluding Trend)
     results_df = pd.DataFrame(results)
@@ -258,21 +337,17 @@ def main():
         'Modified Duration Calculated', 'Convexity Calculated', 'PV01 Calculated', 'Implied Yield'
     ]
     
-    # Add sensitivity columns (excluding Trend) with safe dictionary access
-    yield_shifts = [-0.02, -0.015, -0.01, -0.005, 0.0, 0.005, 0.01, 0.015, 0.02]
-    for dy in yield_shifts:
-        col_name = f"Price_{dy*100:+.1f}%"
-        col_delta = f"ΔP_{dy*100:+.1f}%"
-        col_delta_pct = f"ΔP(%)_{dy*100:+.1f}%"
-        results_df[col_name] = results_df['Sensitivities (Approx)'].apply(
-            lambda x: x.get(f"{dy*100:+.1f}%", {}).get("Price Approx", 0) if isinstance(x, dict) else 0
-        )
-        results_df[col_delta] = results_df['Sensitivities (Approx)'].apply(
-            lambda x: x.get(f"{dy*100:+.1f}%", {}).get("ΔP", 0) if isinstance(x, dict) else 0
-        )
-        results_df[col_delta_pct] = results_df['Sensitivities (Approx)'].apply(
-            lambda x: x.get(f"{dy*100:+.1f}%", {}).get("ΔP (%)", 0) if isinstance(x, dict) else 0
-        )
+    # Sensitivity grid (excluding Trend) for all bonds at once
+    price_grid, delta_grid, delta_pct_grid = sensitivity_grid(
+        results_df.get('Clean Price Calculated', pd.Series(np.nan, index=results_df.index)),
+        results_df.get('Modified Duration Calculated', pd.Series(np.nan, index=results_df.index)),
+        results_df.get('Convexity Calculated', pd.Series(np.nan, index=results_df.index)),
+        YIELD_SHIFTS
+    )
+    results_df = pd.concat(
+        [results_df, sensitivity_columns(price_grid, delta_grid, delta_pct_grid, YIELD_SHIFTS, index=results_df.index)],
+        axis=1
+    )
     
     cols.extend([col for col in results_df.columns if col.startswith("Price_") or col.startswith("ΔP_")])
     cols.append('Error')
@@ -281,31 +356,23 @@ def main():
     # Remplacer les NaN par 0 pour éviter les erreurs
     results_df = results_df.fillna(0)
 
-    # Create cashflows_df only for console output (not for Excel)
-    cashflows_output = []
-    for isin, cashflows in cashflows_by_isin.items():
-        for cf in cashflows:
-            bond_data = next((b for b in bond_data_list if b.get('isin') == isin), {})
-            cf_row = {
-                'Description': bond_data.get('description', 'Unknown'),
-                'ISIN': isin,
-                'Coupon': bond_data.get('coupon', 0.0),
-                'Maturity Date': bond_data.get('maturity_date', ''),
-                'Issue Date': bond_data.get('issue_date', ''),
-                'Date': cf.get('Date', ''),
-                'Amount': cf.get('Amount', 0.0)
-            }
-            cashflows_output.append(cf_row)
-
-    cashflows_df = pd.DataFrame(cashflows_output)
-    cf_cols = ['Description', 'ISIN', 'Coupon', 'Maturity Date', 'Issue Date', 'Date', 'Amount']
-    cashflows_df = cashflows_df.reindex(columns=[col for col in cf_cols if col in cashflows_df.columns])
-
-    # Vérification du DataFrame cashflows_df
-    print(f"🔍 Contenu de cashflows_df : {len(cashflows_df)} lignes")
-    if not cashflows_df.empty:
-        print("📋 Premières lignes de cashflows_df :")
-        print(cashflows_df.head())
+    # Cashflow table for debug logging only (not for Excel)
+    if log.isEnabledFor(logging.DEBUG):
+        cashflows_output = []
+        for isin, cashflows in cashflows_by_isin.items():
+            bond_data = bond_data_list.get(isin) or {}
+            for cf in cashflows:
+                cashflows_output.append({
+                    'Description': bond_data.get('description', 'Unknown'),
+                    'ISIN': isin,
+                    'Coupon': bond_data.get('coupon', 0.0),
+                    'Maturity Date': bond_data.get('maturity_date', ''),
+                    'Issue Date': bond_data.get('issue_date', ''),
+                    'Date': cf.get('Date', ''),
+                    'Amount': cf.get('Amount', 0.0)
+                })
+        cashflows_df = pd.DataFrame(cashflows_output)
+        log.debug("Contenu de cashflows_df : %d lignes\n%s", len(cashflows_df), cashflows_df.head())
 
     wb = None
     excel_available = True
@@ -318,37 +385,39 @@ def main():
 
     if excel_available and wb is not None:
         try:
-            results_sht = create_fresh_results_sheet(wb)
-
-            # Write results to Excel (simple write without formatting)
             print("📝 Écriture des résultats dans la feuille 'Results'")
-            print("🔍 DEBUG: Tentative d'écriture des en-têtes dans 'Results'")
-            results_sht.range('A1').value = results_df.columns.tolist()
-            print("🔍 DEBUG: En-têtes écrits avec succès dans 'Results'")
-            print("🔍 DEBUG: Tentative d'écriture des données dans 'Results'")
-            results_sht.range('A2').value = results_df.values.tolist()
-            print("🔍 DEBUG: Données écrites avec succès dans 'Results'")
-            print("🔍 DEBUG: Tentative de mise en gras des en-têtes dans 'Results'")
-            results_sht.range('A1').expand('right').api.Font.Bold = True
-            print("🔍 DEBUG: En-têtes mis en gras avec succès dans 'Results'")
-            
-            # Aucune étape de formatage numérique
-
-            print("🔍 DEBUG: Tentative d'ajustement automatique des colonnes dans 'Results'")
-            results_sht.autofit('c')
-            print("🔍 DEBUG: Ajustement automatique des colonnes réussi dans 'Results'")
-
-            print("🔍 DEBUG: Tentative de sauvegarde du classeur")
-            wb.save()
+            with stage("write_back", output="excel"):
+                writer = XlwingsWorkbookWriter(wb)
+                changed = writer.write_table("Results", results_df.columns.tolist(), results_df.values.tolist(),
+                                             header_color=None)
+                writer.save()
+            count("excel_cells_written", writer.cells_written)
+            print(f"✏️ {changed} ligne(s) modifiée(s) dans 'Results'")
             print("💾 Workbook saved.")
         except Exception as e:
             print(f"❌ Error writing to Excel: {str(e)}")
             print("📋 Results (falling back to console):")
             print(results_df)
+    elif HEADLESS_RESULTS_PATH:
+        try:
+            with stage("write_back", output="xlsx"):
+                writer = OpenpyxlWorkbookWriter(os.path.join(script_dir, HEADLESS_RESULTS_PATH))
+                writer.write_table("Results", results_df.columns.tolist(), results_df.values.tolist(),
+                                   header_color=None)
+                writer.save()
+            count("excel_cells_written", writer.cells_written)
+            print(f"💾 Results saved to {writer.path}")
+        except Exception as e:
+            print(f"❌ Error writing {HEADLESS_RESULTS_PATH}: {str(e)}")
+            print(results_df)
     else:
         print("📋 Results (Excel not available, displaying in console):")
         print(results_df)
 
+    trace_path = finish_run("calculate_bonds")
+    if trace_path:
+        print(f"⏱️ Trace de profilage écrite dans {trace_path}")
+
 if __name__ == "__main__":
     try:
         xw.Book("obligation.xlsm").set_mock_caller()
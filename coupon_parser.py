@@ -0,0 +1,67 @@
+import re
+from fractions import Fraction
+
+# Vulgar fractions found in DMO gilt descriptions, as exact rationals
+UNICODE_FRACTIONS = {
+    '½': Fraction(1, 2), '¼': Fraction(1, 4), '¾': Fraction(3, 4),
+    '⅛': Fraction(1, 8), '⅜': Fraction(3, 8), '⅝': Fraction(5, 8), '⅞': Fraction(7, 8),
+    '⅓': Fraction(1, 3), '⅔': Fraction(2, 3),
+}
+
+_fraction_chars = ''.join(UNICODE_FRACTIONS)
+coupon_pattern = re.compile(rf'([\d\s./{_fraction_chars}]+)%')
+_token_pattern = re.compile(rf'\s*(?:(\d+)\s*/\s*(\d+)|(\d+(?:\.\d+)?)|([{_fraction_chars}]))')
+
+# description -> Fraction (or None when the description has no coupon)
+_COUPON_CACHE = {}
+
+
+def parse_coupon_text(text):
+    """
+    Turn the numeric part of a coupon ("4¾", "0 5/8", "1 1/8", "5") into an
+    exact Fraction by summing its terms. Raises ValueError on anything else.
+    """
+    total = Fraction(0)
+    pos = 0
+    text = text.strip()
+    if not text:
+        raise ValueError("empty coupon")
+    while pos < len(text):
+        match = _token_pattern.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"unexpected character {text[pos]!r} in coupon {text!r}")
+        numerator, denominator, number, symbol = match.groups()
+        if numerator is not None:
+            if int(denominator) == 0:
+                raise ValueError(f"zero denominator in coupon {text!r}")
+            total += Fraction(int(numerator), int(denominator))
+        elif number is not None:
+            total += Fraction(number)
+        else:
+            total += UNICODE_FRACTIONS[symbol]
+        pos = match.end()
+    return total
+
+
+def parse_coupon_rational(description):
+    """Coupon of a gilt description such as "4¾% Treasury Gilt 2030", as a Fraction (memoized)."""
+    if not description or not isinstance(description, str):
+        return None
+    try:
+        return _COUPON_CACHE[description]
+    except KeyError:
+        pass
+
+    match = coupon_pattern.search(description)
+    coupon = parse_coupon_text(match.group(1)) if match else None
+    _COUPON_CACHE[description] = coupon
+    return coupon
+
+
+def parse_coupon(description):
+    coupon = parse_coupon_rational(description)
+    return float(coupon) if coupon is not None else None
+
+
+def clear_coupon_cache():
+    _COUPON_CACHE.clear()
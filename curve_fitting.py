@@ -0,0 +1,308 @@
+"""
+Nelson-Siegel-Svensson gilt curve fitted to observed clean prices.
+
+The zero rate (continuously compounded, Actual/365 Fixed from the
+evaluation date) is
+
+    z(t) = b0 + (b1 + b2) (1 - e^-k1 t) / (k1 t) - b2 e^-k1 t
+              + b3 ((1 - e^-k2 t) / (k2 t) - e^-k2 t)
+
+with parameters [b0, b1, b2, b3, k1, k2] in QuantLib's SvenssonFitting order.
+Model prices come from the universe's CashflowMatrix and the parameters are
+calibrated by Levenberg-Marquardt with analytic gradients. The fitted curve
+is handed to the pricing functions as a DiscountCurve handle in place of the
+SpotRates ZeroCurve:
+
+    python curve_fitting.py 2024-06-03 --prices closes.csv
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import QuantLib as ql
+
+from bond_cashflows import CashflowMatrix
+from gilt_builders import build_fixed_rate_bond, get_spot_curve_store
+from storage import load_clean_prices, load_instruments
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+default_params_path = os.path.join(base_dir, "FittedCurves", "nss_params.json")
+
+DEFAULT_NSS_GUESS = np.array([0.04, 0.01, 0.0, 0.0, 0.5, 0.1])
+# Cold starts try each (k1, k2) pair: the NSS objective has degenerate local minima (k1 == k2)
+DEFAULT_DECAY_STARTS = [(k1, k2) for k1 in (0.2, 0.5, 1.0, 2.0) for k2 in (0.02, 0.05, 0.1) if k1 > k2]
+
+
+def _loadings(x):
+    """(1 - e^-x) / x and its derivative in x, safe at x = 0."""
+    small = np.abs(x) < 1e-8
+    xs = np.where(small, 1.0, x)
+    e = np.exp(-xs)
+    f = np.where(small, 1.0 - x / 2, (1 - e) / xs)
+    df = np.where(small, -0.5 + x / 3, (e * (xs + 1) - 1) / xs ** 2)
+    return f, df
+
+
+def nss_zero_rates(params, times):
+    b0, b1, b2, b3, k1, k2 = params
+    t = np.asarray(times, dtype=float)
+    f1, _ = _loadings(k1 * t)
+    f2, _ = _loadings(k2 * t)
+    return b0 + (b1 + b2) * f1 - b2 * np.exp(-k1 * t) + b3 * (f2 - np.exp(-k2 * t))
+
+
+def nss_discounts(params, times):
+    t = np.asarray(times, dtype=float)
+    return np.exp(-nss_zero_rates(params, t) * t)
+
+
+def nss_discount_gradient(params, times):
+    """Discount factors and their (6 x times) derivatives in the parameters."""
+    b0, b1, b2, b3, k1, k2 = params
+    t = np.asarray(times, dtype=float)
+    e1, e2 = np.exp(-k1 * t), np.exp(-k2 * t)
+    f1, df1 = _loadings(k1 * t)
+    f2, df2 = _loadings(k2 * t)
+
+    z = b0 + (b1 + b2) * f1 - b2 * e1 + b3 * (f2 - e2)
+    dz = np.vstack([
+        np.ones_like(t),
+        f1,
+        f1 - e1,
+        f2 - e2,
+        ((b1 + b2) * df1 + b2 * e1) * t,
+        b3 * (df2 + e2) * t,
+    ])
+    discounts = np.exp(-z * t)
+    return discounts, -dz * t * discounts
+
+
+class NSSCurveFitter:
+    def __init__(self, matrix, accrued, times, settlement_time):
+        self.matrix = matrix
+        self.accrued = np.asarray(accrued, dtype=float)
+        self.times = np.asarray(times, dtype=float)
+        self.settlement_time = float(settlement_time)
+
+    def model_prices(self, params):
+        discounts = nss_discounts(params, np.concatenate([[self.settlement_time], self.times]))
+        return self.matrix.price(discounts[1:]) / discounts[0] - self.accrued
+
+    def prices_and_jacobian(self, params):
+        discounts, gradient = nss_discount_gradient(params, np.concatenate([[self.settlement_time], self.times]))
+        settlement, d_settlement = discounts[0], gradient[:, 0]
+        pv = self.matrix.price(discounts[1:])
+        d_pv = self.matrix.price_many(gradient[:, 1:])
+        prices = pv / settlement - self.accrued
+        jacobian = (d_pv / settlement - np.outer(d_settlement, pv) / settlement ** 2).T
+        return prices, jacobian
+
+    def default_weights(self, rate=0.04):
+        """Inverse durations at a flat rate, so price residuals weigh like yield residuals."""
+        flat = np.exp(-rate * self.times)
+        pv = self.matrix.price(flat)
+        duration = self.matrix.price(flat * self.times) / pv
+        return 1.0 / np.maximum(duration, 0.25)
+
+    def fit(self, clean_prices, initial=None, weights=None, tolerance=1e-12, max_iterations=200):
+        """
+        Levenberg-Marquardt on weighted clean price residuals, from `initial`
+        (e.g. the previous day's parameters) or, without one, from the best of
+        a few short runs over DEFAULT_DECAY_STARTS. Returns a dict with params,
+        residuals (model - market), rmse (unweighted, per 100) and iterations.
+        """
+        target = np.asarray(clean_prices, dtype=float)
+        weights = self.default_weights() if weights is None else np.asarray(weights, dtype=float)
+        if initial is not None:
+            return self._levenberg_marquardt(target, weights, initial, tolerance, max_iterations)
+
+        starts = []
+        for k1, k2 in DEFAULT_DECAY_STARTS:
+            guess = DEFAULT_NSS_GUESS.copy()
+            guess[4:] = k1, k2
+            starts.append(self._levenberg_marquardt(target, weights, guess, tolerance, 60))
+        best = min(starts, key=lambda r: r['cost'])
+        result = self._levenberg_marquardt(target, weights, best['params'], tolerance, max_iterations)
+        result['iterations'] += sum(r['iterations'] for r in starts)
+        return result
+
+    def _levenberg_marquardt(self, target, weights, initial, tolerance, max_iterations):
+        params = np.array(initial, dtype=float)
+
+        prices, jacobian = self.prices_and_jacobian(params)
+        residuals = (prices - target) * weights
+        cost = residuals @ residuals
+        damping = 1e-3
+        iterations = 0
+
+        for iterations in range(1, max_iterations + 1):
+            J = jacobian * weights[:, None]
+            normal = J.T @ J
+            gradient = J.T @ residuals
+            try:
+                step = np.linalg.solve(normal + damping * np.diag(np.diag(normal) + 1e-12), -gradient)
+            except np.linalg.LinAlgError:
+                damping *= 10
+                continue
+
+            candidate = params + step
+            if candidate[4] > 0 and candidate[5] > 0:
+                new_prices, new_jacobian = self.prices_and_jacobian(candidate)
+                new_residuals = (new_prices - target) * weights
+                new_cost = new_residuals @ new_residuals
+            else:
+                new_cost = np.inf
+
+            if new_cost < cost:
+                improvement = cost - new_cost
+                params, prices, jacobian, residuals, cost = candidate, new_prices, new_jacobian, new_residuals, new_cost
+                damping = max(damping / 10, 1e-12)
+                if improvement <= tolerance * max(cost, 1e-30) or np.abs(step).max() < tolerance:
+                    break
+            else:
+                damping *= 10
+                if damping > 1e12:
+                    break
+
+        errors = prices - target
+        return {
+            'params': params,
+            'residuals': errors,
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'cost': float(cost),
+            'iterations': iterations,
+        }
+
+
+def universe_fitter(gilts, eval_date_ql, isins=None, min_maturity=0.25):
+    """Fitter for the gilts (optionally restricted to isins) maturing after min_maturity years."""
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    curve_day_count = ql.Actual365Fixed()
+    settlement_date = calendar.advance(eval_date_ql, 1, ql.Days)
+    wanted = set(isins) if isins is not None else None
+
+    kept, bonds = [], []
+    for gilt in gilts:
+        if wanted is not None and gilt['isin'] not in wanted:
+            continue
+        bond, error = build_fixed_rate_bond(gilt, eval_date_ql, calendar, day_count)
+        if error is None and day_count.yearFraction(eval_date_ql, bond.maturityDate()) > min_maturity:
+            kept.append(gilt['isin'])
+            bonds.append(bond)
+
+    matrix = CashflowMatrix.from_bonds(kept, bonds, settlement_date)
+    times = (matrix.dates - eval_date_ql.serialNumber()) / 365.0
+    accrued = [bond.accruedAmount(settlement_date) for bond in bonds]
+    return NSSCurveFitter(matrix, accrued, times, curve_day_count.yearFraction(eval_date_ql, settlement_date))
+
+
+def fitted_curve_handle(params, eval_date_ql, extra_dates=(), max_years=60):
+    """
+    DiscountCurve with NSS discount factors on a monthly grid plus extra_dates
+    (e.g. the universe's payment dates, which are then priced exactly).
+    """
+    calendar = ql.UnitedKingdom()
+    day_count = ql.Actual365Fixed()
+    serials = {eval_date_ql.serialNumber()}
+    serials.update((eval_date_ql + ql.Period(m, ql.Months)).serialNumber() for m in range(1, 12 * max_years + 1))
+    serials.update(int(d) for d in extra_dates if int(d) > eval_date_ql.serialNumber())
+
+    dates = [ql.Date(s) for s in sorted(serials)]
+    times = (np.array(sorted(serials)) - eval_date_ql.serialNumber()) / 365.0
+    discounts = nss_discounts(params, times)
+    discounts[0] = 1.0
+    curve = ql.DiscountCurve(dates, discounts.tolist(), day_count, calendar)
+    curve.enableExtrapolation()
+    return ql.YieldTermStructureHandle(curve)
+
+
+def fit_gilt_curve(gilts, eval_date_str, clean_prices, initial=None, weights=None):
+    """
+    Fit the NSS curve on eval_date_str to clean_prices ({isin: price}).
+    Returns (curve handle, fit result with 'isins').
+    """
+    eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+    quoted = [isin for isin, p in clean_prices.items() if p is not None and np.isfinite(p)]
+    fitter = universe_fitter(gilts, eval_date_ql, quoted)
+    result = fitter.fit([clean_prices[i] for i in fitter.matrix.isins], initial, weights)
+    result['isins'] = list(fitter.matrix.isins)
+    settlement_date = ql.UnitedKingdom().advance(eval_date_ql, 1, ql.Days)
+    pillars = np.append(fitter.matrix.dates, settlement_date.serialNumber())
+    return fitted_curve_handle(result['params'], eval_date_ql, pillars), result
+
+
+# --- Stored fits -----------------------------------------------------------
+
+def load_fit(path, eval_date_str, before=False):
+    """Stored parameters for eval_date_str (or the latest strictly before it when before=True)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        history = json.load(f)
+    if before:
+        previous = [d for d in history if d < eval_date_str]
+        return np.array(history[max(previous)]['params']) if previous else None
+    entry = history.get(eval_date_str)
+    return np.array(entry['params']) if entry else None
+
+
+def save_fit(path, eval_date_str, result, keep_dates=250):
+    history = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            history = json.load(f)
+    history[eval_date_str] = {'params': [float(p) for p in result['params']], 'rmse': result['rmse']}
+    history = {d: history[d] for d in sorted(history)[-keep_dates:]}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def load_fitted_curve(path, eval_date_str, extra_dates=()):
+    params = load_fit(path, eval_date_str)
+    if params is None:
+        raise ValueError(f"❌ Aucune courbe NSS ajustée pour {eval_date_str} dans {path}")
+    eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+    settlement_date = ql.UnitedKingdom().advance(eval_date_ql, 1, ql.Days)
+    return fitted_curve_handle(params, eval_date_ql, list(extra_dates) + [settlement_date.serialNumber()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a Nelson-Siegel-Svensson curve to gilt clean prices")
+    parser.add_argument("eval_date", help="Evaluation date (YYYY-MM-DD)")
+    parser.add_argument("--prices", help="Clean prices (CSV isin,clean_price or JSON); "
+                                         "defaults to prices on the SpotRates curve")
+    parser.add_argument("--gilts", default=default_gilts_path)
+    parser.add_argument("--spot", default=default_spot_path)
+    parser.add_argument("--output", default=default_params_path)
+    args = parser.parse_args()
+
+    eval_date_ql = ql.DateParser.parseISO(args.eval_date)
+    ql.Settings.instance().evaluationDate = eval_date_ql
+    gilts = load_instruments(args.gilts)
+
+    if args.prices:
+        clean_prices = load_clean_prices(args.prices)
+    else:
+        fitter = universe_fitter(gilts, eval_date_ql, min_maturity=0)
+        settlement_date = ql.UnitedKingdom().advance(eval_date_ql, 1, ql.Days)
+        curve_handle = get_spot_curve_store(args.spot).curve_handle(args.eval_date)
+        model = fitter.matrix.dirty_prices(curve_handle, settlement_date) - fitter.accrued
+        clean_prices = dict(zip(fitter.matrix.isins, model))
+
+    initial = load_fit(args.output, args.eval_date, before=True)
+    _, result = fit_gilt_curve(gilts, args.eval_date, clean_prices, initial)
+    save_fit(args.output, args.eval_date, result)
+
+    print(f"✅ NSS ajustée sur {len(result['isins'])} gilts en {result['iterations']} itérations, "
+          f"RMSE prix = {result['rmse']:.4f}")
+    print("   Paramètres [b0, b1, b2, b3, k1, k2] :", np.round(result['params'], 6).tolist())
+    print(f"💾 Paramètres sauvegardés dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Precomputed UK business-day table and date conversions as array lookups.
+
+Dates are handled as QuantLib serial numbers (days since 1899-12-30, the
+Excel epoch; ql.Date(serial) and Date.serialNumber() round-trip). The
+UnitedKingdom calendar is evaluated once over TABLE_START..TABLE_END and
+kept as the sorted array of business-day serials, so that
+
+    advance_business_days(serials, n)     calendar.advance(d, n, ql.Days)
+    settlement_serials(serials)           calendar.advance(d, 1, ql.Days)
+    spot_node_serials(eval_serial, years) gilt_builders.spot_node_date
+
+are searchsorted lookups over whole arrays instead of day-by-day calendar
+walks (a 40y spot node is ~14,600 business days from its curve date, which
+is why the table runs past 2080). Results falling outside the table go
+through the QuantLib calendar.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import QuantLib as ql
+
+TABLE_START = (1, 1, 1990)
+TABLE_END = (31, 12, 2140)
+
+# ql.Date serial of 1970-01-01 (numpy's datetime64 epoch)
+UNIX_EPOCH_SERIAL = 25569
+# date(1899, 12, 30).toordinal(): Python ordinals to serials
+ORDINAL_OFFSET = 693594
+# Serial of ql.Date(), used for missing / invalid dates
+NO_SERIAL = 0
+
+
+@lru_cache(maxsize=None)
+def _business_day_table():
+    calendar = ql.UnitedKingdom()
+    start = ql.Date(*TABLE_START)
+    end = ql.Date(*TABLE_END)
+    serials = np.array([d.serialNumber() for d in calendar.businessDayList(start, end)], dtype=np.int64)
+    return serials, start.serialNumber(), end.serialNumber()
+
+
+def business_day_serials():
+    """Sorted serials of every UK business day in the table."""
+    return _business_day_table()[0]
+
+
+def is_business_day(serials):
+    table, _, _ = _business_day_table()
+    serials = np.asarray(serials, dtype=np.int64)
+    position = np.clip(np.searchsorted(table, serials), 0, len(table) - 1)
+    return table[position] == serials
+
+
+def advance_business_days(serials, n):
+    """
+    calendar.advance(d, n, ql.Days) on the UK calendar, elementwise: the n-th
+    business day after (n > 0) or before (n < 0) d, or d adjusted to the
+    following business day for n == 0. serials and n broadcast together.
+    """
+    table, first, last = _business_day_table()
+    serials, n = np.broadcast_arrays(np.asarray(serials, dtype=np.int64), np.asarray(n, dtype=np.int64))
+    shape = serials.shape
+    serials, n = serials.ravel(), n.ravel()
+    forward = np.searchsorted(table, serials, side='right') + n - 1
+    backward = np.searchsorted(table, serials, side='left') + n
+    position = np.where(n > 0, forward, backward)
+
+    inside = (serials >= first) & (serials <= last) & (position >= 0) & (position < len(table))
+    result = table[np.clip(position, 0, len(table) - 1)]
+    if not inside.all():
+        calendar = ql.UnitedKingdom()
+        for k in np.flatnonzero(~inside):
+            result[k] = calendar.advance(ql.Date(int(serials[k])), int(n[k]), ql.Days).serialNumber()
+    return result.reshape(shape)
+
+
+def settlement_serials(serials, settlement_days=1):
+    return advance_business_days(serials, settlement_days)
+
+
+def settlement_date(eval_date_ql, settlement_days=1):
+    """calendar.advance(eval_date_ql, settlement_days, ql.Days) on the UK calendar."""
+    return ql.Date(int(advance_business_days(eval_date_ql.serialNumber(), settlement_days)))
+
+
+def spot_node_serials(eval_serial, years):
+    """Spot node serials: round(years * 365) UK business days after the curve date."""
+    days = np.rint(np.asarray(years, dtype=float) * 365).astype(np.int64)
+    return advance_business_days(eval_serial, days)
+
+
+def iso_to_serials(values):
+    """
+    Serials of ISO 'YYYY-MM-DD' strings (or a datetime64 array); None, empty
+    strings and NaT map to NO_SERIAL.
+    """
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype('datetime64[D]')
+    else:
+        days = np.array([v if v else 'NaT' for v in values], dtype='datetime64[D]')
+    serials = days.astype(np.int64) + UNIX_EPOCH_SERIAL
+    return np.where(np.isnat(days), NO_SERIAL, serials)
+
+
+def serials_to_iso(serials):
+    days = (np.asarray(serials, dtype=np.int64) - UNIX_EPOCH_SERIAL).astype('datetime64[D]')
+    return np.datetime_as_string(days, unit='D')
+
+
+@lru_cache(maxsize=65536)
+def iso_serial(value):
+    """Serial of one strict 'YYYY-MM-DD' string, NO_SERIAL if missing or malformed (memoized)."""
+    try:
+        parsed = datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return NO_SERIAL
+    return parsed.toordinal() - ORDINAL_OFFSET
+
+
+def iso_date(value):
+    """ql.Date of an ISO string, or None if missing or malformed."""
+    serial = iso_serial(value)
+    return ql.Date(serial) if serial != NO_SERIAL else None
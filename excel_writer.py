@@ -0,0 +1,205 @@
+"""
+Bulk write-back of result tables to Excel.
+
+A table (header row + data rows) is written as whole 2-D blocks. On reruns
+the sheet's current contents are read back in one call and only the runs of
+rows that changed are rewritten; rows or columns left over from a larger
+previous table are cleared. Sheets are created on first use and reused
+afterwards.
+
+Two backends share the interface:
+
+    XlwingsWorkbookWriter(xw.Book(...))      live workbook through xlwings
+    OpenpyxlWorkbookWriter("results.xlsx")    headless, for Linux runs and timing
+"""
+import math
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+HEADER_COLOR = (173, 216, 230)  # Light blue background
+
+
+def _cell(value):
+    """Plain Python value for a cell (numpy scalars unwrapped, NaN as empty, lists joined)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _same(old, new):
+    if old in (None, '') and new in (None, ''):
+        return True
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)) \
+            and not isinstance(old, bool) and not isinstance(new, bool):
+        return math.isclose(old, new, rel_tol=1e-12, abs_tol=1e-12)
+    # Excel turns ISO date strings into dates
+    if isinstance(old, (datetime, date)) and isinstance(new, str):
+        return old.strftime('%Y-%m-%d') == new[:10]
+    return old == new
+
+
+def changed_row_runs(old_block, new_block):
+    """[start, end) runs of rows of new_block that differ from old_block."""
+    runs, start = [], None
+    for i, row in enumerate(new_block):
+        old_row = old_block[i] if i < len(old_block) else []
+        changed = any(not _same(old_row[j] if j < len(old_row) else None, v) for j, v in enumerate(row))
+        if changed and start is None:
+            start = i
+        elif not changed and start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, len(new_block)))
+    return runs
+
+
+class WorkbookWriter:
+    """Diffing logic; backends provide the sheet primitives (0-based rows/columns)."""
+
+    def __init__(self):
+        self.cells_written = 0
+
+    def write_table(self, sheet_name, headers, rows, header_color=HEADER_COLOR, autofit=True):
+        """Write headers + rows at A1 of sheet_name. Returns the number of rows rewritten."""
+        block = [[_cell(v) for v in headers]] + [[_cell(v) for v in row] for row in rows]
+        width = max(len(row) for row in block)
+        block = [row + [None] * (width - len(row)) for row in block]
+
+        sheet, created = self._sheet(sheet_name)
+        old = [] if created else self._read(sheet)
+        old_width = max((len(row) for row in old), default=0)
+
+        runs = changed_row_runs(old, block)
+        for start, end in runs:
+            self._write(sheet, start, 0, block[start:end])
+            self.cells_written += (end - start) * width
+        if len(old) > len(block):
+            self._clear(sheet, len(block), 0, len(old) - len(block), max(old_width, width))
+        if old_width > width:
+            self._clear(sheet, 0, width, len(block), old_width - width)
+
+        if created or runs:
+            self._format_header(sheet, width, header_color)
+            if autofit:
+                self._autofit(sheet, len(block), width)
+        return sum(end - start for start, end in runs)
+
+    # Backend primitives
+    def _sheet(self, name):
+        raise NotImplementedError
+
+    def _read(self, sheet):
+        raise NotImplementedError
+
+    def _write(self, sheet, row, column, values):
+        raise NotImplementedError
+
+    def _clear(self, sheet, row, column, n_rows, n_columns):
+        raise NotImplementedError
+
+    def _format_header(self, sheet, n_columns, color):
+        raise NotImplementedError
+
+    def _autofit(self, sheet, n_rows, n_columns):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
+
+
+class XlwingsWorkbookWriter(WorkbookWriter):
+    def __init__(self, book):
+        super().__init__()
+        self.book = book
+
+    def _sheet(self, name):
+        if name in [sheet.name for sheet in self.book.sheets]:
+            return self.book.sheets[name], False
+        return self.book.sheets.add(name=name, after=self.book.sheets[-1]), True
+
+    def _read(self, sheet):
+        last = sheet.used_range.last_cell
+        values = sheet.range((1, 1), (last.row, last.column)).options(ndim=2).value
+        return [] if values == [[None]] else values
+
+    def _write(self, sheet, row, column, values):
+        sheet.range((row + 1, column + 1)).value = values
+
+    def _clear(self, sheet, row, column, n_rows, n_columns):
+        if n_rows > 0 and n_columns > 0:
+            sheet.range((row + 1, column + 1), (row + n_rows, column + n_columns)).clear_contents()
+
+    def _format_header(self, sheet, n_columns, color):
+        header = sheet.range((1, 1), (1, n_columns))
+        header.font.bold = True
+        if color:
+            header.color = color
+
+    def _autofit(self, sheet, n_rows, n_columns):
+        sheet.range((1, 1), (n_rows, n_columns)).columns.autofit()
+
+    def save(self):
+        self.book.save()
+
+
+class OpenpyxlWorkbookWriter(WorkbookWriter):
+    def __init__(self, path):
+        super().__init__()
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("openpyxl est requis pour l'écriture Excel sans Excel (pip install openpyxl)")
+        self._openpyxl = openpyxl
+        self.path = path
+        if os.path.exists(path):
+            self.book = openpyxl.load_workbook(path, keep_vba=path.lower().endswith('.xlsm'))
+        else:
+            self.book = openpyxl.Workbook()
+            self.book.remove(self.book.active)
+
+    def _sheet(self, name):
+        if name in self.book.sheetnames:
+            return self.book[name], False
+        return self.book.create_sheet(name), True
+
+    def _read(self, sheet):
+        if sheet.max_row == 1 and sheet.max_column == 1 and sheet.cell(1, 1).value is None:
+            return []
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+    def _write(self, sheet, row, column, values):
+        for i, values_row in enumerate(values):
+            for j, value in enumerate(values_row):
+                # cell(..., value=None) would leave the old value in place
+                sheet.cell(row=row + i + 1, column=column + j + 1).value = value
+
+    def _clear(self, sheet, row, column, n_rows, n_columns):
+        for i in range(n_rows):
+            for j in range(n_columns):
+                sheet.cell(row=row + i + 1, column=column + j + 1).value = None
+
+    def _format_header(self, sheet, n_columns, color):
+        styles = self._openpyxl.styles
+        fill = styles.PatternFill(fill_type='solid', fgColor='{:02X}{:02X}{:02X}'.format(*color)) if color else None
+        for j in range(n_columns):
+            cell = sheet.cell(row=1, column=j + 1)
+            cell.font = styles.Font(bold=True)
+            if fill:
+                cell.fill = fill
+
+    def _autofit(self, sheet, n_rows, n_columns):
+        get_column_letter = self._openpyxl.utils.get_column_letter
+        for j, column in enumerate(sheet.iter_cols(min_col=1, max_col=n_columns, max_row=n_rows, values_only=True)):
+            width = max((len(str(v)) for v in column if v is not None), default=8)
+            sheet.column_dimensions[get_column_letter(j + 1)].width = min(width + 2, 60)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.book.save(self.path)
@@ -0,0 +1,269 @@
+"""
+QuantLib spot curves and gilt bonds built from the JSON inputs.
+
+Shared by calculate_bonds and the analytics modules (key_rates,
+curve_fitting, scenarios, ...), which import them from here rather than
+from the pricing script: SpotRates.json curves (SpotCurveStore, one memoized
+ZeroCurve handle per evaluation date) and semi-annual FixedRateBonds on
+cached UK schedules, from gilts.json records or InstrumentUniverse columns.
+"""
+import bisect
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import QuantLib as ql
+
+from date_tables import NO_SERIAL, iso_date, spot_node_serials
+from instrumentation import count, get_logger, stage
+from storage import load_spot_rates, npz_path
+
+log = get_logger(__name__)
+
+
+def interpolate_curve(spot_data, date_before_str, date_after_str, target_date_str):
+    fmt = "%Y-%m-%d"
+    date_before = datetime.strptime(date_before_str, fmt)
+    date_after = datetime.strptime(date_after_str, fmt)
+    date_target = datetime.strptime(target_date_str, fmt)
+
+    alpha = (date_target - date_before).days / (date_after - date_before).days
+
+    curve_before = {e["year"]: e["rate"] for e in spot_data[date_before_str]}
+    curve_after = {e["year"]: e["rate"] for e in spot_data[date_after_str]}
+
+    interpolated = []
+    for year in curve_before:
+        if year in curve_after:
+            rate = curve_before[year] + alpha * (curve_after[year] - curve_before[year])
+            interpolated.append({"year": year, "rate": rate})
+    return interpolated
+
+def find_bracketing_dates(sorted_dates, eval_date_str):
+    i = bisect.bisect_left(sorted_dates, eval_date_str)
+    j = bisect.bisect_right(sorted_dates, eval_date_str)
+    before = sorted_dates[i - 1] if i > 0 else None
+    after = sorted_dates[j] if j < len(sorted_dates) else None
+    return before, after
+
+def spot_node_dates(eval_dt, years):
+    """Node dates round(years * 365) UK business days after eval_dt, looked up in the business-day table."""
+    return [ql.Date(int(s)) for s in spot_node_serials(eval_dt.serialNumber(), years)]
+
+def spot_node_date(eval_dt, years, calendar=None):
+    if calendar is not None and calendar != ql.UnitedKingdom():
+        return calendar.advance(eval_dt, ql.Period(int(round(years * 365)), ql.Days))
+    return spot_node_dates(eval_dt, [years])[0]
+
+def build_spot_curve(eval_dt, spot_list, verbose=True):
+    """ZeroCurve handle on the spot nodes; verbose logs every node at DEBUG level."""
+    with stage("curve_build"):
+        calendar = ql.UnitedKingdom()
+        day_count = ql.ActualActual(ql.ActualActual.ISMA)
+        dates = [eval_dt]
+        rates = [spot_list[0]["rate"] / 100.0]
+        verbose = verbose and log.isEnabledFor(logging.DEBUG)
+
+        nodes = []
+        for entry in spot_list:
+            try:
+                years = float(entry["year"])
+                rate = entry["rate"] / 100
+
+                if years <= 0:
+                    if verbose:
+                        log.debug("Ignoré: maturité non positive (%s ans)", years)
+                    continue
+                nodes.append((years, rate))
+
+            except (KeyError, ValueError, TypeError) as e:
+                log.warning("Erreur dans une entrée de spot rate: %s | Exception: %s", entry, e)
+
+        node_dates = spot_node_dates(eval_dt, [years for years, _ in nodes])
+        for (years, rate), date in zip(nodes, node_dates):
+            if date <= eval_dt:
+                if verbose:
+                    log.debug("Ignoré: Date %s antérieure ou égale à %s", date, eval_dt)
+                continue
+
+            if verbose:
+                log.debug("Ajout : %s | %.4f%% | Maturité: %s ans", date, rate * 100, years)
+            dates.append(date)
+            rates.append(rate)
+
+        if verbose:
+            log.debug("Total dates valides : %d, rates valides : %d", len(dates), len(rates))
+
+        if len(dates) < 2:
+            raise ValueError("❌ Pas assez de dates valides pour construire la courbe de taux")
+
+        try:
+            spot_curve = ql.ZeroCurve(dates, rates, day_count, calendar)
+        except Exception as e:
+            log.error("Erreur lors de la création de la ZeroCurve: %s", e)
+            raise
+
+        count("curves_built")
+        return ql.YieldTermStructureHandle(spot_curve)
+
+class SpotCurveStore:
+    """
+    In-memory view of SpotRates.json covering every curve date.
+    The file is parsed once, dates are kept sorted for bisect lookup and the
+    ZeroCurve handles built for each evaluation date are memoized in an LRU.
+    Curves are anchored on their own evaluation date, so the store never
+    touches ql.Settings.instance().evaluationDate.
+    """
+
+    def __init__(self, filename, max_curves=64):
+        self.filename = filename
+        self.max_curves = max_curves
+        self._curves = OrderedDict()
+        # Bumped on every reload, so holders of derived results can tell the curves changed
+        self.generation = 0
+        self.reload()
+
+    def reload(self):
+        self._data = load_spot_rates(self.filename)
+        self._dates = sorted(self._data.keys())
+        self._mtime = self._source_mtime()
+        self._curves.clear()
+        self.generation += 1
+
+    def _source_mtime(self):
+        source = self.filename if os.path.exists(self.filename) else npz_path(self.filename)
+        return os.path.getmtime(source)
+
+    def is_stale(self):
+        return self._source_mtime() != self._mtime
+
+    @property
+    def dates(self):
+        return self._dates
+
+    def has_date(self, eval_date_str):
+        return bool(self._data.get(eval_date_str))
+
+    def spot_list(self, eval_date_str):
+        spot_list = self._data.get(eval_date_str, [])
+        if spot_list:
+            return spot_list
+
+        before, after = find_bracketing_dates(self._dates, eval_date_str)
+        if not before or not after:
+            raise ValueError(f"❌ Impossible d'interpoler : il manque une date avant ou après {eval_date_str}")
+        return interpolate_curve(self._data, before, after, eval_date_str)
+
+    def curve_handle(self, eval_date_str):
+        handle = self._curves.get(eval_date_str)
+        if handle is not None:
+            self._curves.move_to_end(eval_date_str)
+            return handle
+
+        eval_dt = ql.DateParser.parseISO(eval_date_str)
+        handle = build_spot_curve(eval_dt, self.spot_list(eval_date_str), verbose=False)
+        self._curves[eval_date_str] = handle
+        if len(self._curves) > self.max_curves:
+            self._curves.popitem(last=False)
+        return handle
+
+_CURVE_STORES = {}
+
+def get_spot_curve_store(filename, max_curves=64):
+    key = os.path.abspath(filename)
+    store = _CURVE_STORES.get(key)
+    if store is None:
+        store = SpotCurveStore(filename, max_curves=max_curves)
+        _CURVE_STORES[key] = store
+    elif store.is_stale():
+        store.reload()
+    return store
+
+def load_spot_curve_from_json(filename, eval_date_str):
+    log.info("Chargement du fichier JSON: %s", filename)
+
+    eval_dt = ql.DateParser.parseISO(eval_date_str)
+    ql.Settings.instance().evaluationDate = eval_dt
+
+    store = get_spot_curve_store(filename)
+    if not store.has_date(eval_date_str):
+        log.warning("Pas de données pour %s, tentative d'interpolation...", eval_date_str)
+    spot_list = store.spot_list(eval_date_str)
+
+    log.info("Données de spot obtenues : %d entrées", len(spot_list))
+    if log.isEnabledFor(logging.DEBUG):
+        for e in spot_list:
+            log.debug("   - Year: %s | Rate: %s", e['year'], e['rate'])
+
+    return store.curve_handle(eval_date_str)
+
+# Gilts pay semi-annually, so schedules only depend on (calendar, issue, maturity).
+# They are shared across bonds and across repeated pricing runs in the same
+# process, in an LRU large enough for several universes.
+MAX_CACHED_SCHEDULES = 8192
+_SCHEDULE_CACHE = OrderedDict()
+
+def get_bond_schedule(issue_date_ql, maturity_date_ql, calendar=None):
+    calendar = calendar or ql.UnitedKingdom()
+    key = (calendar.name(), issue_date_ql.serialNumber(), maturity_date_ql.serialNumber())
+    schedule = _SCHEDULE_CACHE.get(key)
+    if schedule is not None:
+        _SCHEDULE_CACHE.move_to_end(key)
+        return schedule
+
+    schedule = ql.Schedule(
+        issue_date_ql, maturity_date_ql, ql.Period(ql.Semiannual), calendar,
+        ql.Following, ql.Following, ql.DateGeneration.Backward, False
+    )
+    _SCHEDULE_CACHE[key] = schedule
+    if len(_SCHEDULE_CACHE) > MAX_CACHED_SCHEDULES:
+        _SCHEDULE_CACHE.popitem(last=False)
+    return schedule
+
+def clear_schedule_cache():
+    _SCHEDULE_CACHE.clear()
+
+INVALID_DATE_ERROR = "Format de date invalide dans Issue Date ou Maturity"
+MATURED_ERROR = "Bond has reached maturity"
+
+def fixed_rate_bond(issue_date_ql, maturity_date_ql, coupon, calendar, day_count):
+    """Semi-annual gilt paying coupon (%, None for zero) between two valid dates."""
+    schedule = get_bond_schedule(issue_date_ql, maturity_date_ql, calendar)
+    coupon_rate = coupon / 100 if coupon is not None else 0.0
+    return ql.FixedRateBond(1, 100, schedule, [coupon_rate], day_count)
+
+def build_fixed_rate_bond(bond_data, eval_date_ql, calendar, day_count):
+    """Returns (bond, None), or (None, error message) when the bond cannot be priced."""
+    issue_date_ql = iso_date(bond_data['issue_date'])
+    maturity_date_ql = iso_date(bond_data['maturity_date'])
+
+    if issue_date_ql is None or maturity_date_ql is None:
+        return None, INVALID_DATE_ERROR
+
+    if eval_date_ql >= maturity_date_ql:
+        return None, MATURED_ERROR
+
+    return fixed_rate_bond(issue_date_ql, maturity_date_ql, bond_data['coupon'], calendar, day_count), None
+
+def universe_bonds(universe, eval_date_ql, calendar, day_count):
+    """
+    build_fixed_rate_bond for every row of an InstrumentUniverse, from its
+    serial and coupon columns: [(bond, None) or (None, error message)].
+    """
+    issue, maturity = universe.issue_serials, universe.maturity_serials
+    invalid = (issue == NO_SERIAL) | (maturity == NO_SERIAL)
+    matured = ~invalid & (maturity <= eval_date_ql.serialNumber())
+    coupons = np.where(np.isnan(universe.coupons), 0.0, universe.coupons)
+
+    built = []
+    for i, (issue_serial, maturity_serial, coupon) in enumerate(zip(issue.tolist(), maturity.tolist(), coupons.tolist())):
+        if invalid[i]:
+            built.append((None, INVALID_DATE_ERROR))
+        elif matured[i]:
+            built.append((None, MATURED_ERROR))
+        else:
+            built.append((fixed_rate_bond(ql.Date(issue_serial), ql.Date(maturity_serial), coupon,
+                                          calendar, day_count), None))
+    return built
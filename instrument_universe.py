@@ -0,0 +1,149 @@
+"""
+Array-backed gilt universe.
+
+temp/gilts.json is held as one NumPy structured array (ISIN, coupon,
+issue / maturity / next coupon serials, coupon frequency, outstanding
+amount) plus description, coupon schedule and as-given amount columns,
+instead of a list of dicts with string dates and amounts. Fields are parsed
+once at load (from the storage .npz copy when it is fresh); columns are
+views of the array, and ISINs resolve to rows through a dict.
+
+The universe is also a sequence of gilts.json records, built on access, so
+code that still takes bond_data dicts works unchanged:
+
+    universe = InstrumentUniverse.load("temp/gilts.json")
+    universe.maturity_serials                  # int64 view, no parsing
+    row = universe.index["GB00BHBFH458"]
+    universe[row]                              # {'isin': ..., 'amount': '35806.004', ...}
+"""
+import json
+
+import numpy as np
+
+from date_tables import NO_SERIAL, iso_to_serials, serials_to_iso
+from storage import instruments_to_columns, load_instrument_columns
+
+# Coupons per year when a record has no coupon schedule (gilts pay semi-annually)
+DEFAULT_FREQUENCY = 2
+
+
+def coupon_frequency(coupon_schedule):
+    """Coupons per year from a gilts.json coupon_schedule (list of 'MM-DD')."""
+    return len(coupon_schedule) if coupon_schedule else DEFAULT_FREQUENCY
+
+
+def instrument_dtype(isin_width=12):
+    return np.dtype([
+        ('isin', f'U{isin_width}'),
+        ('coupon', 'f8'),
+        ('issue', 'i8'),
+        ('maturity', 'i8'),
+        ('next_coupon', 'i8'),
+        ('frequency', 'i1'),
+        ('amount', 'f8'),
+    ])
+
+
+class InstrumentUniverse:
+    def __init__(self, data, descriptions, coupon_schedules, raw_amounts):
+        self.data = data
+        self.descriptions = descriptions
+        # JSON text per row, only decoded when a record is built: the coupon
+        # schedule, and the amount as given in gilts.json ('3500', 3500.0, 'n/a')
+        self.coupon_schedules = coupon_schedules
+        self.raw_amounts = raw_amounts
+        self.isins = data['isin']
+        # First occurrence wins for duplicated ISINs
+        self.index = {isin: i for i, isin in reversed(list(enumerate(self.isins.tolist())))}
+
+    @classmethod
+    def from_columns(cls, columns):
+        """From storage instrument columns (see storage.instruments_to_columns)."""
+        isins = columns['isin']
+        data = np.empty(len(isins), dtype=instrument_dtype(max(12, isins.dtype.itemsize // 4)))
+        data['isin'] = isins
+        data['coupon'] = columns['coupon']
+        data['issue'] = iso_to_serials(columns['issue_date'])
+        data['maturity'] = iso_to_serials(columns['maturity_date'])
+        data['next_coupon'] = iso_to_serials(columns['next_coupon_date'])
+        data['frequency'] = [coupon_frequency(json.loads(s)) for s in columns['coupon_schedule'].tolist()]
+        data['amount'] = columns['amount']
+        return cls(data, columns['description'], columns['coupon_schedule'], columns['amount_raw'])
+
+    @classmethod
+    def from_records(cls, gilts):
+        return cls.from_columns(instruments_to_columns(gilts))
+
+    @classmethod
+    def load(cls, json_path):
+        """Universe of a gilts.json file, read from its columnar copy when it is up to date."""
+        return cls.from_columns(load_instrument_columns(json_path))
+
+    # Columns (views of the structured array)
+    @property
+    def coupons(self):
+        return self.data['coupon']
+
+    @property
+    def issue_serials(self):
+        return self.data['issue']
+
+    @property
+    def maturity_serials(self):
+        return self.data['maturity']
+
+    @property
+    def next_coupon_serials(self):
+        return self.data['next_coupon']
+
+    @property
+    def frequencies(self):
+        return self.data['frequency']
+
+    @property
+    def amounts(self):
+        return self.data['amount']
+
+    def rows(self, isins):
+        """Row of each ISIN, -1 when it is not in the universe."""
+        return np.array([self.index.get(isin, -1) for isin in isins], dtype=np.int64)
+
+    def take(self, rows):
+        """Universe of the given rows, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return InstrumentUniverse(self.data[rows], self.descriptions[rows], self.coupon_schedules[rows],
+                                  self.raw_amounts[rows])
+
+    def iso_dates(self, field, rows=None):
+        """ISO strings of a serial column ('issue', 'maturity', 'next_coupon'), None where missing."""
+        serials = self.data[field] if rows is None else self.data[field][rows]
+        return [None if s == NO_SERIAL else d for s, d in zip(serials.tolist(), serials_to_iso(serials).tolist())]
+
+    # Sequence of gilts.json records
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        row = self.data[i]
+        issue, maturity, next_coupon = (self.iso_dates(f, [i])[0] for f in ('issue', 'maturity', 'next_coupon'))
+        return {
+            'description': str(self.descriptions[i]),
+            'isin': str(row['isin']),
+            'coupon': None if np.isnan(row['coupon']) else float(row['coupon']),
+            'maturity_date': maturity,
+            'issue_date': issue,
+            'coupon_schedule': json.loads(str(self.coupon_schedules[i])),
+            'next_coupon_date': next_coupon,
+            'amount': json.loads(str(self.raw_amounts[i])),
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get(self, isin):
+        """Record of an ISIN, or None."""
+        row = self.index.get(isin)
+        return None if row is None else self[row]
@@ -0,0 +1,143 @@
+"""
+Instrumentation for the pricing pipeline: levelled logging, per-stage timers
+and counters, and an opt-in profiling trace.
+
+Pipeline modules log through get_logger(__name__), under the "gilts" logger.
+That logger sits at WARNING, so debug/info output (per-node, per-bond) is off
+unless configure(level="DEBUG") or the GILTS_LOG_LEVEL environment variable
+turns it on. Stages are timed and counters bumped with
+
+    with stage("pricing", bonds=len(bonds)):
+        ...
+    count("bonds_priced", len(bonds))
+
+which costs two perf_counter calls per stage, nothing per bond. With
+profiling on (configure(profile_dir=...) or GILTS_PROFILE_DIR), every stage
+call is also kept as an event and finish_run() writes
+<profile_dir>/trace_<label>_<timestamp>.json: Chrome trace-event format
+(chrome://tracing, Perfetto) plus the stage totals and counters.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+ROOT_LOGGER = "gilts"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_root_logger = logging.getLogger(ROOT_LOGGER)
+_root_logger.setLevel(logging.WARNING)
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class Recorder:
+    """Accumulated stage timings and counters of the current run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profile_dir = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.stages = {}
+            self.counters = Counter()
+            self.events = []
+
+    @contextmanager
+    def stage(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                calls, total = self.stages.get(name, (0, 0.0))
+                self.stages[name] = (calls + 1, total + end - start)
+                if self.profile_dir:
+                    self.events.append({
+                        'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                        'ts': (start - self.started) * 1e6, 'dur': (end - start) * 1e6, 'args': args,
+                    })
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'wall_time': time.perf_counter() - self.started,
+                'stages': {name: {'calls': calls, 'seconds': total}
+                           for name, (calls, total) in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def write_trace(self, label):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(self.profile_dir, f"trace_{label}_{stamp}.json")
+        summary = self.snapshot()
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'label': label, 'pid': os.getpid(),
+                       **summary}, f, default=str)
+        return path
+
+
+_recorder = Recorder()
+
+
+def configure(level=None, profile_dir=None):
+    """
+    Log level (name or number) for the "gilts" loggers and profiling output
+    directory; None falls back to GILTS_LOG_LEVEL / GILTS_PROFILE_DIR.
+    Resets the current run's timers.
+    """
+    level = level or os.environ.get("GILTS_LOG_LEVEL")
+    if level:
+        _root_logger.setLevel(level.upper() if isinstance(level, str) else level)
+        if not _root_logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            _root_logger.addHandler(handler)
+            _root_logger.propagate = False
+    _recorder.profile_dir = profile_dir or os.environ.get("GILTS_PROFILE_DIR") or None
+    _recorder.reset()
+
+
+def stage(name, **args):
+    return _recorder.stage(name, **args)
+
+
+def count(name, n=1):
+    _recorder.count(name, n)
+
+
+def snapshot():
+    return _recorder.snapshot()
+
+
+def finish_run(label="run"):
+    """Log the stage timings and counters; write the trace file when profiling. Returns its path or None."""
+    summary = _recorder.snapshot()
+    log = get_logger("instrumentation")
+    if log.isEnabledFor(logging.INFO):
+        for name, s in summary['stages'].items():
+            log.info("%-12s %4d appel(s) %9.4f s", name, s['calls'], s['seconds'])
+        for name, n in summary['counters'].items():
+            log.info("%-12s %d", name, n)
+    if not _recorder.profile_dir:
+        return None
+    path = _recorder.write_trace(label)
+    log.info("Trace écrite dans %s", path)
+    return path
@@ -0,0 +1,100 @@
+"""
+Key-rate durations and bucketed PV01 on the spot curve's `year` nodes.
+
+The spot curve is wrapped once in a spreaded term structure carrying one
+SimpleQuote zero spread per node (linear in time between nodes, flat
+outside, like the ZeroCurve's own interpolation). Bumping a node is a
+quote change: every bond priced off the wrapped handle is repriced
+without rebuilding any curve.
+"""
+import numpy as np
+import pandas as pd
+import QuantLib as ql
+
+from gilt_builders import build_fixed_rate_bond, spot_node_date, spot_node_dates
+
+KEY_RATE_BUMP = 0.0001
+
+
+class KeyRateCurve:
+    def __init__(self, curve_handle, years, node_dates):
+        self.years = [float(y) for y in years]
+        self.base = ql.RelinkableYieldTermStructureHandle(curve_handle.currentLink())
+        self.quotes = [ql.SimpleQuote(0.0) for _ in node_dates]
+        spreaded = ql.SpreadedLinearZeroInterpolatedTermStructure(
+            self.base, [ql.QuoteHandle(q) for q in self.quotes], list(node_dates),
+            ql.Continuous, ql.NoFrequency, curve_handle.dayCounter()
+        )
+        spreaded.enableExtrapolation()
+        self.handle = ql.YieldTermStructureHandle(spreaded)
+
+    @classmethod
+    def from_spot_list(cls, curve_handle, eval_date_ql, spot_list, calendar=None):
+        years = sorted({float(e['year']) for e in spot_list if float(e['year']) > 0})
+        if calendar is None:
+            return cls(curve_handle, years, spot_node_dates(eval_date_ql, years))
+        return cls(curve_handle, years, [spot_node_date(eval_date_ql, y, calendar) for y in years])
+
+    def relink(self, curve_handle):
+        """Point the bumps at another curve with the same nodes (e.g. an intraday update)."""
+        self.base.linkTo(curve_handle.currentLink())
+
+    def reset(self):
+        for quote in self.quotes:
+            quote.setValue(0.0)
+
+    def bucket_pv01(self, bonds, bump=KEY_RATE_BUMP):
+        """
+        Clean prices and a (bonds x nodes) matrix of clean price changes for a
+        `bump` fall of each node's zero rate, one node at a time. The bonds are
+        attached to the bumped handle.
+        """
+        engine = ql.DiscountingBondEngine(self.handle)
+        for bond in bonds:
+            bond.setPricingEngine(engine)
+
+        self.reset()
+        base = np.array([bond.cleanPrice() for bond in bonds])
+        pv01 = np.empty((len(bonds), len(self.quotes)))
+        try:
+            for k, quote in enumerate(self.quotes):
+                quote.setValue(-bump)
+                pv01[:, k] = [bond.cleanPrice() for bond in bonds]
+                quote.setValue(0.0)
+        finally:
+            self.reset()
+        return base, pv01 - base[:, None]
+
+
+def key_rate_table(bond_data_list, eval_date_ql, curve_handle, spot_list, bump=KEY_RATE_BUMP):
+    """
+    One row per bond with 'KR01_<year>y' (price change per 100 for a 1bp fall
+    of the node) and 'KRD_<year>y' (key-rate duration) columns. The KR01s add
+    up to the parallel PV01 of the curve, to first order.
+    """
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    curve = KeyRateCurve.from_spot_list(curve_handle, eval_date_ql, spot_list)
+
+    rows, bonds = [], []
+    for bond_data in bond_data_list:
+        bond, error = build_fixed_rate_bond(bond_data, eval_date_ql, calendar, day_count)
+        if error is None:
+            rows.append(bond_data)
+            bonds.append(bond)
+
+    _, pv01 = curve.bucket_pv01(bonds, bump)
+    dirty = np.array([bond.dirtyPrice() for bond in bonds])
+    durations = pv01 / (dirty[:, None] * bump)
+
+    kr01 = pv01 * (0.0001 / bump)
+
+    labels = [f"{y:g}y" for y in curve.years]
+    table = pd.DataFrame({
+        'isin': [r.get('isin') for r in rows],
+        'description': [r.get('description') for r in rows],
+        'KR01 Total': kr01.sum(axis=1),
+    })
+    kr01 = pd.DataFrame(kr01, columns=[f"KR01_{l}" for l in labels])
+    krd = pd.DataFrame(durations, columns=[f"KRD_{l}" for l in labels])
+    return pd.concat([table, kr01, krd], axis=1)
@@ -0,0 +1,150 @@
+"""
+Portfolio analytics from the constituents' actual cashflows.
+
+Portfolio/isin.json lists holdings as nominal amounts per ISIN, in any of
+these layouts:
+
+    {"isins": ["GB00...", ...]}                         100 nominal each
+    {"isins": [...], "nominals": [...]}
+    {"holdings": {"GB00...": 1000000, ...}}
+    {"portfolios": {"Core": {"GB00...": 1000000}, "Short": ["GB00...", ...]}}
+
+ISINs are resolved through the CashflowMatrix's hashed index. Each
+portfolio's cashflows are the nominal-weighted sum of its bonds' cashflows,
+and price, yield, modified duration, convexity and PV01 of every portfolio
+are computed from the merged streams in one pass of the universe yield
+solver. Portfolio yields discount on Actual/Actual (ISDA) times from
+settlement, compounded semi-annually like the gilt yields.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import QuantLib as ql
+
+from bond_cashflows import CashflowMatrix
+from gilt_builders import universe_bonds
+from instrument_universe import InstrumentUniverse
+from yield_solver import solve_yields, yield_metrics
+
+DEFAULT_NOMINAL = 100.0
+
+
+def load_portfolios(path):
+    """{portfolio name: {isin: nominal}} from Portfolio/isin.json."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    def holdings(entry):
+        if isinstance(entry, dict):
+            return {isin: float(n) for isin, n in entry.items()}
+        return {isin: DEFAULT_NOMINAL for isin in entry}
+
+    if 'portfolios' in data:
+        return {name: holdings(entry) for name, entry in data['portfolios'].items()}
+    if 'holdings' in data:
+        return {'Portfolio': holdings(data['holdings'])}
+    nominals = data.get('nominals') or [DEFAULT_NOMINAL] * len(data['isins'])
+    return {'Portfolio': {isin: float(n) for isin, n in zip(data['isins'], nominals)}}
+
+
+class PortfolioAnalytics:
+    def __init__(self, gilts, eval_date_ql, curve_handle):
+        """gilts: InstrumentUniverse, or a list of gilts.json records."""
+        calendar = ql.UnitedKingdom()
+        day_count = ql.ActualActual(ql.ActualActual.ISMA)
+        self.settlement_date = calendar.advance(eval_date_ql, 1, ql.Days)
+        if not isinstance(gilts, InstrumentUniverse):
+            gilts = InstrumentUniverse.from_records(gilts)
+
+        # First record of each ISIN, if it can be priced
+        rows, bonds = [], []
+        for row, (bond, error) in enumerate(universe_bonds(gilts, eval_date_ql, calendar, day_count)):
+            if error is None and gilts.index[gilts.isins[row]] == row:
+                rows.append(row)
+                bonds.append(bond)
+        self.gilts = gilts.take(rows)
+
+        self.matrix = CashflowMatrix.from_bonds(self.gilts.isins.tolist(), bonds, self.settlement_date)
+        self.accrued = np.array([bond.accruedAmount(self.settlement_date) for bond in bonds])
+        self.dirty_prices = self.matrix.dirty_prices(curve_handle, self.settlement_date)
+        self.clean_prices = self.dirty_prices - self.accrued
+
+        isda = ql.ActualActual(ql.ActualActual.ISDA)
+        self.times = np.array([isda.yearFraction(self.settlement_date, ql.Date(int(d))) for d in self.matrix.dates])
+        self._dense = None
+
+    def weight_matrix(self, portfolios):
+        """(portfolios x bonds) nominal / 100 weights, and the ISINs not found per portfolio."""
+        weights = np.zeros((len(portfolios), len(self.matrix.isins)))
+        missing = {}
+        for p, (name, holdings) in enumerate(portfolios.items()):
+            for isin, nominal in holdings.items():
+                row = self.matrix.index.get(isin)
+                if row is None:
+                    missing.setdefault(name, []).append(isin)
+                else:
+                    weights[p, row] += nominal / 100.0
+        return weights, missing
+
+    def merged_cashflows(self, weights):
+        """(portfolios x dates) cashflows of the weighted portfolios."""
+        if self._dense is None:
+            self._dense = self.matrix.to_dense()
+        return np.atleast_2d(weights) @ self._dense
+
+    def analyse(self, portfolios):
+        """
+        One row per portfolio: nominal, clean/dirty market value, clean price
+        per 100 nominal, yield (%), modified duration, convexity and PV01
+        (value change for a 1bp fall in the portfolio yield).
+        """
+        names = list(portfolios)
+        weights, missing = self.weight_matrix(portfolios)
+        amounts = self.merged_cashflows(weights)
+        times = np.broadcast_to(self.times, amounts.shape)
+
+        dirty = weights @ self.dirty_prices
+        accrued = weights @ self.accrued
+        yields, _ = solve_yields(times, amounts, accrued, dirty - accrued)
+        metrics = yield_metrics(times, amounts, accrued, yields)
+        nominal = weights.sum(axis=1) * 100
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            clean_price = np.where(nominal > 0, (dirty - accrued) / nominal * 100, np.nan)
+
+        return pd.DataFrame({
+            'portfolio': names,
+            'bonds': (weights > 0).sum(axis=1),
+            'missing': [len(missing.get(n, [])) for n in names],
+            'Nominal': nominal,
+            'Clean Value': dirty - accrued,
+            'Dirty Value': dirty,
+            'Clean Price': clean_price,
+            'Yield': yields * 100,
+            'Modified Duration': metrics['modified_duration'],
+            'Convexity': metrics['convexity'],
+            'PV01': metrics['pv01'],
+        })
+
+    def constituents(self, holdings):
+        """Per-bond rows of one portfolio: static data, nominal, prices and market value."""
+        held = [(isin, nominal, self.matrix.index[isin]) for isin, nominal in holdings.items()
+                if isin in self.matrix.index]
+        if not held:
+            return pd.DataFrame()
+        isins, nominals, rows = (list(column) for column in zip(*held))
+        nominals = np.array(nominals)
+        coupons = self.gilts.coupons[rows]
+        return pd.DataFrame({
+            'description': self.gilts.descriptions[rows],
+            'isin': isins,
+            'coupon': np.where(np.isnan(coupons), None, coupons),
+            'maturity_date': self.gilts.iso_dates('maturity', rows),
+            'issue_date': self.gilts.iso_dates('issue', rows),
+            'next_coupon_date': self.gilts.iso_dates('next_coupon', rows),
+            'amount': self.gilts.amounts[rows],
+            'Nominal': nominals,
+            'Clean Price': self.clean_prices[rows],
+            'Dirty Value': self.dirty_prices[rows] * nominals / 100.0,
+        })
@@ -0,0 +1,299 @@
+"""
+Long-lived local pricing service for the Angular single-gilt and multi-gilt
+pages.
+
+The gilt universe and the spot curves are kept in memory; the curves are
+reloaded when SpotRates.json changes. Priced results are cached per (ISIN,
+evaluation date) in a bounded LRU that is emptied on every curve reload, and
+every request is answered from the existing pricing and projection functions:
+
+    GET  /health
+    GET  /gilts
+    GET  /price?isin=...&eval_date=YYYY-MM-DD
+    POST /price        {"isin": ...} or {"coupon", "issue_date", "maturity_date"[, "eval_date"]}
+    POST /analytics    same body, plus optional "shifts" (decimal yield shifts; comma-separated on GET)
+    GET  /cashflows?isin=...&eval_date=...
+    POST /projection   data.json body: one bond (projection.py), {"bonds": [...]} (portfolio)
+                       or {"portfolios": {name: [...]}} (several portfolios)
+
+    python pricing_service.py --port 8000
+"""
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import QuantLib as ql
+
+from calculate_bonds import price_and_analyze_bond_with_spot
+from date_tables import NO_SERIAL, iso_serial
+from gilt_builders import get_spot_curve_store
+from instrument_universe import InstrumentUniverse
+from projection import project_bond_values
+from projection_portfolio import (PortfolioProjector, generate_projection_dates, project_portfolio_bands,
+                                  project_portfolios)
+from sensitivities import DEFAULT_YIELD_SHIFTS, sensitivity_grid, shift_label
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+
+
+class ServiceError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_shifts(value):
+    """Yield shifts from a JSON list or a comma-separated query string ("-0.01,0,0.01")."""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            return [float(v) for v in value.split(',') if v.strip()]
+        return [float(v) for v in value]
+    except (TypeError, ValueError):
+        raise ServiceError(f"shifts invalides : {value!r}")
+
+
+class PricingService:
+    def __init__(self, gilts_path=default_gilts_path, spot_path=default_spot_path, max_cached_results=20000):
+        self.gilts = InstrumentUniverse.load(gilts_path)
+        self.curves = get_spot_curve_store(spot_path)
+        self._curve_generation = self.curves.generation
+        self.calendar = ql.UnitedKingdom()
+        self.day_count = ql.ActualActual(ql.ActualActual.ISMA)
+        self.max_cached_results = max_cached_results
+        self._results = OrderedDict()
+        # QuantLib's evaluation date is process-global: one pricing at a time
+        self._lock = threading.Lock()
+
+    def _refresh_curves(self):
+        """Reload the curves if SpotRates.json changed, dropping results priced on the old ones. Hold self._lock."""
+        self.curves = get_spot_curve_store(self.curves.filename)
+        if self.curves.generation != self._curve_generation:
+            self._curve_generation = self.curves.generation
+            self._results.clear()
+
+    def _latest_curve_date(self):
+        if not self.curves.dates:
+            raise ServiceError("Aucune courbe spot disponible", 503)
+        return self.curves.dates[-1]
+
+    def default_eval_date(self):
+        with self._lock:
+            self._refresh_curves()
+            return self._latest_curve_date()
+
+    def bond_from_request(self, payload):
+        isin = payload.get('isin')
+        if isin and isin in self.gilts.index and 'coupon' not in payload:
+            return self.gilts.get(isin)
+
+        # Champs du formulaire Angular (camelCase) ou de gilts.json (snake_case)
+        try:
+            return {
+                'description': payload.get('description') or payload.get('name') or isin or 'Custom gilt',
+                'isin': isin or 'CUSTOM',
+                'coupon': float(payload['coupon']),
+                'issue_date': payload.get('issue_date') or payload['issueDate'],
+                'maturity_date': payload.get('maturity_date') or payload['maturityDate'],
+            }
+        except (KeyError, TypeError, ValueError):
+            if isin and isin not in self.gilts.index:
+                raise ServiceError(f"ISIN inconnu : {isin}", 404)
+            raise ServiceError("Il faut un ISIN connu ou coupon, issue_date et maturity_date")
+
+    def price(self, bond_data, eval_date_str=None):
+        if eval_date_str and iso_serial(eval_date_str) == NO_SERIAL:
+            raise ServiceError(f"eval_date invalide (YYYY-MM-DD attendu) : {eval_date_str}")
+        with self._lock:
+            self._refresh_curves()
+            eval_date_str = eval_date_str or self._latest_curve_date()
+            key = (bond_data['isin'], bond_data['coupon'], bond_data['issue_date'],
+                   bond_data['maturity_date'], eval_date_str)
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+            try:
+                curve_handle = self.curves.curve_handle(eval_date_str)
+            except ValueError as e:
+                raise ServiceError(str(e), 422)
+            eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+            ql.Settings.instance().evaluationDate = eval_date_ql
+            result = price_and_analyze_bond_with_spot(
+                bond_data, eval_date_ql, curve_handle,
+                calendar=self.calendar, day_count=self.day_count,
+                settlement_date=self.calendar.advance(eval_date_ql, 1, ql.Days)
+            )
+
+            result['eval_date'] = eval_date_str
+            self._results[key] = result
+            if len(self._results) > self.max_cached_results:
+                self._results.popitem(last=False)
+        return result
+
+    def summary(self, result):
+        """Metrics without cashflows, plus the short names used by the single-gilt page."""
+        summary = {k: v for k, v in result.items() if k != 'Cashflows'}
+        if 'Error' not in result:
+            summary.update({
+                'ytm': result['Implied Yield'],
+                'cleanPrice': result['Clean Price Calculated'],
+                'dirtyPrice': result['Dirty Price Calculated'],
+                'duration': result['Modified Duration Calculated'],
+            })
+        return summary
+
+    def analytics(self, result, shifts=None):
+        summary = self.summary(result)
+        if 'Error' in result:
+            return summary
+        shifts = np.asarray(shifts if shifts is not None else DEFAULT_YIELD_SHIFTS, dtype=float)
+        prices, deltas, deltas_pct = sensitivity_grid(
+            [result['Clean Price Calculated']], [result['Modified Duration Calculated']],
+            [result['Convexity Calculated']], shifts
+        )
+        summary['Sensitivities'] = [
+            {'shift': float(dy), 'label': shift_label(dy), 'price': float(p), 'delta': float(d), 'delta_pct': float(dp)}
+            for dy, p, d, dp in zip(shifts, prices[0], deltas[0], deltas_pct[0])
+        ]
+        return summary
+
+    def _stochastic(self, payload, portfolios, dates):
+        try:
+            return project_portfolio_bands(payload['stochastic'], portfolios, dates, payload['evolution_date'],
+                                           spot_path=self.curves.filename)
+        except ValueError as e:
+            raise ServiceError(str(e), 422)
+
+    def projection(self, payload):
+        with self._lock:
+            if 'portfolios' in payload:
+                dates = generate_projection_dates(payload['evolution_date'], payload['proj_frequency'])
+                if not dates:
+                    raise ServiceError("Aucune date de projection générée")
+                portfolios = {name: p['bonds'] if isinstance(p, dict) else p
+                              for name, p in payload['portfolios'].items()}
+                response = {'portfolios': project_portfolios(portfolios, dates)}
+                if payload.get('stochastic'):
+                    response['stochastic'] = self._stochastic(payload, portfolios, dates)
+                return response
+            if 'bonds' in payload:
+                dates = generate_projection_dates(payload['evolution_date'], payload['proj_frequency'])
+                if not dates:
+                    raise ServiceError("Aucune date de projection générée")
+                projector = PortfolioProjector(payload['bonds'])
+                if payload.get('per_bond'):
+                    projections, bond_projections = projector.project(dates, per_bond=True)
+                    response = {'projections': projections, 'bond_projections': bond_projections}
+                else:
+                    response = {'projections': projector.project(dates)}
+                if payload.get('stochastic'):
+                    response['stochastic'] = self._stochastic(payload, {'Portfolio': payload['bonds']}, dates)
+                return response
+            try:
+                return {'projections': project_bond_values(payload)}
+            except ValueError as e:
+                raise ServiceError(str(e), 422)
+
+
+def make_handler(service):
+    class PricingRequestHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body, default=float).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _payload(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length))
+            except json.JSONDecodeError:
+                raise ServiceError("Corps JSON invalide")
+
+        def _dispatch(self, method):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            payload = {**query, **(self._payload() if method == 'POST' else {})}
+            route = (method, url.path.rstrip('/') or '/')
+
+            if route == ('GET', '/health'):
+                latest = service.default_eval_date()
+                return {'status': 'ok', 'gilts': len(service.gilts), 'curve_dates': len(service.curves.dates),
+                        'latest_curve_date': latest}
+            if route == ('GET', '/gilts'):
+                return list(service.gilts)
+            if route in (('GET', '/price'), ('POST', '/price')):
+                return service.summary(service.price(service.bond_from_request(payload), payload.get('eval_date')))
+            if route in (('GET', '/analytics'), ('POST', '/analytics')):
+                result = service.price(service.bond_from_request(payload), payload.get('eval_date'))
+                return service.analytics(result, parse_shifts(payload.get('shifts')))
+            if route in (('GET', '/cashflows'), ('POST', '/cashflows')):
+                result = service.price(service.bond_from_request(payload), payload.get('eval_date'))
+                return {'isin': result['isin'], 'eval_date': result['eval_date'],
+                        'Cashflows': result.get('Cashflows', []), 'Error': result.get('Error')}
+            if route == ('POST', '/projection'):
+                return service.projection(payload)
+            raise ServiceError(f"Route inconnue : {method} {url.path}", 404)
+
+        def _handle(self, method):
+            try:
+                self._send(200, self._dispatch(method))
+            except ServiceError as e:
+                self._send(e.status, {'Error': str(e)})
+            except Exception as e:
+                self._send(500, {'Error': str(e)})
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return PricingRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local pricing service for the gilt frontend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--gilts", default=default_gilts_path)
+    parser.add_argument("--spot", default=default_spot_path)
+    parser.add_argument("--warm", action='store_true', help="Price the whole universe at startup")
+    args = parser.parse_args()
+
+    service = PricingService(args.gilts, args.spot)
+    if args.warm:
+        for gilt in service.gilts:
+            service.price(gilt)
+    print(f"🚀 Service de pricing sur http://{args.host}:{args.port} "
+          f"({len(service.gilts)} gilts, {len(service.curves.dates)} dates de courbe)")
+    ThreadingHTTPServer((args.host, args.port), make_handler(service)).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
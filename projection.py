@@ -6,15 +6,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 import QuantLib as ql
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('projection.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from projection_engine import project_bond
+from short_rate_projection import project_bands
 
 # Get the base directory (where projection.py is located)
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -103,44 +96,38 @@ def project_bond_values(bond_data):
             projection_dates.append(current_date)
             current_date += delta
 
+        # Price every projection date at once from the bond's cashflow schedule, settling
+        # through the UK business-day table (date_tables) rather than calendar.advance
+        projection_dates_ql = [ql.Date(d.day, d.month, d.year) for d in projection_dates]
+        projected = project_bond(
+            bond, projection_dates_ql, implied_yield_decimal, day_count=day_count
+        )
+
         # Store projections
         projections = []
-
-        for proj_date in projection_dates:
-            proj_date_ql = ql.Date(proj_date.day, proj_date.month, proj_date.year)
-
-            # Set the evaluation date
-            ql.Settings.instance().evaluationDate = proj_date_ql
-
-            # Calculate settlement date
-            settlement_date = calendar.advance(proj_date_ql, 1, ql.Days)
-
+        for i, proj_date in enumerate(projection_dates):
             # Ensure settlement date is before maturity
-            if settlement_date >= maturity_date_ql:
+            if projected['settlement_serials'][i] >= maturity_date_ql.serialNumber():
                 logging.warning(f"Skipping projection for {proj_date.strftime('%Y-%m-%d')} as settlement date is on or after maturity")
                 continue
 
-            # Price the bond using the fixed implied yield
-            try:
-                clean_price = bond.cleanPrice(
-                    implied_yield_decimal, day_count, ql.Compounded, ql.Semiannual, settlement_date
-                )
-
-                # Calculate modified duration
-                modified_duration = ql.BondFunctions.duration(
-                    bond, implied_yield_decimal, day_count, ql.Compounded, ql.Semiannual,
-                    ql.Duration.Modified, settlement_date
-                )
-
-                # Add to projections
-                projections.append({
-                    "Projection Date": proj_date.strftime('%Y-%m-%d'),
-                    "Clean Price Projected": round(clean_price, 6),
-                    "Modified Duration Projected": round(modified_duration, 6)
-                })
-            except Exception as e:
-                logging.error(f"Failed to project for date {proj_date.strftime('%Y-%m-%d')}: {str(e)}")
-                continue
+            projections.append({
+                "Projection Date": proj_date.strftime('%Y-%m-%d'),
+                "Clean Price Projected": round(float(projected['clean_price'][i]), 6),
+                "Modified Duration Projected": round(float(projected['modified_duration'][i]), 6)
+            })
+
+        # Optional Monte Carlo bands under a short-rate model calibrated to SpotRates.json
+        stochastic = bond_data.get('stochastic')
+        if stochastic and projections:
+            bands = project_bands(
+                stochastic, [isin], [bond], [p["Projection Date"] for p in projections], evolution_date,
+                day_count=day_count, settlement_days=1
+            )
+            logging.info(f"Stochastic projection parameters: {bands['model']}")
+            bands_by_date = {row.pop("Projection Date"): row for row in bands['bonds'][isin]}
+            for p in projections:
+                p.update(bands_by_date.get(p["Projection Date"], {}))
 
         return projections
 
@@ -181,4 +168,14 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Set up logging here rather than on import, so that importing
+    # project_bond_values (pricing service, benchmarks) leaves logging alone
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('projection.log'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
     main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import numpy as np
+import QuantLib as ql
+
+from bond_cashflows import CashflowSchedule
+from date_tables import settlement_serials
+
+
+def projection_settlement_serials(projection_dates_ql, calendar=None, settlement_days=1):
+    """Settlement serials of the projection dates; UK business-day table lookup unless a calendar is given."""
+    if calendar is None:
+        serials = np.array([d.serialNumber() for d in projection_dates_ql], dtype=np.int64)
+        return settlement_serials(serials, settlement_days)
+    return np.array([calendar.advance(d, settlement_days, ql.Days).serialNumber() for d in projection_dates_ql],
+                    dtype=np.int64)
+
+
+def project_at_yield(schedule, settlement_serials, yield_decimal, frequency=2):
+    """
+    Clean price, dirty price, accrued and modified duration of one bond at a
+    fixed yield for every settlement date at once (compounded at `frequency`).
+    Dates on or after the last cashflow come back as NaN.
+    Returns a dict of arrays aligned with settlement_serials.
+    """
+    t, alive = schedule.times(settlement_serials)
+    discount = np.where(alive, (1 + yield_decimal / frequency) ** (-frequency * t), 0.0)
+    flows = schedule.amounts[None, :] * discount
+
+    dirty = flows.sum(axis=1)
+    accrued = schedule.accrued(settlement_serials)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = (flows * t).sum(axis=1) / (1 + yield_decimal / frequency) / dirty
+
+    matured = ~alive.any(axis=1)
+    nan = np.full(len(dirty), np.nan)
+    return {
+        'clean_price': np.where(matured, nan, dirty - accrued),
+        'dirty_price': np.where(matured, nan, dirty),
+        'accrued': np.where(matured, nan, accrued),
+        'modified_duration': np.where(matured, nan, duration),
+    }
+
+
+def project_bond(bond, projection_dates_ql, yield_decimal, day_count=None, calendar=None,
+                 settlement_days=1, frequency=2):
+    """Extract the bond's cashflows once and project it over all dates."""
+    day_count = day_count or ql.ActualActual(ql.ActualActual.ISMA)
+    schedule = CashflowSchedule(bond, day_count)
+    settlement = projection_settlement_serials(projection_dates_ql, calendar, settlement_days)
+    projected = project_at_yield(schedule, settlement, yield_decimal, frequency)
+    projected['settlement_serials'] = settlement
+    return projected
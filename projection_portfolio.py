@@ -1,8 +1,15 @@
 import json
 import os
 from datetime import datetime, timedelta
+import numpy as np
 import QuantLib as ql
 
+from date_tables import NO_SERIAL, iso_serial
+from instrumentation import get_logger
+from short_rate_projection import default_spot_path, project_bands
+
+log = get_logger(__name__)
+
 
 def parse_date(date_str):
     try:
@@ -11,6 +18,14 @@ def parse_date(date_str):
         raise ValueError(f"Format de date invalide : {date_str}")
 
 
+def parse_serial(date_str):
+    """QuantLib serial of an ISO date (memoized), for dates reused across positions and portfolios."""
+    serial = iso_serial(date_str)
+    if serial == NO_SERIAL:
+        raise ValueError(f"Format de date invalide : {date_str}")
+    return serial
+
+
 def quantlib_date(dt):
     return ql.Date(dt.day, dt.month, dt.year)
 
@@ -38,111 +53,292 @@ def generate_projection_dates(evaluation_date, frequency):
     return dates
 
 
-def main():
-    data_file = os.path.join(os.getcwd(), 'Data', 'data.json')
-    output_file = os.path.join(os.getcwd(), 'Data', 'projection.json')
+class PortfolioProjector:
+    """
+    Projection engine for a portfolio of fixed-rate gilts.
+    Each bond is built once, priced off a FlatForward curve driven by its own
+    yield SimpleQuote through a relinkable handle, so moving through the
+    projection dates only moves the evaluation date.
+    """
 
-    try:
-        with open(data_file, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"[ERREUR] Lecture de data.json : {e}")
-        return
-
-    evaluation_date = data['evolution_date']
-    proj_frequency = data['proj_frequency']
-    bonds = data['bonds']
-
-    projection_dates = generate_projection_dates(evaluation_date, proj_frequency)
-    if not projection_dates:
-        print("[ERREUR] Aucune date de projection générée.")
-        return
-
-    day_count = ql.ActualActual(ql.ActualActual.Bond)
-    projections = []
-
-    for proj_date in projection_dates:
-        print(f"\n🟡 Projection pour la date : {proj_date}")
-
-        total_clean_price = 0
-        total_modified_duration = 0
-        total_dirty_price = 0
+    def __init__(self, bonds, day_count=None, settlement_days=2):
+        self.day_count = day_count or ql.ActualActual(ql.ActualActual.Bond)
+        self.calendar = ql.UnitedKingdom()
+        self.positions = []
 
         for bond in bonds:
             try:
                 isin = bond['isin']
-                dirty_price = float(bond['dirty_price'])
-                clean_price = float(bond['clean_price'])
-                coupon = float(bond['coupon']) / 100.0
-                implied_yield = float(bond['implied_yield'])
                 maturity_date = parse_date(bond['maturity_date'])
                 issue_date = parse_date(bond['issue_date'])
+                coupon = float(bond['coupon']) / 100.0
+                implied_yield = float(bond['implied_yield'])
 
-                if parse_date(proj_date) > maturity_date:
-                    print(f"⏩ ISIN {isin} ignoré (projection > maturité: {maturity_date})")
-                    continue
-
-                # Setup bond
-                calendar = ql.UnitedKingdom()
                 schedule = ql.Schedule(
                     quantlib_date(issue_date),
                     quantlib_date(maturity_date),
                     ql.Period(ql.Semiannual),
-                    calendar,
+                    self.calendar,
                     ql.Following, ql.Following,
                     ql.DateGeneration.Backward, False
                 )
+                bond_obj = ql.FixedRateBond(settlement_days, 100.0, schedule, [coupon], self.day_count)
+
+                # La courbe suit la date d'évaluation (NullCalendar : pas d'ajustement)
+                yield_quote = ql.SimpleQuote(implied_yield)
+                curve_handle = ql.RelinkableYieldTermStructureHandle()
+                curve_handle.linkTo(ql.FlatForward(
+                    0, ql.NullCalendar(), ql.QuoteHandle(yield_quote),
+                    self.day_count, ql.Compounded, ql.Semiannual
+                ))
+                bond_obj.setPricingEngine(ql.DiscountingBondEngine(curve_handle))
+
+                self.positions.append({
+                    'isin': isin,
+                    'implied_yield': implied_yield,
+                    'weight': float(bond['dirty_price']),
+                    'maturity_date': maturity_date,
+                    'maturity_serial': quantlib_date(maturity_date).serialNumber(),
+                    'bond': bond_obj,
+                    'yield_quote': yield_quote,
+                    'curve_handle': curve_handle,
+                })
+            except Exception as e:
+                log.error("Erreur ISIN %s : %s", bond.get('isin', '???'), e)
+
+    def set_yield(self, isin, implied_yield):
+        for position in self.positions:
+            if position['isin'] == isin:
+                position['yield_quote'].setValue(implied_yield)
+
+    def price_grid(self, projection_dates):
+        """
+        (dates x positions) clean prices and modified durations over
+        projection_dates; NaN once a bond has matured or fails to price.
+        """
+        clean = np.full((len(projection_dates), len(self.positions)), np.nan)
+        duration = np.full_like(clean, np.nan)
+        saved_evaluation_date = ql.Settings.instance().evaluationDate
+
+        try:
+            for i, proj_serial in enumerate([parse_serial(d) for d in projection_dates]):
+                ql.Settings.instance().evaluationDate = ql.Date(proj_serial)
+
+                for j, position in enumerate(self.positions):
+                    if proj_serial > position['maturity_serial']:
+                        continue
+                    try:
+                        proj_clean = position['bond'].cleanPrice()
+                        proj_dur = ql.BondFunctions.duration(
+                            position['bond'], position['yield_quote'].value(), self.day_count,
+                            ql.Compounded, ql.Semiannual,
+                            ql.Duration.Modified
+                        )
+                    except Exception as e:
+                        log.error("Erreur ISIN %s : %s", position['isin'], e)
+                        continue
+                    clean[i, j] = proj_clean
+                    duration[i, j] = proj_dur
+        finally:
+            ql.Settings.instance().evaluationDate = saved_evaluation_date
+
+        return clean, duration
+
+    def project(self, projection_dates, per_bond=False):
+        """
+        Weighted clean price and modified duration path over projection_dates
+        (ISO strings). With per_bond=True also returns each bond's own path,
+        keyed by ISIN.
+        """
+        clean, duration = self.price_grid(projection_dates)
+        weights = WeightMatrix.from_holdings(
+            [[(j, p['weight']) for j, p in enumerate(self.positions)]], len(self.positions))
+        projections = weights.projections(projection_dates, clean, duration)[0]
+
+        if not per_bond:
+            return projections
+        bond_paths = {p['isin']: [] for p in self.positions}
+        for j, position in enumerate(self.positions):
+            for i, proj_date in enumerate(projection_dates):
+                if np.isfinite(clean[i, j]):
+                    bond_paths[position['isin']].append({
+                        "Projection Date": proj_date,
+                        "Clean Price Projected": round(float(clean[i, j]), 6),
+                        "Modified Duration Projected": round(float(duration[i, j]), 6)
+                    })
+        return projections, bond_paths
+
+
+class WeightMatrix:
+    """
+    Sparse (portfolios x unique bonds) weight matrix, stored CSR-style like
+    bond_cashflows.CashflowMatrix: portfolio p owns entries
+    offsets[p]:offsets[p+1] of `columns` (bond index) and `weights`.
+    """
+
+    def __init__(self, offsets, columns, weights, n_bonds):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=float)
+        self.n_bonds = n_bonds
+
+    @classmethod
+    def from_holdings(cls, holdings, n_bonds):
+        """holdings: one [(bond index, weight), ...] list per portfolio."""
+        offsets, columns, weights = [0], [], []
+        for portfolio in holdings:
+            columns.extend(j for j, _ in portfolio)
+            weights.extend(w for _, w in portfolio)
+            offsets.append(len(columns))
+        return cls(offsets, columns, weights, n_bonds)
+
+    def weighted_sums(self, grid):
+        """(dates x portfolios) weighted sums of a (dates x bonds) grid."""
+        grid = np.atleast_2d(grid)
+        sums = np.zeros((grid.shape[0], len(self.offsets) - 1))
+        non_empty = np.flatnonzero(np.diff(self.offsets) > 0)
+        if non_empty.size:
+            sums[:, non_empty] = np.add.reduceat(grid[:, self.columns] * self.weights,
+                                                 self.offsets[non_empty], axis=1)
+        return sums
+
+    def projections(self, projection_dates, clean, duration):
+        """Per portfolio, the weighted clean price / duration path over the active bonds."""
+        active = np.isfinite(clean)
+        total_weight = self.weighted_sums(active.astype(float))
+        total_clean = self.weighted_sums(np.where(active, clean, 0.0))
+        total_duration = self.weighted_sums(np.where(active, duration, 0.0))
+
+        paths = []
+        for p in range(total_weight.shape[1]):
+            path = []
+            for i, proj_date in enumerate(projection_dates):
+                if total_weight[i, p] > 0:
+                    path.append({
+                        "Projection Date": proj_date,
+                        "Clean Price Projected": round(float(total_clean[i, p] / total_weight[i, p]), 6),
+                        "Modified Duration Projected": round(float(total_duration[i, p] / total_weight[i, p]), 6)
+                    })
+                else:
+                    log.warning("Aucune obligation active pour %s. Ignorée.", proj_date)
+            paths.append(path)
+        return paths
+
+
+def holding_key(bond):
+    """(ISIN, implied yield) of a data.json holding: holdings priced identically share a column."""
+    try:
+        return bond['isin'], float(bond['implied_yield'])
+    except (KeyError, TypeError, ValueError):
+        return bond.get('isin'), None
+
+
+def portfolio_weights(portfolios, day_count=None, settlement_days=2):
+    """
+    PortfolioProjector over the unique (ISIN, implied yield) holdings of
+    portfolios ({name: bonds list as in data.json}) and their WeightMatrix.
+    An ISIN held at different yields in different portfolios gets one
+    position per yield. A holding's weight is its dirty price, scaled by
+    nominal / 100 when given.
+    """
+    unique = {}
+    for bonds in portfolios.values():
+        for bond in bonds:
+            unique.setdefault(holding_key(bond), bond)
+
+    projector = PortfolioProjector(list(unique.values()), day_count, settlement_days)
+    column = {(p['isin'], p['implied_yield']): j for j, p in enumerate(projector.positions)}
+    holdings = [
+        [(column[holding_key(b)], float(b['dirty_price']) * float(b.get('nominal', 100.0)) / 100.0)
+         for b in bonds if holding_key(b) in column]
+        for bonds in portfolios.values()
+    ]
+    return projector, WeightMatrix.from_holdings(holdings, len(projector.positions))
+
+
+def project_portfolios(portfolios, projection_dates, day_count=None, settlement_days=2):
+    """
+    Projection of many portfolios with overlapping holdings: each unique
+    holding (ISIN, implied yield) is built and priced once per date, and every portfolio path comes from one
+    sparse weight matrix product.
+    """
+    projector, weights = portfolio_weights(portfolios, day_count, settlement_days)
+    clean, duration = projector.price_grid(projection_dates)
+    return dict(zip(portfolios, weights.projections(projection_dates, clean, duration)))
+
+
+def project_portfolio_bands(config, portfolios, projection_dates, evaluation_date, day_count=None,
+                            settlement_days=2, spot_path=default_spot_path):
+    """
+    Monte Carlo clean price bands (short_rate_projection) of every portfolio
+    and of its bonds, for a data.json "stochastic" config.
+    """
+    projector, weights = portfolio_weights(portfolios, day_count, settlement_days)
+    bands = project_bands(
+        config, [p['isin'] for p in projector.positions], [p['bond'] for p in projector.positions],
+        projection_dates, evaluation_date, weights, projector.day_count, settlement_days, spot_path
+    )
+    bands['portfolios'] = dict(zip(portfolios, bands['portfolios']))
+    return bands
 
-                bond_obj = ql.FixedRateBond(
-                    2, 100.0, schedule, [coupon], day_count
-                )
-
-                ql.Settings.instance().evaluationDate = quantlib_date(parse_date(proj_date))
-
-                flat_curve = ql.FlatForward(
-                    quantlib_date(parse_date(proj_date)),
-                    implied_yield, day_count,
-                    ql.Compounded, ql.Semiannual
-                )
-                engine = ql.DiscountingBondEngine(ql.YieldTermStructureHandle(flat_curve))
-                bond_obj.setPricingEngine(engine)
-
-                # Calculs
-                proj_clean = bond_obj.cleanPrice()
-                proj_dur = ql.BondFunctions.duration(
-                    bond_obj, implied_yield, day_count,
-                    ql.Compounded, ql.Semiannual,
-                    ql.Duration.Modified
-                )
-
-                total_clean_price += proj_clean * dirty_price
-                total_modified_duration += proj_dur * dirty_price
-                total_dirty_price += dirty_price
-
-                print(f"✅ ISIN {isin}: price={proj_clean:.4f}, dur={proj_dur:.4f}, weight={dirty_price:.2f}")
 
-            except Exception as e:
-                print(f"❌ Erreur ISIN {bond.get('isin', '???')} : {e}")
-                continue
+def main():
+    data_file = os.path.join(os.getcwd(), 'Data', 'data.json')
+    output_file = os.path.join(os.getcwd(), 'Data', 'projection.json')
 
-        if total_dirty_price > 0:
-            avg_clean_price = total_clean_price / total_dirty_price
-            avg_duration = total_modified_duration / total_dirty_price
+    try:
+        with open(data_file, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[ERREUR] Lecture de data.json : {e}")
+        return
 
-            projections.append({
-             "Projection Date": proj_date,
-             "Clean Price Projected": round(avg_clean_price, 6),
-              "Modified Duration Projected": round(avg_duration, 6)
-                })
+    evaluation_date = data['evolution_date']
+    proj_frequency = data['proj_frequency']
+    per_bond = bool(data.get('per_bond', False))
 
+    projection_dates = generate_projection_dates(evaluation_date, proj_frequency)
+    if not projection_dates:
+        print("[ERREUR] Aucune date de projection générée.")
+        return
 
-            print(f"\n✅ Ajout projection: {proj_date} | Prix moy: {avg_clean_price:.4f}, Duration moy: {avg_duration:.4f}")
+    output = {}
+    if 'portfolios' in data:
+        # {"portfolios": {"Client A": [bonds...], "Client B": {"bonds": [...]}}}
+        portfolios = {name: p['bonds'] if isinstance(p, dict) else p for name, p in data['portfolios'].items()}
+        output["portfolios"] = project_portfolios(portfolios, projection_dates)
+        for name, projections in output["portfolios"].items():
+            if projections:
+                last = projections[-1]
+                print(f"✅ {name} | {len(projections)} dates | {last['Projection Date']} : "
+                      f"Prix moy: {last['Clean Price Projected']:.4f}, Duration moy: {last['Modified Duration Projected']:.4f}")
+    else:
+        projector = PortfolioProjector(data['bonds'])
+        if per_bond:
+            output["projections"], output["bond_projections"] = projector.project(projection_dates, per_bond=True)
         else:
-            print("⚠️ Aucune obligation active pour cette date. Ignorée.")
+            output["projections"] = projector.project(projection_dates)
+
+        for p in output["projections"]:
+            print(f"✅ {p['Projection Date']} | Prix moy: {p['Clean Price Projected']:.4f}, Duration moy: {p['Modified Duration Projected']:.4f}")
+
+    if data.get('stochastic'):
+        portfolios = portfolios if 'portfolios' in data else {'Portfolio': data['bonds']}
+        try:
+            output["stochastic"] = project_portfolio_bands(data['stochastic'], portfolios, projection_dates,
+                                                           evaluation_date)
+            for name, rows in output["stochastic"]["portfolios"].items():
+                if rows:
+                    last = rows[-1]
+                    bands = ", ".join(f"{k[len('Clean Price '):]}: {v:.4f}" for k, v in last.items()
+                                      if k.startswith("Clean Price P"))
+                    print(f"🎲 {name} | {last['Projection Date']} : {bands}")
+        except Exception as e:
+            print(f"[ERREUR] Projection stochastique : {e}")
 
     try:
         with open(output_file, 'w') as f:
-            json.dump({"projections": projections}, f, indent=4)
+            json.dump(output, f, indent=4)
         print(f"\n📁 Projections sauvegardées dans: {output_file}")
     except Exception as e:
         print(f"[ERREUR] Sauvegarde projection.json : {e}")
@@ -150,4 +346,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-#             logging.info(f"Successfully wrote projections to {output_excel_path}")
\ No newline at end of file
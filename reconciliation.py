@@ -0,0 +1,169 @@
+"""
+Reconciliation of model prices against market closing prices (README steps 4-5).
+
+Closing prices (CSV with ISIN / clean price columns, or a JSON object, see
+storage.load_clean_prices) are joined on ISIN with the calculate_bonds
+results for the same date. For every quoted bond the report gives the price
+residual, the market yield versus the model yield, and the Z-spread: the
+continuously compounded spread over the curve's zero rates that reprices the
+bond at its close, as QuantLib's BondFunctions.zSpread(..., ql.Continuous)
+defines it. All Z-spreads are solved together by vectorized Newton
+iterations over the universe CashflowMatrix.
+
+    python reconciliation.py 2024-06-03 closes.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import QuantLib as ql
+
+from bond_cashflows import CashflowMatrix
+from calculate_bonds import price_bonds_batch
+from gilt_builders import build_fixed_rate_bond, get_spot_curve_store
+from storage import load_clean_prices, load_instruments
+from yield_solver import solver_inputs, solve_yields
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+default_output_dir = os.path.join(base_dir, "Reconciliation")
+
+# Z-spreads beyond this (in bp) are flagged in the report
+SPREAD_THRESHOLD_BP = 5.0
+
+
+def solve_z_spreads(matrix, discounts, times, settlement_discount, settlement_time, dirty_prices,
+                    tolerance=1e-12, max_iterations=50):
+    """
+    Continuously compounded spreads s (one per bond) so that
+    sum c_j D(t_j) e^(-s t_j) / (D(t_s) e^(-s t_s)) equals the dirty price.
+    Bonds without a finite target or without cashflows come back as NaN.
+    """
+    n = len(matrix.isins)
+    target = np.asarray(dirty_prices, dtype=float)
+    weighted = matrix.amounts * np.asarray(discounts)[matrix.columns] / settlement_discount
+    tau = np.asarray(times)[matrix.columns] - settlement_time
+
+    has_flows = np.diff(matrix.offsets) > 0
+    converged = ~(np.isfinite(target) & has_flows)
+    spreads = np.zeros(n)
+
+    for _ in range(max_iterations):
+        if converged.all():
+            break
+        flows = weighted * np.exp(-spreads[matrix.rows] * tau)
+        price = np.bincount(matrix.rows, weights=flows, minlength=n)
+        derivative = -np.bincount(matrix.rows, weights=flows * tau, minlength=n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(converged, 0.0, (price - target) / derivative)
+        step = np.nan_to_num(step)
+        spreads -= step
+        converged |= np.abs(step) < tolerance
+
+    spreads[~(np.isfinite(target) & has_flows) | ~converged] = np.nan
+    return spreads
+
+
+def reconcile(gilts, eval_date_str, clean_prices, curve_handle, results=None):
+    """
+    One row per gilt with a closing price. `results` are calculate_bonds
+    results (price_bonds_batch output) for eval_date_str; they are computed
+    on curve_handle when not given.
+    """
+    eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    settlement_date = calendar.advance(eval_date_ql, 1, ql.Days)
+
+    if results is None:
+        results = price_bonds_batch(gilts, eval_date_ql, curve_handle)
+    model = pd.DataFrame([{k: v for k, v in r.items() if k != 'Cashflows'} for r in results])
+    model = model.drop_duplicates('isin').set_index('isin')
+
+    isins, bonds, market = [], [], []
+    for gilt in gilts:
+        price = clean_prices.get(gilt['isin'])
+        if price is None or not np.isfinite(price) or gilt['isin'] in isins:
+            continue
+        bond, error = build_fixed_rate_bond(gilt, eval_date_ql, calendar, day_count)
+        if error is None:
+            isins.append(gilt['isin'])
+            bonds.append(bond)
+            market.append(price)
+    market = np.array(market, dtype=float)
+
+    matrix = CashflowMatrix.from_bonds(isins, bonds, settlement_date)
+    times, amounts, accrued = solver_inputs(bonds, settlement_date, day_count)
+    market_yields, _ = solve_yields(times, amounts, accrued, market)
+
+    spreads = solve_z_spreads(
+        matrix, matrix.discount_vector(curve_handle), matrix.curve_times(curve_handle),
+        curve_handle.discount(settlement_date), curve_handle.timeFromReference(settlement_date),
+        market + accrued
+    )
+
+    report = pd.DataFrame({
+        'isin': isins,
+        'description': [model['description'].get(i) if 'description' in model else None for i in isins],
+        'maturity_date': [model['maturity_date'].get(i) if 'maturity_date' in model else None for i in isins],
+        'Market Clean Price': market,
+        'Model Clean Price': model['Clean Price Calculated'].reindex(isins).to_numpy(),
+        'Market Yield': market_yields * 100,
+        'Model Yield': model['Implied Yield'].reindex(isins).to_numpy(),
+        'Z-Spread (bp)': spreads * 10000,
+    })
+    report['Price Residual'] = report['Market Clean Price'] - report['Model Clean Price']
+    report['Yield Residual (bp)'] = (report['Market Yield'] - report['Model Yield']) * 100
+    report['Flag'] = np.where(report['Z-Spread (bp)'].abs() > SPREAD_THRESHOLD_BP, '⚠', '')
+    return report.sort_values('maturity_date', kind='stable', ignore_index=True)
+
+
+def summarize(report):
+    residuals = report['Price Residual'].dropna()
+    spreads = report['Z-Spread (bp)'].dropna()
+    return {
+        'bonds': len(report),
+        'price_rmse': float(np.sqrt(np.mean(residuals ** 2))) if len(residuals) else np.nan,
+        'max_abs_price_residual': float(residuals.abs().max()) if len(residuals) else np.nan,
+        'mean_z_spread_bp': float(spreads.mean()) if len(spreads) else np.nan,
+        'max_abs_z_spread_bp': float(spreads.abs().max()) if len(spreads) else np.nan,
+        'flagged': int((report['Flag'] != '').sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile model prices with market closing prices")
+    parser.add_argument("eval_date", help="Evaluation date (YYYY-MM-DD)")
+    parser.add_argument("prices", help="Closing prices (CSV with ISIN and clean price columns, or JSON)")
+    parser.add_argument("--gilts", default=default_gilts_path)
+    parser.add_argument("--spot", default=default_spot_path)
+    args = parser.parse_args()
+
+    eval_date_ql = ql.DateParser.parseISO(args.eval_date)
+    ql.Settings.instance().evaluationDate = eval_date_ql
+    gilts = load_instruments(args.gilts)
+    clean_prices = load_clean_prices(args.prices)
+    curve_handle = get_spot_curve_store(args.spot).curve_handle(args.eval_date)
+
+    report = reconcile(gilts, args.eval_date, clean_prices, curve_handle)
+    missing = len({g['isin'] for g in gilts} - set(clean_prices))
+
+    os.makedirs(default_output_dir, exist_ok=True)
+    output_path = os.path.join(default_output_dir, f"reconciliation_{args.eval_date}.csv")
+    report.to_csv(output_path, index=False)
+
+    summary = summarize(report)
+    print(f"📊 {summary['bonds']} gilts rapprochés ({missing} sans prix de clôture)")
+    print(f"   RMSE prix : {summary['price_rmse']:.4f} | écart max : {summary['max_abs_price_residual']:.4f}")
+    print(f"   Z-spread moyen : {summary['mean_z_spread_bp']:.2f} bp | max : {summary['max_abs_z_spread_bp']:.2f} bp")
+    if summary['flagged']:
+        print(f"⚠ {summary['flagged']} gilts au-delà de {SPREAD_THRESHOLD_BP:g} bp :")
+        flagged = report[report['Flag'] != '']
+        print(flagged[['isin', 'description', 'Price Residual', 'Z-Spread (bp)']].to_string(index=False))
+    print(f"💾 Rapport sauvegardé dans {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+On-disk cache of priced results for incremental reruns.
+
+Entries are keyed by (ISIN, evaluation date, curve fingerprint) and carry the
+fingerprint of the bond record they were priced from, so a corrected gilt
+record or a new curve for the date invalidates exactly the affected entries.
+The cache is a JSON file kept in least-recently-used order and bounded to
+max_entries; `meta` holds small run-level values (e.g. the signature of the
+inputs behind the last written outputs).
+"""
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import QuantLib as ql
+
+
+def bond_fingerprint(bond_data):
+    payload = json.dumps(bond_data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def curve_fingerprint(curve_handle, max_years=60):
+    """Hash of the curve's reference date and discount factors on a weekly grid from it."""
+    reference = curve_handle.referenceDate()
+    dates = [reference + ql.Period(w, ql.Weeks) for w in range(0, 52 * max_years + 1)]
+    discounts = np.array([curve_handle.discount(d, True) for d in dates])
+    return hashlib.sha1(np.int64(reference.serialNumber()).tobytes() + discounts.tobytes()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path, max_entries=50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.meta = {}
+        self._dirty = False
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                stored = json.load(f)
+            self.meta = stored.get('meta', {})
+            self._entries = OrderedDict((k, v) for k, v in stored.get('entries', []))
+
+    @staticmethod
+    def key(isin, eval_date_str, curve_hash):
+        return f"{isin}|{eval_date_str}|{curve_hash}"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, isin, eval_date_str, curve_hash, bond_hash):
+        """Cached result (a copy) if it was priced from the same bond record, else None."""
+        key = self.key(isin, eval_date_str, curve_hash)
+        entry = self._entries.get(key)
+        if entry is None or entry['bond'] != bond_hash:
+            return None
+        self._entries.move_to_end(key)
+        self._dirty = True
+        return copy.deepcopy(entry['result'])
+
+    def put(self, isin, eval_date_str, curve_hash, bond_hash, result):
+        key = self.key(isin, eval_date_str, curve_hash)
+        self._entries[key] = {'bond': bond_hash, 'result': copy.deepcopy(result)}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def set_meta(self, name, value):
+        if self.meta.get(name) != value:
+            self.meta[name] = value
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'meta': self.meta, 'entries': list(self._entries.items())}, f, default=float)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
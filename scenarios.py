@@ -0,0 +1,209 @@
+"""
+Scenario engine: full repricing of the gilt universe under many curve shocks.
+
+A scenario is a vector of zero-rate shifts (decimal, continuously compounded
+like the ZeroCurve built from SpotRates.json) on the spot curve's maturity
+nodes. Shifts are interpolated linearly in curve time onto the payment dates
+of the universe's CashflowMatrix, exactly as the ZeroCurve interpolates its
+rates, so each scenario is equivalent to repricing on a rebuilt curve:
+
+    D_s(t) = D(t) * exp(-shift_s(t) * t)
+
+All scenarios of a chunk are priced with one discount-matrix product.
+
+    python scenarios.py 2024-06-03 --parallel 100 --historical
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import QuantLib as ql
+
+from bond_cashflows import CashflowMatrix
+from gilt_builders import build_fixed_rate_bond, get_spot_curve_store, spot_node_dates
+from storage import load_instruments, load_spot_rates
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+default_output_dir = os.path.join(base_dir, "Scenarios")
+
+
+def node_interpolation_weights(node_times, times):
+    """(nodes x times) matrix W so that node_values @ W interpolates linearly (flat outside)."""
+    node_times = np.asarray(node_times, dtype=float)
+    weights = np.zeros((len(node_times), len(times)))
+    for j, t in enumerate(np.asarray(times, dtype=float)):
+        k = np.searchsorted(node_times, t)
+        if k == 0:
+            weights[0, j] = 1.0
+        elif k >= len(node_times):
+            weights[-1, j] = 1.0
+        else:
+            span = node_times[k] - node_times[k - 1]
+            alpha = (t - node_times[k - 1]) / span if span > 0 else 1.0
+            weights[k - 1, j] = 1 - alpha
+            weights[k, j] = alpha
+    return weights
+
+
+class ScenarioEngine:
+    def __init__(self, matrix, curve_handle, settlement_date, accrued, years, node_times):
+        self.matrix = matrix
+        self.accrued = np.asarray(accrued, dtype=float)
+        self.years = np.asarray(years, dtype=float)
+
+        self.times = matrix.curve_times(curve_handle)
+        self.discounts = matrix.discount_vector(curve_handle)
+        self.settlement_time = curve_handle.timeFromReference(settlement_date)
+        self.settlement_discount = curve_handle.discount(settlement_date)
+
+        # The ZeroCurve's first pillar sits on the evaluation date with the first node's rate
+        all_times = np.concatenate([[0.0], node_times])
+        weights = node_interpolation_weights(all_times, np.concatenate([[self.settlement_time], self.times]))
+        weights[1] += weights[0]
+        self._weights = weights[1:]
+
+        self.base_clean = self.clean_prices(np.zeros((1, len(self.years))))[0]
+
+    @classmethod
+    def from_universe(cls, gilts, eval_date_str, curve_store):
+        """Build bonds, cashflow matrix and node grid for gilts on eval_date_str from a SpotCurveStore."""
+        calendar = ql.UnitedKingdom()
+        day_count = ql.ActualActual(ql.ActualActual.ISMA)
+        eval_date_ql = ql.DateParser.parseISO(eval_date_str)
+        settlement_date = calendar.advance(eval_date_ql, 1, ql.Days)
+        curve_handle = curve_store.curve_handle(eval_date_str)
+
+        isins, bonds = [], []
+        for gilt in gilts:
+            bond, error = build_fixed_rate_bond(gilt, eval_date_ql, calendar, day_count)
+            if error is None:
+                isins.append(gilt['isin'])
+                bonds.append(bond)
+
+        matrix = CashflowMatrix.from_bonds(isins, bonds, settlement_date)
+        accrued = [bond.accruedAmount(settlement_date) for bond in bonds]
+
+        years = np.array([float(e['year']) for e in curve_store.spot_list(eval_date_str) if float(e['year']) > 0])
+        node_times = np.array([curve_handle.timeFromReference(d) for d in spot_node_dates(eval_date_ql, years)])
+        return cls(matrix, curve_handle, settlement_date, accrued, years, node_times)
+
+    @property
+    def isins(self):
+        return self.matrix.isins
+
+    def clean_prices(self, node_shifts, chunk_size=1000):
+        """(scenarios x bonds) clean prices for (scenarios x nodes) zero-rate shifts."""
+        node_shifts = np.atleast_2d(np.asarray(node_shifts, dtype=float))
+        prices = np.empty((node_shifts.shape[0], len(self.isins)))
+
+        for start in range(0, node_shifts.shape[0], chunk_size):
+            shifts = node_shifts[start:start + chunk_size] @ self._weights
+            settlement_shift = shifts[:, 0]
+            discounts = self.discounts * np.exp(-shifts[:, 1:] * self.times)
+            settlement_discount = self.settlement_discount * np.exp(-settlement_shift * self.settlement_time)
+            dirty = self.matrix.price_many(discounts) / settlement_discount[:, None]
+            prices[start:start + chunk_size] = dirty - self.accrued
+
+        return prices
+
+    def pnl(self, node_shifts, chunk_size=1000):
+        """(scenarios x bonds) clean price change versus the unshocked curve, per 100 nominal."""
+        return self.clean_prices(node_shifts, chunk_size) - self.base_clean
+
+
+# --- Scenario generators (all return scenarios x nodes, decimal shifts) ----
+
+def parallel_scenarios(years, shifts_bp):
+    return np.outer(np.asarray(shifts_bp, dtype=float) / 10000.0, np.ones(len(years)))
+
+
+def twist_scenarios(years, short_bp, long_bp, short_end=2.0, long_end=30.0):
+    """Linear steepener/flattener: short_bp at short_end, long_bp at long_end, flat beyond."""
+    years = np.asarray(years, dtype=float)
+    alpha = np.clip((years - short_end) / (long_end - short_end), 0.0, 1.0)
+    short_bp = np.atleast_1d(np.asarray(short_bp, dtype=float))[:, None]
+    long_bp = np.atleast_1d(np.asarray(long_bp, dtype=float))[:, None]
+    return (short_bp + (long_bp - short_bp) * alpha) / 10000.0
+
+
+def butterfly_scenarios(years, wings_bp, belly_bp, belly=10.0, width=8.0):
+    """Wings move by wings_bp and the belly (around `belly` years) by belly_bp."""
+    years = np.asarray(years, dtype=float)
+    hump = np.exp(-0.5 * ((years - belly) / width) ** 2)
+    wings_bp = np.atleast_1d(np.asarray(wings_bp, dtype=float))[:, None]
+    belly_bp = np.atleast_1d(np.asarray(belly_bp, dtype=float))[:, None]
+    return (wings_bp * (1 - hump) + belly_bp * hump) / 10000.0
+
+
+def historical_scenarios(spot_data, years, start_date=None, end_date=None):
+    """
+    Daily zero-rate changes between consecutive dates of SpotRates.json
+    (rates in %), aligned on `years`. Returns (dates, scenarios x nodes);
+    nodes missing on either day get a zero change.
+    """
+    dates = sorted(d for d in spot_data
+                   if (start_date is None or d >= start_date) and (end_date is None or d <= end_date))
+    years = np.asarray(years, dtype=float)
+    levels = np.full((len(dates), len(years)), np.nan)
+    position = {y: j for j, y in enumerate(years)}
+    for i, d in enumerate(dates):
+        for e in spot_data[d]:
+            j = position.get(float(e['year']))
+            if j is not None:
+                levels[i, j] = e['rate']
+    changes = np.nan_to_num(np.diff(levels, axis=0) / 100.0)
+    return dates[1:], changes
+
+
+def historical_var(pnl, weights, level=0.99):
+    """Loss not exceeded with probability `level` for a portfolio (weights = nominal / 100 per bond)."""
+    portfolio_pnl = np.asarray(pnl) @ np.asarray(weights, dtype=float)
+    return float(-np.quantile(portfolio_pnl, 1 - level))
+
+
+def standard_scenarios(years, parallel_bp=100):
+    """Named set of +/- parallel, steepener/flattener and butterfly shocks."""
+    names, shocks = [], []
+    for bp in (-parallel_bp, parallel_bp):
+        names.append(f"parallel_{bp:+d}bp")
+        shocks.append(parallel_scenarios(years, [bp]))
+    names += ["steepener", "flattener"]
+    shocks.append(twist_scenarios(years, [-parallel_bp / 2, parallel_bp / 2], [parallel_bp / 2, -parallel_bp / 2]))
+    names += ["butterfly_up", "butterfly_down"]
+    shocks.append(butterfly_scenarios(years, [parallel_bp / 2, -parallel_bp / 2], [-parallel_bp / 2, parallel_bp / 2]))
+    return names, np.vstack(shocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice the gilt universe under curve scenarios")
+    parser.add_argument("eval_date", help="Evaluation date (YYYY-MM-DD)")
+    parser.add_argument("--parallel", type=int, default=100, help="Size of the standard shocks in bp")
+    parser.add_argument("--historical", action='store_true', help="Add every daily change of SpotRates.json")
+    parser.add_argument("--gilts", default=default_gilts_path)
+    parser.add_argument("--spot", default=default_spot_path)
+    args = parser.parse_args()
+
+    ql.Settings.instance().evaluationDate = ql.DateParser.parseISO(args.eval_date)
+    engine = ScenarioEngine.from_universe(load_instruments(args.gilts), args.eval_date,
+                                          get_spot_curve_store(args.spot))
+
+    names, shocks = standard_scenarios(engine.years, args.parallel)
+    if args.historical:
+        dates, changes = historical_scenarios(load_spot_rates(args.spot), engine.years, end_date=args.eval_date)
+        names += [f"hist_{d}" for d in dates]
+        shocks = np.vstack([shocks, changes])
+
+    pnl = pd.DataFrame(engine.pnl(shocks), index=names, columns=engine.isins)
+    pnl.index.name = 'scenario'
+
+    os.makedirs(default_output_dir, exist_ok=True)
+    output_path = os.path.join(default_output_dir, f"scenarios_{args.eval_date}.csv")
+    pnl.to_csv(output_path)
+    print(f"💾 {len(names)} scénarios x {len(engine.isins)} gilts sauvegardés dans {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import QuantLib as ql
+
+from bond_cashflows import yield_cashflows, pad_cashflows
+
+DEFAULT_YIELD_SHIFTS = np.array([-0.02, -0.015, -0.01, -0.005, 0.0, 0.005, 0.01, 0.015, 0.02])
+
+
+def shift_grid(max_shift_bp=300, step_bp=1):
+    """Symmetric shift vector in decimal, e.g. shift_grid(300, 1) for 1bp steps to ±300bp."""
+    n = int(round(max_shift_bp / step_bp))
+    return np.arange(-n, n + 1) * step_bp / 10000.0
+
+
+def shift_label(dy):
+    # Keep the historical "+0.5%" labels for grids on 10bp multiples
+    if abs(dy * 1000 - round(dy * 1000)) < 1e-9:
+        return f"{dy*100:+.1f}%"
+    return f"{dy*10000:+.0f}bp"
+
+
+def sensitivity_grid(prices, durations, convexities, shifts=DEFAULT_YIELD_SHIFTS):
+    """
+    Duration/convexity price approximation for every bond and every shift.
+    Returns (price_matrix, delta_matrix, delta_pct_matrix), each of shape
+    (bonds x shifts).
+    """
+    P = np.asarray(prices, dtype=float)[:, None]
+    D = np.asarray(durations, dtype=float)[:, None]
+    C = np.asarray(convexities, dtype=float)[:, None]
+    dy = np.asarray(shifts, dtype=float)[None, :]
+
+    delta = P * (-D * dy + 0.5 * C * dy**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_pct = delta / P * 100
+    return P + delta, delta, delta_pct
+
+
+def exact_sensitivity_grid(bonds, yields, settlement_date, shifts=DEFAULT_YIELD_SHIFTS,
+                           day_count=None, frequency=2):
+    """
+    Full reprice of every bond at yield + shift, evaluated on the cashflow
+    schedule in one NumPy expression instead of one QuantLib call per shift.
+    yields are decimals compounded at `frequency`.
+    Returns (price_matrix, delta_matrix, delta_pct_matrix) on clean prices.
+    """
+    day_count = day_count or ql.ActualActual(ql.ActualActual.ISMA)
+    extracted = [yield_cashflows(bond, settlement_date, day_count) for bond in bonds]
+    times, amounts = pad_cashflows([e[0] for e in extracted], [e[1] for e in extracted])
+    accrued = np.array([bond.accruedAmount(settlement_date) for bond in bonds])
+
+    y = np.asarray(yields, dtype=float)[:, None]
+    dy = np.asarray(shifts, dtype=float)[None, :]
+    shocked = (y + dy)[:, :, None]
+
+    dirty = (amounts[:, None, :] * (1 + shocked / frequency) ** (-frequency * times[:, None, :])).sum(axis=2)
+    clean = dirty - accrued[:, None]
+    base = (amounts * (1 + y / frequency) ** (-frequency * times)).sum(axis=1, keepdims=True) - accrued[:, None]
+
+    delta = clean - base
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_pct = delta / base * 100
+    return clean, delta, delta_pct
+
+
+def sensitivity_columns(price_matrix, delta_matrix, delta_pct_matrix, shifts=DEFAULT_YIELD_SHIFTS,
+                        index=None, decimals=6):
+    """Flatten the grids into the Price_/ΔP_/ΔP(%)_ columns of the Results sheet."""
+    columns = {}
+    for j, dy in enumerate(shifts):
+        label = shift_label(dy)
+        columns[f"Price_{label}"] = np.round(price_matrix[:, j], decimals)
+        columns[f"ΔP_{label}"] = np.round(delta_matrix[:, j], decimals)
+        columns[f"ΔP(%)_{label}"] = np.round(delta_pct_matrix[:, j], 4)
+    return pd.DataFrame(columns, index=index)
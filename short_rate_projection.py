@@ -0,0 +1,372 @@
+"""
+Monte Carlo projection of gilt prices under a one-factor short-rate model.
+
+Instead of one path at a frozen yield, thousands of short-rate paths are
+simulated and every bond (or portfolio) is repriced on every path at every
+projection date with the model's closed-form zero-coupon prices. The
+projection reports the mean and percentile bands of the clean price.
+
+Models (a: mean reversion, sigma: volatility, both per year):
+
+    hull_white  dr = (theta(t) - a r) dt + sigma dW, theta fitted exactly to
+                the SpotRates.json curve of the evaluation date
+    vasicek     dr = a (b - r) dt + sigma dW, r0 and b fitted to the same
+                curve by least squares
+
+Both are driven by the zero-mean Ornstein-Uhlenbeck factor x (r = x + a
+deterministic shift), which is simulated exactly from one projection date
+to the next, so no time stepping is needed between dates. When not given,
+a and sigma are estimated from an AR(1) fit of the shortest spot node over
+the SpotRates.json history. Model time is Actual/365 from the evaluation
+date.
+
+All paths are repriced together for each date: exp(ln P(t, T)) over
+(paths x payment dates) times the (payment dates x bonds) cashflow matrix,
+so 10,000 paths x 60 dates x a full portfolio is a few seconds of BLAS.
+
+data.json (projection.py or projection_portfolio.py) switches it on with
+
+    "stochastic": {"model": "hull_white", "paths": 10000, "seed": 42,
+                   "percentiles": [5, 25, 50, 75, 95],
+                   "mean_reversion": null, "volatility": null}
+"""
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+import QuantLib as ql
+
+from bond_cashflows import CashflowMatrix, CashflowSchedule
+from date_tables import iso_to_serials, settlement_serials
+from gilt_builders import get_spot_curve_store
+from instrumentation import get_logger
+
+log = get_logger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_spot_path = os.path.join(base_dir, "SpotRates", "SpotRates.json")
+
+DEFAULT_PATHS = 10000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+# Used when the spot history is too short (or, for a, not mean-reverting)
+DEFAULT_MEAN_REVERSION = 0.03
+DEFAULT_VOLATILITY = 0.01
+MIN_HISTORY = 20
+# About two years of daily curves
+MIN_MEAN_REVERSION_HISTORY = 500
+
+
+def estimate_dynamics(store, end_date_str, min_observations=MIN_HISTORY,
+                      min_mean_reversion_history=MIN_MEAN_REVERSION_HISTORY):
+    """
+    (mean reversion, volatility) of the shortest spot node over the curve
+    dates up to end_date_str, taking the average spacing between curve dates
+    as the time step. Volatility is the realized volatility of the changes;
+    mean reversion comes from an AR(1) regression, which is only identified
+    on long histories, and is the default otherwise.
+    """
+    dates = [d for d in store.dates if d <= end_date_str]
+    if len(dates) < min_observations:
+        log.warning("Historique de courbes trop court (%d dates) : a=%s, sigma=%s",
+                    len(dates), DEFAULT_MEAN_REVERSION, DEFAULT_VOLATILITY)
+        return DEFAULT_MEAN_REVERSION, DEFAULT_VOLATILITY
+
+    rates = np.array([min(store.spot_list(d), key=lambda e: float(e['year']))['rate'] / 100 for d in dates])
+    serials = np.array([ql.DateParser.parseISO(d).serialNumber() for d in dates])
+    dt = np.diff(serials).mean() / 365.0
+    sigma = float(np.diff(rates).std(ddof=1) / np.sqrt(dt))
+
+    a = DEFAULT_MEAN_REVERSION
+    if len(dates) >= min_mean_reversion_history:
+        phi, _ = np.polyfit(rates[:-1], rates[1:], 1)
+        if 0 < phi < 1:
+            a = float(-np.log(phi) / dt)
+        else:
+            log.warning("Pas de retour à la moyenne dans l'historique (phi=%.4f) : a=%s", phi, DEFAULT_MEAN_REVERSION)
+    return a, sigma
+
+
+class ShortRateModel(ABC):
+    """Shared Ornstein-Uhlenbeck factor of the affine one-factor models."""
+
+    def __init__(self, a, sigma, reference_serial):
+        if a <= 0 or sigma < 0:
+            raise ValueError(f"Paramètres invalides : a={a}, sigma={sigma}")
+        self.a = float(a)
+        self.sigma = float(sigma)
+        self.reference_serial = int(reference_serial)
+
+    def year_fractions(self, serials):
+        return (np.asarray(serials, dtype=float) - self.reference_serial) / 365.0
+
+    def B(self, tau):
+        return (1 - np.exp(-self.a * tau)) / self.a
+
+    def factor_paths(self, serials, n_paths, seed=None, antithetic=True):
+        """(paths x dates) exact samples of x at the given dates (x = 0 at the reference date)."""
+        times = self.year_fractions(serials)
+        dt = np.diff(np.concatenate([[0.0], times]))
+        decay = np.exp(-self.a * dt)
+        std = self.sigma * np.sqrt((1 - np.exp(-2 * self.a * dt)) / (2 * self.a))
+
+        rng = np.random.default_rng(seed)
+        if antithetic:
+            z = rng.standard_normal(((n_paths + 1) // 2, len(times)))
+            z = np.concatenate([z, -z])[:n_paths]
+        else:
+            z = rng.standard_normal((n_paths, len(times)))
+
+        x = np.empty((n_paths, len(times)))
+        previous = np.zeros(n_paths)
+        for i in range(len(times)):
+            previous = previous * decay[i] + std[i] * z[:, i]
+            x[:, i] = previous
+        return x
+
+    @abstractmethod
+    def log_bond_terms(self, t_serial, maturity_serials):
+        """(log_a, B) over the maturities, with ln P(t, T) = log_a - B x(t)."""
+
+    def log_bond_prices(self, t_serial, maturity_serials, x):
+        """(paths x maturities) ln P(t, T) given the factor values x (one per path) at t."""
+        log_a, B = self.log_bond_terms(t_serial, maturity_serials)
+        return log_a[None, :] - np.outer(x, B)
+
+
+class HullWhiteModel(ShortRateModel):
+    """Hull-White model fitted exactly to the discount curve seen from the reference date."""
+
+    def __init__(self, a, sigma, curve_handle, reference_date_ql):
+        super().__init__(a, sigma, reference_date_ql.serialNumber())
+        self.curve_handle = curve_handle
+        self._reference_discount = curve_handle.discount(reference_date_ql, True)
+        self._log_discounts = {}
+
+    def log_discounts(self, serials):
+        """ln D(T) / D(reference) from the curve, memoized per date."""
+        values = []
+        for s in np.asarray(serials, dtype=np.int64).tolist():
+            value = self._log_discounts.get(s)
+            if value is None:
+                value = np.log(self.curve_handle.discount(ql.Date(s), True) / self._reference_discount)
+                self._log_discounts[s] = value
+            values.append(value)
+        return np.array(values)
+
+    def log_bond_terms(self, t_serial, maturity_serials):
+        t = self.year_fractions(t_serial)
+        B = self.B(self.year_fractions(maturity_serials) - t)
+        a, sigma = self.a, self.sigma
+        convexity = (sigma ** 2 / (2 * a ** 2) * (1 - np.exp(-a * t)) ** 2 * B
+                     + sigma ** 2 / (4 * a) * (1 - np.exp(-2 * a * t)) * B ** 2)
+        forward = self.log_discounts(maturity_serials) - self.log_discounts([t_serial])[0]
+        return forward - convexity, B
+
+
+class VasicekModel(ShortRateModel):
+    """Vasicek model; r(t) = b + (r0 - b) e^(-a t) + x(t)."""
+
+    def __init__(self, a, sigma, b, r0, reference_serial):
+        super().__init__(a, sigma, reference_serial)
+        self.b = float(b)
+        self.r0 = float(r0)
+
+    @classmethod
+    def from_curve(cls, a, sigma, curve_handle, reference_date_ql, max_years=30):
+        """r0 and b by least squares on the curve's monthly log discount factors."""
+        reference = curve_handle.discount(reference_date_ql, True)
+        dates = [reference_date_ql + ql.Period(m, ql.Months) for m in range(1, 12 * max_years + 1)]
+        T = np.array([(d.serialNumber() - reference_date_ql.serialNumber()) / 365.0 for d in dates])
+        y = -np.log([curve_handle.discount(d, True) / reference for d in dates])
+
+        B = (1 - np.exp(-a * T)) / a
+        # -ln P(0,T) = b (T - B) + r0 B + sigma^2/(2a^2) (B - T) + sigma^2 B^2 / (4a)
+        target = y - sigma ** 2 / (2 * a ** 2) * (B - T) - sigma ** 2 * B ** 2 / (4 * a)
+        (b, r0), *_ = np.linalg.lstsq(np.column_stack([T - B, B]), target, rcond=None)
+        return cls(a, sigma, b, r0, reference_date_ql.serialNumber())
+
+    def log_bond_terms(self, t_serial, maturity_serials):
+        t = self.year_fractions(t_serial)
+        tau = self.year_fractions(maturity_serials) - t
+        B = self.B(tau)
+        a, sigma = self.a, self.sigma
+        log_A = (self.b - sigma ** 2 / (2 * a ** 2)) * (B - tau) - sigma ** 2 * B ** 2 / (4 * a)
+        # r(t) = mean + x(t)
+        mean = self.b + (self.r0 - self.b) * np.exp(-a * t)
+        return log_A - B * mean, B
+
+
+MODELS = ('hull_white', 'vasicek')
+
+
+def calibrated_model(config, evaluation_date_str, spot_path=default_spot_path):
+    """
+    Model named by config['model'] on the spot curve of evaluation_date_str
+    (or the latest earlier curve date, rolled forward to the evaluation
+    date), with a/sigma from config or estimated from the curve history.
+    """
+    name = config.get('model', 'hull_white')
+    if name not in MODELS:
+        raise ValueError(f"Modèle inconnu : {name} (attendu : {', '.join(MODELS)})")
+
+    store = get_spot_curve_store(spot_path)
+    curve_date = evaluation_date_str
+    if not (store.dates and store.dates[0] <= evaluation_date_str <= store.dates[-1]):
+        earlier = [d for d in store.dates if d <= evaluation_date_str]
+        if not earlier:
+            raise ValueError(f"Aucune courbe spot au plus tard le {evaluation_date_str}")
+        curve_date = earlier[-1]
+        log.warning("Pas de courbe pour %s : courbe du %s utilisée", evaluation_date_str, curve_date)
+    curve_handle = store.curve_handle(curve_date)
+
+    a, sigma = config.get('mean_reversion'), config.get('volatility')
+    if a is None or sigma is None:
+        estimated_a, estimated_sigma = estimate_dynamics(store, curve_date)
+        a = estimated_a if a is None else a
+        sigma = estimated_sigma if sigma is None else sigma
+
+    reference = ql.DateParser.parseISO(evaluation_date_str)
+    if name == 'vasicek':
+        return VasicekModel.from_curve(a, sigma, curve_handle, reference)
+    return HullWhiteModel(a, sigma, curve_handle, reference)
+
+
+def ordered_percentiles(values, order, percentiles):
+    """
+    np.percentile(values, percentiles, axis=0) (linear interpolation) for
+    columns whose rows all sort ascending in `order`. Returns (columns x
+    percentiles).
+    """
+    rank = (len(order) - 1) * np.asarray(percentiles, dtype=float) / 100
+    lower = np.floor(rank).astype(np.int64)
+    upper = np.minimum(lower + 1, len(order) - 1)
+    low, high = values[order[lower]], values[order[upper]]
+    return (low + (rank - lower)[:, None] * (high - low)).T
+
+
+def band_rows(projection_dates, mean, bands, percentiles):
+    """Projection rows with the mean and one 'Clean Price P<q>' column per percentile; NaN dates are skipped."""
+    rows = []
+    for i, proj_date in enumerate(projection_dates):
+        if not np.isfinite(mean[i]):
+            continue
+        row = {"Projection Date": proj_date, "Clean Price Mean": round(float(mean[i]), 6)}
+        for q, value in zip(percentiles, bands[i]):
+            row[f"Clean Price P{q:g}"] = round(float(value), 6)
+        rows.append(row)
+    return rows
+
+
+class StochasticProjector:
+    """
+    Clean price bands of a set of bonds, and of weighted portfolios of them,
+    under a ShortRateModel. Cashflows are extracted once into a
+    CashflowMatrix over the union of payment dates.
+    """
+
+    def __init__(self, isins, bonds, model, day_count=None, settlement_days=2):
+        self.day_count = day_count or ql.ActualActual(ql.ActualActual.Bond)
+        self.model = model
+        self.settlement_days = settlement_days
+        self.isins = list(isins)
+        self.schedules = [CashflowSchedule(bond, self.day_count) for bond in bonds]
+        self.matrix = CashflowMatrix.from_flows(
+            self.isins, [(s.payment_dates, s.amounts) for s in self.schedules])
+        self._flows = self.matrix.to_dense().T
+        self.maturities = np.array([s.maturity for s in self.schedules], dtype=np.int64)
+
+    @classmethod
+    def from_positions(cls, positions, model, day_count=None, settlement_days=2):
+        """From projection_portfolio.PortfolioProjector positions."""
+        return cls([p['isin'] for p in positions], [p['bond'] for p in positions], model,
+                   day_count, settlement_days)
+
+    def simulate(self, projection_serials, n_paths=DEFAULT_PATHS, percentiles=DEFAULT_PERCENTILES,
+                 weights=None, seed=None, antithetic=True):
+        """
+        Mean and percentiles of the clean prices over n_paths paths at each
+        projection date (serials). Returns a dict with 'bonds': (mean, bands)
+        arrays of shape (dates x bonds) and (dates x bonds x percentiles), and
+        with a projection_portfolio.WeightMatrix, 'portfolios': the same for
+        the weighted average clean price of each portfolio's active bonds.
+        Bonds settled on or after their last payment are NaN.
+
+        With positive cashflows every clean price (and every weighted
+        average) decreases with x, so all percentiles come from one sort of
+        the paths by x per date instead of a partition per bond.
+        """
+        serials = np.asarray(projection_serials, dtype=np.int64)
+        settlement = settlement_serials(serials, self.settlement_days)
+        x = self.model.factor_paths(serials, n_paths, seed, antithetic)
+        accrued = np.column_stack([s.accrued(settlement) for s in self.schedules])
+        active = settlement[:, None] < self.maturities[None, :]
+
+        n_dates, n_bonds, n_q = len(serials), len(self.isins), len(percentiles)
+        bond_mean = np.full((n_dates, n_bonds), np.nan)
+        bond_bands = np.full((n_dates, n_bonds, n_q), np.nan)
+        if weights is not None:
+            # Dense (bonds x portfolios) weights
+            dense_weights = weights.weighted_sums(np.eye(n_bonds))
+            n_portfolios = dense_weights.shape[1]
+            portfolio_mean = np.full((n_dates, n_portfolios), np.nan)
+            portfolio_bands = np.full((n_dates, n_portfolios, n_q), np.nan)
+
+        buffer = np.empty(n_paths * len(self.matrix.dates))
+        for i in range(n_dates):
+            if not active[i].any():
+                continue
+            paid = self.matrix.dates > settlement[i]
+            # Dirty prices at settlement: P(t, T) / P(t, settlement) = exp(log_a_T - log_a_s - x (B_T - B_s)),
+            # with the deterministic part folded into the cashflows
+            log_a, B = self.model.log_bond_terms(serials[i], np.append(self.matrix.dates[paid], settlement[i]))
+            flows = np.exp(log_a[:-1] - log_a[-1])[:, None] * self._flows[paid]
+            discount = buffer[:n_paths * len(flows)].reshape(n_paths, len(flows))
+            np.multiply.outer(-x[:, i], B[:-1] - B[-1], out=discount)
+            np.exp(discount, out=discount)
+            clean = discount @ flows - accrued[i]
+
+            live = active[i]
+            order = np.argsort(-x[:, i], kind='stable')
+            bond_mean[i, live] = clean[:, live].mean(axis=0)
+            bond_bands[i, live] = ordered_percentiles(clean[:, live], order, percentiles)
+
+            if weights is not None:
+                live_weights = dense_weights * live[:, None]
+                total_weight = live_weights.sum(axis=0)
+                held = total_weight > 0
+                average = clean[:, live] @ live_weights[live][:, held] / total_weight[held]
+                portfolio_mean[i, held] = average.mean(axis=0)
+                portfolio_bands[i, held] = ordered_percentiles(average, order, percentiles)
+
+        result = {'bonds': (bond_mean, bond_bands)}
+        if weights is not None:
+            result['portfolios'] = (portfolio_mean, portfolio_bands)
+        return result
+
+
+def project_bands(config, isins, bonds, projection_dates, evaluation_date_str, weights=None,
+                  day_count=None, settlement_days=2, spot_path=default_spot_path):
+    """
+    Band rows for a data.json "stochastic" config: {'model': parameters used,
+    'bonds': {isin: rows}} plus, with a WeightMatrix, 'portfolios': one list
+    of rows per portfolio.
+    """
+    model = calibrated_model(config, evaluation_date_str, spot_path)
+    projector = StochasticProjector(isins, bonds, model, day_count, settlement_days)
+    percentiles = tuple(config.get('percentiles') or DEFAULT_PERCENTILES)
+    n_paths = int(config.get('paths') or DEFAULT_PATHS)
+    result = projector.simulate(iso_to_serials(projection_dates), n_paths, percentiles, weights,
+                                config.get('seed'), config.get('antithetic', True))
+
+    mean, bands = result['bonds']
+    output = {
+        'model': {'model': config.get('model', 'hull_white'), 'mean_reversion': model.a,
+                  'volatility': model.sigma, 'paths': n_paths},
+        'bonds': {isin: band_rows(projection_dates, mean[:, j], bands[:, j], percentiles)
+                  for j, isin in enumerate(projector.isins)},
+    }
+    if weights is not None:
+        mean, bands = result['portfolios']
+        output['portfolios'] = [band_rows(projection_dates, mean[:, p], bands[:, p], percentiles)
+                                for p in range(mean.shape[1])]
+    return output
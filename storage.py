@@ -0,0 +1,261 @@
+"""
+Columnar binary storage for the three data sets the scripts exchange:
+instruments (temp/gilts.json), spot curves (SpotRates/SpotRates.json) and
+cashflows (CashFlows/cashflows.json). Closing-price files are small and only
+read (load_clean_prices).
+
+Each data set is stored as a NumPy .npz archive of typed columns next to its
+JSON file (same name, .npz suffix). The JSON stays the export format for
+Excel and the frontend; readers go through load_* which use the .npz when it
+is at least as recent as the JSON and rebuild it otherwise. Archives are
+written to a temporary file in the same directory and moved into place, so
+a concurrent reader sees either the previous archive or the complete new one.
+"""
+import csv
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from instrumentation import get_logger
+
+log = get_logger(__name__)
+
+NO_DATE = np.datetime64('NaT', 'D')
+
+
+def npz_path(json_path):
+    return os.path.splitext(json_path)[0] + '.npz'
+
+
+def _is_fresh(binary_path, json_path):
+    if not os.path.exists(binary_path):
+        return False
+    if not os.path.exists(json_path):
+        return True
+    return os.path.getmtime(binary_path) >= os.path.getmtime(json_path)
+
+
+def _dates_to_column(values):
+    return np.array([np.datetime64(v, 'D') if v else NO_DATE for v in values], dtype='datetime64[D]')
+
+
+def _column_to_dates(column):
+    return [None if np.isnat(v) else str(v) for v in column]
+
+
+def _save(path, columns):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Unique name: several processes may rebuild the same archive at once
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        # np.savez appends .npz to names that do not already end with it
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _load(path):
+    with np.load(path, allow_pickle=False) as archive:
+        return {k: archive[k] for k in archive.files}
+
+
+# --- Instruments -----------------------------------------------------------
+
+def _amount(gilt):
+    """Outstanding amount as a float; NaN when missing or not a number (e.g. raw cell text)."""
+    value = gilt.get('amount')
+    if value in (None, ''):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        log.warning("%s : montant non numérique %r ignoré", gilt.get('isin'), value)
+        return np.nan
+
+
+def instruments_to_columns(gilts):
+    return {
+        'description': np.array([g.get('description') or '' for g in gilts], dtype=str),
+        'isin': np.array([g.get('isin') or '' for g in gilts], dtype=str),
+        'coupon': np.array([np.nan if g.get('coupon') is None else float(g['coupon']) for g in gilts]),
+        'maturity_date': _dates_to_column([g.get('maturity_date') for g in gilts]),
+        'issue_date': _dates_to_column([g.get('issue_date') for g in gilts]),
+        'next_coupon_date': _dates_to_column([g.get('next_coupon_date') for g in gilts]),
+        'coupon_schedule': np.array([json.dumps(g.get('coupon_schedule') or []) for g in gilts], dtype=str),
+        'amount': np.array([_amount(g) for g in gilts], dtype=float),
+        # Amount exactly as given (JSON text), so records round-trip unchanged
+        'amount_raw': np.array([json.dumps(g.get('amount')) for g in gilts], dtype=str),
+    }
+
+
+def _column_to_amounts(columns):
+    if 'amount_raw' in columns:
+        return [json.loads(v) for v in columns['amount_raw'].tolist()]
+    # Archives written before amount_raw existed
+    return [None if np.isnan(v) else str(v) for v in columns['amount'].tolist()]
+
+
+def columns_to_instruments(columns):
+    coupons = columns['coupon']
+    amounts = _column_to_amounts(columns)
+    return [
+        {
+            'description': str(columns['description'][i]),
+            'isin': str(columns['isin'][i]),
+            'coupon': None if np.isnan(coupons[i]) else float(coupons[i]),
+            'maturity_date': maturity,
+            'issue_date': issue,
+            'coupon_schedule': json.loads(str(columns['coupon_schedule'][i])),
+            'next_coupon_date': next_coupon,
+            'amount': amounts[i],
+        }
+        for i, (maturity, issue, next_coupon) in enumerate(zip(
+            _column_to_dates(columns['maturity_date']),
+            _column_to_dates(columns['issue_date']),
+            _column_to_dates(columns['next_coupon_date']),
+        ))
+    ]
+
+
+def save_instruments(gilts, path):
+    _save(path, instruments_to_columns(gilts))
+
+
+def load_instrument_columns(json_path):
+    binary_path = npz_path(json_path)
+    if _is_fresh(binary_path, json_path):
+        columns = _load(binary_path)
+        # Rebuilt once when the archive predates a column
+        if 'amount_raw' in columns or not os.path.exists(json_path):
+            return columns
+    with open(json_path, 'r', encoding='utf-8') as f:
+        columns = instruments_to_columns(json.load(f))
+    _save(binary_path, columns)
+    return columns
+
+
+def load_instruments(json_path):
+    """gilts.json records, read from the columnar copy when it is up to date."""
+    return columns_to_instruments(load_instrument_columns(json_path))
+
+
+# --- Spot curves -----------------------------------------------------------
+
+def spot_rates_to_columns(spot_data):
+    """Dates x maturities rate matrix, NaN where a date has no rate for a maturity."""
+    dates = sorted(spot_data)
+    years = sorted({float(e['year']) for entries in spot_data.values() for e in entries})
+    year_index = {y: j for j, y in enumerate(years)}
+    rates = np.full((len(dates), len(years)), np.nan)
+    for i, d in enumerate(dates):
+        for e in spot_data[d]:
+            rates[i, year_index[float(e['year'])]] = e['rate']
+    return {'dates': np.array(dates, dtype='datetime64[D]'), 'years': np.array(years), 'rates': rates}
+
+
+def columns_to_spot_rates(columns):
+    years = columns['years']
+    spot_data = {}
+    for d, row in zip(columns['dates'], columns['rates']):
+        present = ~np.isnan(row)
+        spot_data[str(d)] = [{'year': float(y), 'rate': float(r)} for y, r in zip(years[present], row[present])]
+    return spot_data
+
+
+def save_spot_rates(spot_data, path):
+    _save(path, spot_rates_to_columns(spot_data))
+
+
+def load_spot_rate_columns(json_path):
+    binary_path = npz_path(json_path)
+    if _is_fresh(binary_path, json_path):
+        return _load(binary_path)
+    with open(json_path, 'r') as f:
+        columns = spot_rates_to_columns(json.load(f))
+    _save(binary_path, columns)
+    return columns
+
+
+def load_spot_rates(json_path):
+    """SpotRates.json as {date: [{'year', 'rate'}, ...]}, read from the columnar copy when possible."""
+    return columns_to_spot_rates(load_spot_rate_columns(json_path))
+
+
+# --- Cashflows -------------------------------------------------------------
+
+def cashflows_to_columns(cashflows_by_isin):
+    """
+    Flatten {isin: [{'Date', 'Amount'}, ...]} into CSR-style columns: one row
+    per cashflow plus `offsets` so that bond i owns rows offsets[i]:offsets[i+1].
+    """
+    isins = list(cashflows_by_isin)
+    counts = [len(cashflows_by_isin[isin]) for isin in isins]
+    flows = [cf for isin in isins for cf in cashflows_by_isin[isin]]
+    return {
+        'isin': np.array(isins, dtype=str),
+        'offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        'date': np.array([cf['Date'] for cf in flows], dtype='datetime64[D]'),
+        'amount': np.array([cf['Amount'] for cf in flows], dtype=float),
+    }
+
+
+def columns_to_cashflows(columns):
+    offsets = columns['offsets']
+    dates = columns['date'].astype(str)
+    amounts = columns['amount']
+    return {
+        str(isin): [{'Date': str(d), 'Amount': float(a)}
+                    for d, a in zip(dates[offsets[i]:offsets[i + 1]], amounts[offsets[i]:offsets[i + 1]])]
+        for i, isin in enumerate(columns['isin'])
+    }
+
+
+def save_cashflows(cashflows_by_isin, path):
+    _save(path, cashflows_to_columns(cashflows_by_isin))
+
+
+def load_cashflow_columns(json_path):
+    binary_path = npz_path(json_path)
+    if _is_fresh(binary_path, json_path):
+        return _load(binary_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        columns = cashflows_to_columns(json.load(f))
+    _save(binary_path, columns)
+    return columns
+
+
+def load_cashflows(json_path):
+    return columns_to_cashflows(load_cashflow_columns(json_path))
+
+
+# --- Closing prices --------------------------------------------------------
+
+CLEAN_PRICE_COLUMNS = ('clean_price', 'close', 'clean')
+
+
+def load_clean_prices(path):
+    """
+    {isin: clean price} from a JSON object or a CSV with an ISIN column and a
+    clean_price (or close) column; headers are matched case-insensitively.
+    Rows without a usable price are skipped.
+    """
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {isin: float(price) for isin, price in json.load(f).items() if price is not None}
+
+    prices = {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower().replace(' ', '_'): v for k, v in row.items() if k}
+            price = next((row[c] for c in CLEAN_PRICE_COLUMNS if row.get(c)), None)
+            try:
+                prices[row['isin'].strip()] = float(price)
+            except (KeyError, TypeError, ValueError):
+                continue
+    return prices
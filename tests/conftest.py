@@ -0,0 +1,64 @@
+"""
+Shared fixtures: the repository's gilt universe (temp/gilts.json) priced on
+a synthetic SpotRates.json curve, so the tests do not depend on market data.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+import QuantLib as ql
+
+from gilt_builders import get_spot_curve_store
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+gilts_path = os.path.join(base_dir, "temp", "gilts.json")
+
+EVAL_DATE = "2024-06-03"
+SPOT_YEARS = [0.5 * k for k in range(1, 81)]
+
+
+def synthetic_spot_list(level=4.0):
+    """Humped SpotRates.json entry (rates in %) on half-year nodes out to 40y."""
+    return [{'year': y, 'rate': round(level + 0.9 * np.exp(-y / 6) - 0.6 * np.exp(-y / 25), 4)}
+            for y in SPOT_YEARS]
+
+
+@pytest.fixture(autouse=True)
+def evaluation_date():
+    """ql evaluation date of EVAL_DATE for every test, restored afterwards."""
+    settings = ql.Settings.instance()
+    saved = settings.evaluationDate
+    eval_date_ql = ql.DateParser.parseISO(EVAL_DATE)
+    settings.evaluationDate = eval_date_ql
+    yield eval_date_ql
+    settings.evaluationDate = saved
+
+
+@pytest.fixture(scope="session")
+def gilts():
+    # Read directly: storage.load_instruments would write temp/gilts.npz
+    with open(gilts_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def spot_list():
+    return synthetic_spot_list()
+
+
+@pytest.fixture(scope="session")
+def spot_path(tmp_path_factory, spot_list):
+    path = tmp_path_factory.mktemp("SpotRates") / "SpotRates.json"
+    path.write_text(json.dumps({"2024-05-31": synthetic_spot_list(4.05), EVAL_DATE: spot_list}))
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def curve_store(spot_path):
+    return get_spot_curve_store(spot_path)
+
+
+@pytest.fixture
+def curve_handle(curve_store):
+    return curve_store.curve_handle(EVAL_DATE)
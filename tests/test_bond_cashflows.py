@@ -0,0 +1,51 @@
+"""CashflowMatrix pricing against DiscountingBondEngine, and its cashflows.json layout."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from bond_cashflows import CashflowMatrix
+from gilt_builders import build_fixed_rate_bond
+
+
+def universe(gilts, eval_date_ql):
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    isins, bonds = [], []
+    for gilt in gilts:
+        bond, error = build_fixed_rate_bond(gilt, eval_date_ql, calendar, day_count)
+        if error is None:
+            isins.append(gilt['isin'])
+            bonds.append(bond)
+    return isins, bonds, calendar.advance(eval_date_ql, 1, ql.Days)
+
+
+def test_dirty_prices_match_discounting_engine(gilts, evaluation_date, curve_handle):
+    isins, bonds, settlement = universe(gilts, evaluation_date)
+    matrix = CashflowMatrix.from_bonds(isins, bonds, settlement)
+
+    engine = ql.DiscountingBondEngine(curve_handle)
+    for bond in bonds:
+        bond.setPricingEngine(engine)
+    assert_allclose(matrix.dirty_prices(curve_handle, settlement), [b.dirtyPrice() for b in bonds],
+                    rtol=0, atol=1e-12)
+
+    shocked = matrix.discount_vector(curve_handle) * np.exp(-0.01 * matrix.curve_times(curve_handle))
+    assert_allclose(matrix.price_many(np.vstack([matrix.discount_vector(curve_handle), shocked]))[1],
+                    matrix.price(shocked), rtol=1e-14)
+
+
+def test_cashflows_json_layout_round_trip(gilts, evaluation_date):
+    isins, bonds, settlement = universe(gilts, evaluation_date)
+    matrix = CashflowMatrix.from_bonds(isins, bonds, settlement)
+    cashflows_by_isin = {
+        isin: [{'Date': cf.date().ISO(), 'Amount': cf.amount()} for cf in bond.cashflows() if cf.date() > settlement]
+        for isin, bond in zip(isins, bonds)
+    }
+
+    rebuilt = CashflowMatrix.from_cashflows_by_isin(cashflows_by_isin)
+
+    assert rebuilt.isins == matrix.isins
+    assert_allclose(rebuilt.to_dense(), matrix.to_dense(), rtol=0, atol=0)
+    subset = matrix.subset(isins[::3])
+    assert_allclose(subset.aggregate(np.ones(len(subset.isins))).sum(),
+                    matrix.to_dense()[::3].sum(), rtol=1e-14)
@@ -0,0 +1,53 @@
+"""Coupon parsing from DMO gilt descriptions."""
+from fractions import Fraction
+
+import pytest
+
+import coupon_parser
+from coupon_parser import parse_coupon, parse_coupon_rational, parse_coupon_text
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("4¾% Treasury Gilt 2030", Fraction(19, 4)),
+    ("0 5/8% Treasury Gilt 2035", Fraction(5, 8)),
+    ("1 1/8% Treasury Gilt 2039", Fraction(9, 8)),
+    ("0⅛% Treasury Gilt 2028", Fraction(1, 8)),
+    ("2½% Index-linked Treasury Stock 2024", Fraction(5, 2)),
+    ("4⅓% Treasury Stock 2030", Fraction(13, 3)),
+    ("5% Treasury Stock 2025", Fraction(5)),
+    ("3.5% War Loan", Fraction(7, 2)),
+    ("1 / 4% Treasury Gilt 2040", Fraction(1, 4)),
+])
+def test_coupon_fractions_are_exact(description, expected):
+    assert parse_coupon_rational(description) == expected
+    assert parse_coupon(description) == float(expected)
+
+
+@pytest.mark.parametrize("description", [None, "", 4.75, "Treasury Gilt 2030", "Consolidated Stock"])
+def test_no_coupon(description):
+    assert parse_coupon(description) is None
+
+
+@pytest.mark.parametrize("text", ["", "   ", "4..5", "1/0", "4 ¾ x", "3/"])
+def test_malformed_coupon_text(text):
+    with pytest.raises(ValueError):
+        parse_coupon_text(text)
+
+
+def test_malformed_description_raises():
+    with pytest.raises(ValueError):
+        parse_coupon("1/0% Treasury Gilt 2030")
+
+
+def test_descriptions_are_memoized():
+    coupon_parser.clear_coupon_cache()
+    first = parse_coupon_rational("4¾% Treasury Gilt 2030")
+    parse_coupon_rational("Treasury Gilt 2030")
+    assert coupon_parser._COUPON_CACHE == {"4¾% Treasury Gilt 2030": first, "Treasury Gilt 2030": None}
+    assert parse_coupon_rational("4¾% Treasury Gilt 2030") is first
+    coupon_parser.clear_coupon_cache()
+    assert not coupon_parser._COUPON_CACHE
+
+
+def test_universe_descriptions_match_coupons(gilts):
+    assert [parse_coupon(g['description']) for g in gilts] == [g['coupon'] for g in gilts]
@@ -0,0 +1,74 @@
+"""Nelson-Siegel-Svensson gradients, calibration and the fitted QuantLib curve."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from curve_fitting import (fit_gilt_curve, load_fit, nss_discount_gradient, nss_discounts, nss_zero_rates,
+                           save_fit, universe_fitter)
+from gilt_builders import build_fixed_rate_bond
+from tests.conftest import EVAL_DATE
+
+TRUE_PARAMS = np.array([0.045, -0.008, 0.012, -0.01, 0.6, 0.08])
+
+
+def test_zero_rate_limits():
+    b0, b1 = TRUE_PARAMS[:2]
+    assert_allclose(nss_zero_rates(TRUE_PARAMS, [0.0, 1e-10, 1e7]), [b0 + b1, b0 + b1, b0], atol=1e-6)
+    assert nss_discounts(TRUE_PARAMS, [0.0])[0] == 1.0
+
+
+def test_gradient_matches_finite_differences():
+    times = np.array([0.0, 0.25, 1.0, 7.5, 30.0, 50.0])
+    discounts, gradient = nss_discount_gradient(TRUE_PARAMS, times)
+    assert_allclose(discounts, nss_discounts(TRUE_PARAMS, times), rtol=1e-15)
+
+    for k in range(6):
+        h = 1e-6 * max(abs(TRUE_PARAMS[k]), 1e-2)
+        up, down = TRUE_PARAMS.copy(), TRUE_PARAMS.copy()
+        up[k] += h
+        down[k] -= h
+        numerical = (nss_discounts(up, times) - nss_discounts(down, times)) / (2 * h)
+        assert_allclose(gradient[k], numerical, rtol=1e-6, atol=1e-9)
+
+
+def test_fit_recovers_generated_prices(gilts, evaluation_date):
+    fitter = universe_fitter(gilts, evaluation_date)
+    target = fitter.model_prices(TRUE_PARAMS)
+
+    cold = fitter.fit(target)
+    assert cold['rmse'] < 1e-6
+    assert_allclose(fitter.model_prices(cold['params']), target, atol=1e-5)
+
+    # From yesterday's parameters the warm start needs far fewer iterations
+    warm = fitter.fit(target, initial=TRUE_PARAMS * 1.01)
+    assert warm['rmse'] < 1e-6
+    assert warm['iterations'] < cold['iterations']
+
+
+def test_fitted_curve_prices_the_quoted_gilts(gilts, evaluation_date):
+    fitter = universe_fitter(gilts, evaluation_date)
+    quotes = dict(zip(fitter.matrix.isins, fitter.model_prices(TRUE_PARAMS)))
+    handle, result = fit_gilt_curve(gilts, EVAL_DATE, quotes)
+    assert result['isins'] == list(fitter.matrix.isins)
+
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    engine = ql.DiscountingBondEngine(handle)
+    by_isin = {g['isin']: g for g in gilts}
+    for isin, model_price in zip(result['isins'], fitter.model_prices(result['params'])):
+        bond, _ = build_fixed_rate_bond(by_isin[isin], evaluation_date, calendar, day_count)
+        bond.setPricingEngine(engine)
+        assert_allclose(bond.cleanPrice(), model_price, atol=1e-8)
+
+
+def test_stored_fits(tmp_path):
+    path = str(tmp_path / "FittedCurves" / "nss_params.json")
+    assert load_fit(path, EVAL_DATE) is None
+    save_fit(path, "2024-05-31", {'params': TRUE_PARAMS, 'rmse': 0.01})
+    save_fit(path, EVAL_DATE, {'params': TRUE_PARAMS * 2, 'rmse': 0.02}, keep_dates=2)
+    save_fit(path, "2024-06-04", {'params': TRUE_PARAMS * 3, 'rmse': 0.03}, keep_dates=2)
+
+    assert load_fit(path, "2024-05-31") is None
+    assert_allclose(load_fit(path, EVAL_DATE), TRUE_PARAMS * 2)
+    assert_allclose(load_fit(path, "2024-06-04", before=True), TRUE_PARAMS * 2)
+    assert load_fit(path, EVAL_DATE, before=True) is None
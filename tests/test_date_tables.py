@@ -0,0 +1,35 @@
+"""Business-day tables against ql.UnitedKingdom().advance, inside and outside the table."""
+import numpy as np
+import QuantLib as ql
+
+from date_tables import advance_business_days, iso_to_serials, serials_to_iso, spot_node_serials
+
+CALENDAR = ql.UnitedKingdom()
+
+
+def test_advance_matches_calendar():
+    # Covers Easter, Christmas and bank holiday moves across the table range
+    serials = np.arange(ql.Date(1, 1, 1995).serialNumber(), ql.Date(1, 1, 2061).serialNumber(), 3, dtype=np.int64)
+    for n in (1, 2, 5):
+        expected = [CALENDAR.advance(ql.Date(int(s)), n, ql.Days).serialNumber() for s in serials]
+        assert advance_business_days(serials, n).tolist() == expected
+
+
+def test_advance_outside_table_falls_back_to_calendar():
+    serials = np.array([ql.Date(30, 12, 1985).serialNumber(), ql.Date(24, 12, 2150).serialNumber()], dtype=np.int64)
+    expected = [CALENDAR.advance(ql.Date(int(s)), 1, ql.Days).serialNumber() for s in serials]
+    assert advance_business_days(serials, 1).tolist() == expected
+
+
+def test_spot_node_serials_match_calendar():
+    years = [0.5 * k for k in range(1, 101)]
+    for eval_date in (ql.Date(3, 6, 2024), ql.Date(29, 2, 2028), ql.Date(24, 12, 2030)):
+        expected = [CALENDAR.advance(eval_date, ql.Period(int(round(y * 365)), ql.Days)).serialNumber() for y in years]
+        assert spot_node_serials(eval_date.serialNumber(), years).tolist() == expected
+
+
+def test_iso_round_trip():
+    dates = ['2024-06-03', '2061-10-22', '1998-12-07']
+    serials = iso_to_serials(dates)
+    assert serials.tolist() == [ql.DateParser.parseISO(d).serialNumber() for d in dates]
+    assert serials_to_iso(serials).tolist() == dates
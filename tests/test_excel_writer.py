@@ -0,0 +1,68 @@
+"""Diff-only table writes through the headless openpyxl backend."""
+import math
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+
+from excel_writer import OpenpyxlWorkbookWriter, changed_row_runs
+
+HEADERS = ["ISIN", "Clean Price", "Schedule", "Maturity"]
+
+
+def table(n, price_shift=0.0):
+    return [[f"GB{k:010d}", np.float64(95.0 + k + price_shift), ["03-07", "09-07"], "2030-03-07"]
+            for k in range(n)]
+
+
+def sheet_values(path, sheet="Results"):
+    return [list(row) for row in openpyxl.load_workbook(path)[sheet].iter_rows(values_only=True)]
+
+
+def test_changed_row_runs():
+    old = [["a", 1.0], ["b", 2.0], ["c", 3.0], ["d", 4.0]]
+    new = [["a", 1.0], ["b", 2.5], ["c", 3.5], ["d", 4.0], ["e", 5.0]]
+    assert changed_row_runs(old, new) == [(1, 3), (4, 5)]
+    assert changed_row_runs(old, old) == []
+    assert changed_row_runs([], new[:2]) == [(0, 2)]
+    # Rounding noise, empty cells and Excel dates are not changes
+    assert changed_row_runs([[1.0, None, datetime(2030, 3, 7)]], [[1.0 + 1e-15, '', "2030-03-07"]]) == []
+
+
+def test_only_changed_rows_are_rewritten(tmp_path):
+    path = str(tmp_path / "results.xlsx")
+    writer = OpenpyxlWorkbookWriter(path)
+    assert writer.write_table("Results", HEADERS, table(10)) == 11
+    writer.save()
+    assert writer.cells_written == 11 * 4
+
+    writer = OpenpyxlWorkbookWriter(path)
+    assert writer.write_table("Results", HEADERS, table(10)) == 0
+    rows = table(10)
+    rows[3][1] = 0.5
+    rows[4][1] = float('nan')
+    assert writer.write_table("Results", HEADERS, rows) == 2
+    assert writer.cells_written == 2 * 4
+    writer.save()
+
+    values = sheet_values(path)
+    assert values[0] == HEADERS
+    assert values[1] == ["GB0000000000", 95.0, "03-07, 09-07", "2030-03-07"]
+    assert values[4][1] == 0.5 and values[5][1] is None
+    assert all(not isinstance(v, float) or not math.isnan(v) for row in values for v in row)
+
+
+def test_smaller_table_clears_leftovers(tmp_path):
+    path = str(tmp_path / "results.xlsx")
+    writer = OpenpyxlWorkbookWriter(path)
+    writer.write_table("Results", HEADERS, table(6))
+    writer.save()
+
+    writer = OpenpyxlWorkbookWriter(path)
+    # The kept cells are unchanged: nothing is rewritten, the rest is only cleared
+    assert writer.write_table("Results", HEADERS[:2], [row[:2] for row in table(3)]) == 0
+    writer.save()
+
+    values = sheet_values(path)
+    assert values[:4] == [HEADERS[:2] + [None, None]] + [[f"GB{k:010d}", 95.0 + k, None, None] for k in range(3)]
+    assert all(v is None for row in values[4:] for v in row)
@@ -0,0 +1,53 @@
+"""Headless parsing of a DMO "Gilts in Issue" workbook."""
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+from ExportBondsToJson import parse_coupon_schedule, parse_gilts_frame, read_gilts_in_issue
+
+
+@pytest.fixture
+def gilts_in_issue(tmp_path):
+    """A small workbook in the DMO layout: title and header rows, conventionals, then index-linked."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "ImportedData"
+    for row in [
+        ["Gilts in Issue as at 24-Jun-2024"],
+        ["Conventional Gilts"],
+        ["Gilt Name", "ISIN Code", "Redemption Date", "First Issue Date", "Dividend Dates",
+         "Current Ex-dividend Date", "Total Amount in Issue (£ million nominal)"],
+        ["2¾% Treasury Gilt 2024", "GB00BHBFH458", datetime(2024, 9, 7), datetime(2014, 3, 12),
+         "7 Mar/Sep", datetime(2024, 8, 29), 35806.004],
+        ["0 5/8% Treasury Gilt 2035", "GB00BMGR2916", datetime(2035, 7, 31), datetime(2020, 6, 5),
+         "31 Jan/Jul", None, 7750],
+        ["Rump Stock", "GB0000000001", None, None, None, None, 10],
+        ["Index-linked Gilts"],
+        ["0 1/8% Index-linked Treasury Gilt 2026", "GB00BYY5F144", datetime(2026, 3, 22),
+         datetime(2016, 1, 27), "22 Mar/Sep", None, 12000],
+    ]:
+        ws.append(row)
+    path = tmp_path / "Gilts_in_Issue.xlsx"
+    wb.save(path)
+    return path
+
+
+def test_conventional_gilts_are_parsed(gilts_in_issue):
+    gilts = parse_gilts_frame(read_gilts_in_issue(gilts_in_issue))
+
+    assert gilts == [
+        {'description': "2¾% Treasury Gilt 2024", 'isin': "GB00BHBFH458", 'coupon': 2.75,
+         'maturity_date': "2024-09-07", 'issue_date': "2014-03-12", 'coupon_schedule': ["03-07", "09-07"],
+         'next_coupon_date': "2024-08-29", 'amount': "35806.004"},
+        {'description': "0 5/8% Treasury Gilt 2035", 'isin': "GB00BMGR2916", 'coupon': 0.625,
+         'maturity_date': "2035-07-31", 'issue_date': "2020-06-05", 'coupon_schedule': ["01-31", "07-31"],
+         'next_coupon_date': None, 'amount': "7750.0"},
+    ]
+
+
+def test_coupon_schedule():
+    assert parse_coupon_schedule("7 Jun/Dec") == ["06-07", "12-07"]
+    assert parse_coupon_schedule("22 Jan/Xyz") == ["01-22", "??-22"]
+    assert parse_coupon_schedule("Quarterly") == ["Quarterly"]
+    assert parse_coupon_schedule(None) == [None]
@@ -0,0 +1,48 @@
+"""Schedule cache keying and bound, and curve loading for dates between curves."""
+import logging
+
+import QuantLib as ql
+
+import gilt_builders
+from gilt_builders import clear_schedule_cache, get_bond_schedule, load_spot_curve_from_json
+
+
+def schedule_dates(schedule):
+    return [d.serialNumber() for d in schedule]
+
+
+def test_schedule_cache_is_keyed_by_calendar():
+    clear_schedule_cache()
+    # 25 Dec 2027 is a Saturday: the UK substitute holidays push the payment further than TARGET's
+    issue, maturity = ql.Date(25, 6, 2020), ql.Date(25, 12, 2027)
+    uk = get_bond_schedule(issue, maturity, ql.UnitedKingdom())
+    target = get_bond_schedule(issue, maturity, ql.TARGET())
+
+    assert get_bond_schedule(issue, maturity, ql.UnitedKingdom()) is uk
+    assert get_bond_schedule(issue, maturity) is uk
+    assert schedule_dates(uk)[-1] == ql.UnitedKingdom().adjust(maturity).serialNumber()
+    assert schedule_dates(target)[-1] == ql.TARGET().adjust(maturity).serialNumber()
+    assert schedule_dates(uk)[-1] != schedule_dates(target)[-1]
+
+
+def test_schedule_cache_is_bounded_lru(monkeypatch):
+    clear_schedule_cache()
+    monkeypatch.setattr(gilt_builders, "MAX_CACHED_SCHEDULES", 3)
+    issue = ql.Date(1, 3, 2020)
+    first = get_bond_schedule(issue, ql.Date(1, 3, 2030))
+    get_bond_schedule(issue, ql.Date(1, 3, 2031))
+    get_bond_schedule(issue, ql.Date(1, 3, 2032))
+    assert get_bond_schedule(issue, ql.Date(1, 3, 2030)) is first
+    get_bond_schedule(issue, ql.Date(1, 3, 2033))
+
+    assert len(gilt_builders._SCHEDULE_CACHE) == 3
+    # 2031 was the least recently used
+    assert get_bond_schedule(issue, ql.Date(1, 3, 2030)) is first
+    assert ('UK settlement', issue.serialNumber(), ql.Date(1, 3, 2031).serialNumber()) not in gilt_builders._SCHEDULE_CACHE
+
+
+def test_missing_curve_date_is_interpolated_with_a_warning(spot_path, caplog):
+    with caplog.at_level(logging.WARNING, logger="gilts"):
+        handle = load_spot_curve_from_json(spot_path, "2024-06-01")
+    assert handle.referenceDate() == ql.Date(1, 6, 2024)
+    assert "Pas de données pour 2024-06-01" in caplog.text
@@ -0,0 +1,67 @@
+"""InstrumentUniverse columns and its round trip back to gilts.json records."""
+import json
+import os
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from date_tables import NO_SERIAL, iso_serial
+from instrument_universe import InstrumentUniverse
+from storage import npz_path
+
+ODD_RECORDS = [
+    {'description': "Treasury Gilt 2030", 'isin': "GB0000000001", 'coupon': None, 'maturity_date': "2030-12-07",
+     'issue_date': None, 'coupon_schedule': [], 'next_coupon_date': None, 'amount': "3500"},
+    {'description': "4% Treasury Gilt 2031", 'isin': "GB0000000002", 'coupon': 4.0, 'maturity_date': "2031-10-22",
+     'issue_date': "2021-01-12", 'coupon_schedule': ["04-22"], 'next_coupon_date': "2024-10-22", 'amount': 3500.0},
+    {'description': "5% Treasury Gilt 2032", 'isin': "GB0000000003", 'coupon': 5.0, 'maturity_date': "2032-03-07",
+     'issue_date': "2022-03-07", 'coupon_schedule': ["03-07", "09-07"], 'next_coupon_date': None, 'amount': "n/a"},
+    {'description': "6% Treasury Gilt 2033", 'isin': "GB0000000004", 'coupon': 6.0, 'maturity_date': "2033-03-07",
+     'issue_date': "2023-03-07", 'coupon_schedule': ["03-07", "09-07"], 'next_coupon_date': None, 'amount': None},
+]
+
+
+def test_records_round_trip(gilts):
+    universe = InstrumentUniverse.from_records(gilts)
+    assert len(universe) == len(gilts)
+    assert list(universe) == gilts
+    assert universe[2:5] == gilts[2:5]
+
+
+@pytest.mark.parametrize("via_archive", [False, True])
+def test_amounts_are_kept_as_given(tmp_path, via_archive):
+    if via_archive:
+        path = tmp_path / "gilts.json"
+        path.write_text(json.dumps(ODD_RECORDS))
+        InstrumentUniverse.load(str(path))
+        # The second load reads the .npz written by the first
+        assert os.path.exists(npz_path(str(path)))
+        universe = InstrumentUniverse.load(str(path))
+    else:
+        universe = InstrumentUniverse.from_records(ODD_RECORDS)
+
+    assert list(universe) == ODD_RECORDS
+    assert [universe[i]['amount'] for i in range(4)] == ["3500", 3500.0, "n/a", None]
+    assert_array_equal(universe.amounts, [3500.0, 3500.0, np.nan, np.nan])
+
+
+def test_columns():
+    universe = InstrumentUniverse.from_records(ODD_RECORDS)
+
+    assert_array_equal(universe.frequencies, [2, 1, 2, 2])
+    assert np.isnan(universe.coupons[0])
+    assert universe.issue_serials[0] == NO_SERIAL
+    assert universe.maturity_serials[1] == iso_serial("2031-10-22")
+    assert universe.iso_dates('next_coupon') == [None, "2024-10-22", None, None]
+
+
+def test_index_and_take(gilts):
+    universe = InstrumentUniverse.from_records(gilts + gilts[:1])
+    isin = gilts[7]['isin']
+
+    assert universe.index[gilts[0]['isin']] == 0
+    assert_array_equal(universe.rows([isin, "GB_UNKNOWN"]), [7, -1])
+    assert universe.get(isin) == gilts[7]
+    assert universe.get("GB_UNKNOWN") is None
+    assert list(universe.take([7, 3])) == [gilts[7], gilts[3]]
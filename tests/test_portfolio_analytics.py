@@ -0,0 +1,46 @@
+"""PortfolioAnalytics and the analyse_bonds table against their constituents."""
+import pytest
+from numpy.testing import assert_allclose
+
+from analyse_bonds import HEADERS, portfolio_rows
+from instrument_universe import InstrumentUniverse
+from portfolio_analytics import PortfolioAnalytics
+
+
+@pytest.fixture
+def analytics(gilts, evaluation_date, curve_handle):
+    return PortfolioAnalytics(InstrumentUniverse.from_records(gilts), evaluation_date, curve_handle)
+
+
+def test_single_bond_portfolio_is_the_bond(gilts, analytics):
+    isin = gilts[10]['isin']
+    row = analytics.matrix.index[isin]
+    summary = analytics.analyse({'One': {isin: 100.0}})
+
+    assert summary['Nominal'].iloc[0] == 100.0
+    assert_allclose(summary['Clean Price'].iloc[0], analytics.clean_prices[row], rtol=0, atol=1e-10)
+    assert_allclose(summary['Dirty Value'].iloc[0], analytics.dirty_prices[row], rtol=0, atol=1e-10)
+
+
+def test_portfolio_values_add_up(gilts, analytics):
+    holdings = {gilts[5]['isin']: 1_000_000.0, gilts[20]['isin']: 250_000.0, 'GB00MISSING0': 10.0}
+    summary = analytics.analyse({'Core': holdings})
+    constituents = analytics.constituents(holdings)
+
+    assert summary['bonds'].iloc[0] == 2
+    assert summary['missing'].iloc[0] == 1
+    assert summary['Nominal'].iloc[0] == 1_250_000.0
+    assert_allclose(summary['Dirty Value'].iloc[0], constituents['Dirty Value'].sum(), rtol=1e-12)
+
+
+def test_aggregated_row_totals_the_amounts(gilts, analytics):
+    held = [gilts[3], gilts[8], gilts[30]]
+    rows = portfolio_rows(analytics, {'Core': {g['isin']: 1_000_000.0 for g in held}})
+
+    assert [r[1] for r in rows] == [g['isin'] for g in held] + ["AGGREGATED"]
+    aggregated = dict(zip(HEADERS, rows[-1]))
+    assert aggregated['Description'] == "Core (3 Gilts)"
+    assert_allclose(aggregated['Amount'], sum(float(g['amount']) for g in held))
+    assert_allclose(aggregated['Coupon (%)'], sum(g['coupon'] for g in held) / 3)
+    assert aggregated['Nominal'] == 3_000_000.0
+    assert aggregated['Maturity Date'] == max(g['maturity_date'] for g in held)
@@ -0,0 +1,143 @@
+"""PricingService caching and the HTTP request and error paths."""
+import json
+import os
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from calculate_bonds import price_and_analyze_bond_with_spot
+from pricing_service import PricingService, ServiceError, make_handler
+from tests.conftest import EVAL_DATE, gilts_path, synthetic_spot_list
+
+ISIN = "GB00BHBFH458"
+
+
+@pytest.fixture
+def service_paths(tmp_path, spot_path):
+    # Copies, so the service's .npz archives are written under tmp_path
+    gilts = tmp_path / "gilts.json"
+    spot = tmp_path / "SpotRates.json"
+    shutil.copy(gilts_path, gilts)
+    shutil.copy(spot_path, spot)
+    return str(gilts), str(spot)
+
+
+@pytest.fixture
+def service(service_paths):
+    return PricingService(*service_paths, max_cached_results=2)
+
+
+@pytest.fixture
+def server(service):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(url, body=None):
+    data = None if body is None else json.dumps(body).encode('utf-8')
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_price_matches_scalar_path_and_is_cached(service, curve_handle, evaluation_date):
+    result = service.price(service.gilts.get(ISIN), EVAL_DATE)
+    expected = price_and_analyze_bond_with_spot(service.gilts.get(ISIN), evaluation_date, curve_handle)
+
+    assert result['Clean Price Calculated'] == expected['Clean Price Calculated']
+    assert service.price(service.gilts.get(ISIN), EVAL_DATE) is result
+
+
+def test_result_cache_is_lru(service):
+    isins = service.gilts.isins.tolist()[1:4]
+    first = service.price(service.gilts.get(isins[0]), EVAL_DATE)
+    service.price(service.gilts.get(isins[1]), EVAL_DATE)
+    service.price(service.gilts.get(isins[0]), EVAL_DATE)
+    service.price(service.gilts.get(isins[2]), EVAL_DATE)
+
+    assert service.price(service.gilts.get(isins[0]), EVAL_DATE) is first
+    assert len(service._results) == 2
+    assert (isins[1],) not in {key[:1] for key in service._results}
+
+
+def test_spot_rates_change_reloads_curves_and_clears_results(service, service_paths):
+    _, spot = service_paths
+    before = service.price(service.gilts.get(ISIN), EVAL_DATE)
+
+    with open(spot, 'w') as f:
+        json.dump({EVAL_DATE: synthetic_spot_list(5.0)}, f)
+    mtime = os.path.getmtime(spot) + 10
+    os.utime(spot, (mtime, mtime))
+
+    after = service.price(service.gilts.get(ISIN), EVAL_DATE)
+    assert after is not before
+    assert after['Clean Price Calculated'] < before['Clean Price Calculated']
+
+
+def test_explicit_zero_coupon_is_not_replaced_by_the_gilt(service):
+    gilt = service.gilts.get(ISIN)
+    bond = service.bond_from_request({'isin': ISIN, 'coupon': 0, 'issue_date': gilt['issue_date'],
+                                      'maturity_date': gilt['maturity_date']})
+    assert bond['coupon'] == 0.0
+    assert service.bond_from_request({'isin': ISIN}) == gilt
+
+    with pytest.raises(ServiceError) as e:
+        service.bond_from_request({'isin': ISIN, 'coupon': 0})
+    assert e.value.status == 400
+
+
+def test_http_routes(server, service):
+    status, health = request(f"{server}/health")
+    assert status == 200 and health['latest_curve_date'] == EVAL_DATE
+    assert request(f"{server}/gilts")[1] == list(service.gilts)
+
+    status, price = request(f"{server}/price?isin={ISIN}&eval_date={EVAL_DATE}")
+    assert status == 200 and price['cleanPrice'] == price['Clean Price Calculated']
+
+    status, analytics = request(f"{server}/analytics?isin={ISIN}&shifts=-0.01,0,0.01")
+    assert status == 200
+    assert [s['shift'] for s in analytics['Sensitivities']] == [-0.01, 0.0, 0.01]
+    status, analytics = request(f"{server}/analytics", {'isin': ISIN, 'shifts': [0.005]})
+    assert status == 200 and len(analytics['Sensitivities']) == 1
+
+    status, cashflows = request(f"{server}/cashflows?isin={ISIN}")
+    assert status == 200 and cashflows['eval_date'] == EVAL_DATE and cashflows['Cashflows']
+
+
+@pytest.mark.parametrize("path, status", [
+    (f"/analytics?isin={ISIN}&shifts=abc", 400),
+    (f"/price?isin={ISIN}&eval_date=2024-13-45", 400),
+    (f"/price?isin={ISIN}&eval_date=03/06/2024", 400),
+    ("/price", 400),
+    ("/price?isin=GB00UNKNOWN0", 404),
+    ("/nowhere", 404),
+    (f"/price?isin={ISIN}&eval_date=1990-01-02", 422),
+])
+def test_http_errors(server, path, status):
+    code, body = request(server + path)
+    assert code == status
+    assert body['Error']
+
+
+def test_empty_curve_store_returns_503(service_paths):
+    gilts, spot = service_paths
+    with open(spot, 'w') as f:
+        json.dump({}, f)
+    service = PricingService(gilts, spot)
+
+    with pytest.raises(ServiceError) as e:
+        service.default_eval_date()
+    assert e.value.status == 503
+    with pytest.raises(ServiceError) as e:
+        service.price(service.gilts.get(ISIN))
+    assert e.value.status == 503
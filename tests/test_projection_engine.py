@@ -0,0 +1,37 @@
+"""project_bond against QuantLib's fixed-yield bond functions, date by date."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from gilt_builders import build_fixed_rate_bond
+from projection_engine import project_bond
+
+YIELD = 0.045
+
+
+def test_projection_matches_quantlib_loop(gilts, evaluation_date):
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    dates = [evaluation_date + 30 * i for i in range(200)]
+
+    checked = 0
+    for gilt in gilts[::4]:
+        bond, error = build_fixed_rate_bond(gilt, evaluation_date, calendar, day_count)
+        if error:
+            continue
+        projected = project_bond(bond, dates, YIELD)
+
+        for i, date in enumerate(dates):
+            settlement = calendar.advance(date, 1, ql.Days)
+            assert projected['settlement_serials'][i] == settlement.serialNumber()
+            if settlement >= bond.maturityDate():
+                assert np.isnan(projected['clean_price'][i])
+                continue
+            clean = bond.cleanPrice(YIELD, day_count, ql.Compounded, ql.Semiannual, settlement)
+            duration = ql.BondFunctions.duration(bond, YIELD, day_count, ql.Compounded, ql.Semiannual,
+                                                 ql.Duration.Modified, settlement)
+            assert_allclose(projected['clean_price'][i], clean, rtol=0, atol=2e-13 * 100)
+            assert_allclose(projected['accrued'][i], bond.accruedAmount(settlement), rtol=0, atol=1e-12)
+            assert_allclose(projected['modified_duration'][i], duration, rtol=1e-12)
+            checked += 1
+    assert checked > 100
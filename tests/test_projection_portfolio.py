@@ -0,0 +1,85 @@
+"""Multi-portfolio projection through the WeightMatrix against a per-position loop."""
+import numpy as np
+import QuantLib as ql
+import pytest
+from numpy.testing import assert_allclose
+
+from projection_portfolio import (PortfolioProjector, WeightMatrix, generate_projection_dates,
+                                  parse_date, project_portfolios, quantlib_date)
+from tests.conftest import EVAL_DATE
+
+
+def holding(gilt, implied_yield, nominal=None):
+    bond = {'isin': gilt['isin'], 'coupon': gilt['coupon'], 'maturity_date': gilt['maturity_date'],
+            'issue_date': gilt['issue_date'], 'implied_yield': implied_yield,
+            'dirty_price': 90.0 + 10 * implied_yield}
+    if nominal is not None:
+        bond['nominal'] = nominal
+    return bond
+
+
+def loop_projection(bonds, projection_dates):
+    """One portfolio, one bond at a time, as project() did before the weight matrix."""
+    projector = PortfolioProjector(bonds)
+    nominals = [float(b.get('nominal', 100.0)) / 100.0 for b in bonds]
+    saved = ql.Settings.instance().evaluationDate
+    projections = []
+    try:
+        for proj_date in projection_dates:
+            proj_dt = parse_date(proj_date)
+            ql.Settings.instance().evaluationDate = quantlib_date(proj_dt)
+            total_clean = total_duration = total_weight = 0.0
+            for position, nominal in zip(projector.positions, nominals):
+                if proj_dt > position['maturity_date']:
+                    continue
+                weight = position['weight'] * nominal
+                total_clean += position['bond'].cleanPrice() * weight
+                total_duration += ql.BondFunctions.duration(
+                    position['bond'], position['yield_quote'].value(), projector.day_count,
+                    ql.Compounded, ql.Semiannual, ql.Duration.Modified) * weight
+                total_weight += weight
+            if total_weight > 0:
+                projections.append((proj_date, total_clean / total_weight, total_duration / total_weight))
+    finally:
+        ql.Settings.instance().evaluationDate = saved
+    return projections
+
+
+def test_portfolios_match_the_loop(gilts):
+    # gilts[0] matures within the projection window; gilts[4] is held at two yields
+    portfolios = {
+        'A': [holding(g, 0.04) for g in gilts[0:6]],
+        'B': [holding(g, 0.04, nominal=250.0 * (k + 1)) for k, g in enumerate(gilts[4:10])],
+        'C': [holding(gilts[4], 0.05, nominal=1000.0), holding(gilts[20], 0.045)],
+    }
+    dates = generate_projection_dates(EVAL_DATE, 'trimestrielle')
+    projected = project_portfolios(portfolios, dates)
+
+    assert list(projected) == list(portfolios)
+    for name, bonds in portfolios.items():
+        expected = loop_projection(bonds, dates)
+        rows = projected[name]
+        assert [r["Projection Date"] for r in rows] == [d for d, _, _ in expected]
+        assert_allclose([r["Clean Price Projected"] for r in rows], [c for _, c, _ in expected], rtol=0, atol=2e-6)
+        assert_allclose([r["Modified Duration Projected"] for r in rows], [m for _, _, m in expected],
+                        rtol=0, atol=2e-6)
+
+
+def test_weighted_sums_match_the_dense_product():
+    rng = np.random.default_rng(7)
+    holdings = [[(0, 1.0), (3, 2.5)], [], [(1, 0.5), (2, 1.5), (3, 1.0), (1, 2.0)]]
+    weights = WeightMatrix.from_holdings(holdings, 4)
+    grid = rng.normal(size=(5, 4))
+
+    dense = np.zeros((4, 3))
+    for p, portfolio in enumerate(holdings):
+        for j, w in portfolio:
+            dense[j, p] += w
+    assert_allclose(weights.weighted_sums(grid), grid @ dense, rtol=1e-14)
+
+
+@pytest.mark.parametrize("frequency, n_dates", [('mensuelle', 60), ('trimestrielle', 20), ('annuelle', 5),
+                                                ('cinq_ans', 1), ('hebdomadaire', 0)])
+def test_projection_dates(frequency, n_dates):
+    dates = generate_projection_dates(EVAL_DATE, frequency)
+    assert len(dates) == n_dates
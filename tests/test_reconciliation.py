@@ -0,0 +1,29 @@
+"""Vectorized Z-spreads against QuantLib's BondFunctions.zSpread."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from calculate_bonds import price_bonds_batch
+from tests.conftest import EVAL_DATE
+from gilt_builders import build_fixed_rate_bond
+from reconciliation import reconcile
+
+
+def test_z_spreads_match_quantlib(gilts, evaluation_date, curve_handle):
+    results = price_bonds_batch(gilts, evaluation_date, curve_handle)
+    rng = np.random.default_rng(1)
+    closes = {r['isin']: r['Clean Price Calculated'] + rng.normal(0, 0.5) for r in results if 'Error' not in r}
+
+    report = reconcile(gilts, EVAL_DATE, closes, curve_handle, results).set_index('isin')
+
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    settlement = calendar.advance(evaluation_date, 1, ql.Days)
+    assert len(report) == len(closes)
+    for isin, close in closes.items():
+        gilt = next(g for g in gilts if g['isin'] == isin)
+        bond, _ = build_fixed_rate_bond(gilt, evaluation_date, calendar, day_count)
+        expected = ql.BondFunctions.zSpread(bond, close, curve_handle.currentLink(), day_count,
+                                            ql.Continuous, ql.NoFrequency, settlement)
+        # zSpread's default accuracy is 1e-10, i.e. 1e-6 bp
+        assert_allclose(report.loc[isin, 'Z-Spread (bp)'], expected * 10000, rtol=0, atol=1e-6)
@@ -0,0 +1,84 @@
+"""ResultCache bookkeeping and incremental repricing through it."""
+import copy
+
+from calculate_bonds import price_bonds_incremental
+from gilt_builders import build_spot_curve
+from result_cache import ResultCache, curve_fingerprint
+from tests.conftest import EVAL_DATE, synthetic_spot_list
+
+
+def test_get_requires_the_same_bond_record(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.json"))
+    result = {'ISIN': "GB1", 'Clean Price Calculated': 99.5}
+    cache.put("GB1", EVAL_DATE, "curve", "bond", result)
+    result['Clean Price Calculated'] = 0.0
+
+    assert cache.get("GB1", EVAL_DATE, "curve", "bond") == {'ISIN': "GB1", 'Clean Price Calculated': 99.5}
+    assert cache.get("GB1", EVAL_DATE, "curve", "corrected bond") is None
+    assert cache.get("GB1", EVAL_DATE, "other curve", "bond") is None
+    assert cache.get("GB1", "2024-05-31", "curve", "bond") is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.json"), max_entries=2)
+    cache.put("GB1", EVAL_DATE, "curve", "bond", {'n': 1})
+    cache.put("GB2", EVAL_DATE, "curve", "bond", {'n': 2})
+    cache.get("GB1", EVAL_DATE, "curve", "bond")
+    cache.put("GB3", EVAL_DATE, "curve", "bond", {'n': 3})
+
+    assert len(cache) == 2
+    assert cache.get("GB2", EVAL_DATE, "curve", "bond") is None
+    assert cache.get("GB1", EVAL_DATE, "curve", "bond") == {'n': 1}
+    assert cache.get("GB3", EVAL_DATE, "curve", "bond") == {'n': 3}
+
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "Cache" / "cache.json")
+    cache = ResultCache(path, max_entries=2)
+    cache.save()
+    assert not (tmp_path / "Cache").exists()
+
+    cache.put("GB1", EVAL_DATE, "curve", "bond", {'n': 1})
+    cache.put("GB2", EVAL_DATE, "curve", "bond", {'n': 2})
+    cache.set_meta('outputs', "signature")
+    cache.save()
+
+    reloaded = ResultCache(path, max_entries=2)
+    assert reloaded.meta == {'outputs': "signature"}
+    reloaded.put("GB3", EVAL_DATE, "curve", "bond", {'n': 3})
+    # Reloaded in LRU order: GB1 is the oldest
+    assert reloaded.get("GB1", EVAL_DATE, "curve", "bond") is None
+    assert reloaded.get("GB2", EVAL_DATE, "curve", "bond") == {'n': 2}
+
+
+def test_curve_fingerprint(evaluation_date, curve_handle):
+    same = build_spot_curve(evaluation_date, synthetic_spot_list())
+    shifted = build_spot_curve(evaluation_date, synthetic_spot_list(4.01))
+    later = build_spot_curve(evaluation_date + 1, synthetic_spot_list())
+
+    assert curve_fingerprint(same) == curve_fingerprint(curve_handle)
+    assert curve_fingerprint(shifted) != curve_fingerprint(curve_handle)
+    assert curve_fingerprint(later) != curve_fingerprint(curve_handle)
+
+
+def test_incremental_repricing(tmp_path, gilts, evaluation_date, curve_handle):
+    universe = copy.deepcopy(gilts[:12])
+    isins = [g['isin'] for g in universe]
+    cache = ResultCache(str(tmp_path / "cache.json"))
+
+    first, repriced, signature = price_bonds_incremental(universe, evaluation_date, curve_handle, cache)
+    assert repriced == isins
+
+    again, repriced, same_signature = price_bonds_incremental(universe, evaluation_date, curve_handle, cache)
+    assert repriced == []
+    assert again == first
+    assert same_signature == signature
+
+    universe[4]['amount'] = "1000.0"
+    _, repriced, corrected_signature = price_bonds_incremental(universe, evaluation_date, curve_handle, cache)
+    assert repriced == [isins[4]]
+    assert corrected_signature != signature
+
+    shifted = build_spot_curve(evaluation_date, synthetic_spot_list(4.2))
+    _, repriced, _ = price_bonds_incremental(universe, evaluation_date, shifted, cache)
+    assert repriced == isins
@@ -0,0 +1,30 @@
+"""ScenarioEngine against bonds repriced on a rebuilt, shifted ZeroCurve."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from tests.conftest import EVAL_DATE
+from gilt_builders import build_fixed_rate_bond, build_spot_curve
+from scenarios import ScenarioEngine, standard_scenarios
+
+
+def test_clean_prices_match_rebuilt_curves(gilts, evaluation_date, curve_store):
+    engine = ScenarioEngine.from_universe(gilts, EVAL_DATE, curve_store)
+    _, shocks = standard_scenarios(engine.years, 100)
+    rng = np.random.default_rng(7)
+    shocks = np.vstack([shocks, rng.normal(0, 0.002, (2, len(engine.years)))])
+    prices = engine.clean_prices(shocks)
+
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    spot_list = curve_store.spot_list(EVAL_DATE)
+    years = list(engine.years)
+    for shift, row in zip(shocks, prices):
+        shifted = [dict(e, rate=e['rate'] + 100 * shift[years.index(float(e['year']))]) for e in spot_list]
+        quantlib_engine = ql.DiscountingBondEngine(build_spot_curve(evaluation_date, shifted, verbose=False))
+        for gilt in gilts:
+            if gilt['isin'] not in engine.matrix.index:
+                continue
+            bond, _ = build_fixed_rate_bond(gilt, evaluation_date, calendar, day_count)
+            bond.setPricingEngine(quantlib_engine)
+            assert_allclose(row[engine.matrix.index[gilt['isin']]], bond.cleanPrice(), rtol=0, atol=7e-14 * 100)
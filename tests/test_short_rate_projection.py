@@ -0,0 +1,67 @@
+"""Short-rate models: closed-form bond prices against QuantLib's discountBond, and their fallbacks."""
+import logging
+
+import numpy as np
+import pytest
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from short_rate_projection import (DEFAULT_MEAN_REVERSION, DEFAULT_VOLATILITY, HullWhiteModel, ShortRateModel,
+                                   VasicekModel, estimate_dynamics)
+from tests.conftest import EVAL_DATE
+
+A, SIGMA = 0.05, 0.012
+REFERENCE = ql.Date(3, 6, 2024)
+FACTORS = np.array([-0.01, 0.0, 0.02])
+
+
+@pytest.fixture
+def discount_curve():
+    years = range(0, 41, 2)
+    dates = [REFERENCE + ql.Period(y, ql.Years) for y in years]
+    discounts = [np.exp(-0.04 * y - 0.0003 * y * y) for y in years]
+    curve = ql.YieldTermStructureHandle(ql.DiscountCurve(dates, discounts, ql.Actual365Fixed()))
+    curve.enableExtrapolation()
+    return curve
+
+
+def horizon():
+    t_serial = (REFERENCE + 700).serialNumber()
+    maturities = np.array([(REFERENCE + d).serialNumber() for d in (800, 2000, 9000)])
+    return t_serial, maturities, 700 / 365, (maturities - REFERENCE.serialNumber()) / 365
+
+
+def test_hull_white_matches_quantlib(discount_curve):
+    model = HullWhiteModel(A, SIGMA, discount_curve, REFERENCE)
+    t_serial, maturities, t, taus = horizon()
+
+    # QuantLib's short rate is x + alpha(t)
+    forward = discount_curve.forwardRate(t, t, ql.Continuous, ql.NoFrequency).rate()
+    alpha = forward + SIGMA ** 2 / (2 * A ** 2) * (1 - np.exp(-A * t)) ** 2
+    quantlib = ql.HullWhite(discount_curve, A, SIGMA)
+    expected = [[quantlib.discountBond(t, T, x + alpha) for T in taus] for x in FACTORS]
+
+    assert_allclose(np.exp(model.log_bond_prices(t_serial, maturities, FACTORS)), expected, rtol=0, atol=1e-12)
+
+
+def test_vasicek_matches_quantlib():
+    b, r0 = 0.045, 0.04
+    model = VasicekModel(A, SIGMA, b, r0, REFERENCE.serialNumber())
+    t_serial, maturities, t, taus = horizon()
+
+    rates = b + (r0 - b) * np.exp(-A * t) + FACTORS
+    quantlib = ql.Vasicek(r0, A, b, SIGMA)
+    expected = [[quantlib.discountBond(t, T, r) for T in taus] for r in rates]
+
+    assert_allclose(np.exp(model.log_bond_prices(t_serial, maturities, FACTORS)), expected, rtol=0, atol=1e-12)
+
+
+def test_short_rate_model_is_abstract():
+    with pytest.raises(TypeError):
+        ShortRateModel(A, SIGMA, REFERENCE.serialNumber())
+
+
+def test_short_history_falls_back_to_defaults_with_a_warning(curve_store, caplog):
+    with caplog.at_level(logging.WARNING, logger="gilts"):
+        assert estimate_dynamics(curve_store, EVAL_DATE) == (DEFAULT_MEAN_REVERSION, DEFAULT_VOLATILITY)
+    assert "Historique de courbes trop court (2 dates)" in caplog.text
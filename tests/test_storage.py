@@ -0,0 +1,74 @@
+"""Columnar .npz storage: round-trips, staleness check and atomic writes."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import storage
+from tests.conftest import synthetic_spot_list
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def age(path, seconds=10):
+    """Move a file's mtime into the past so a later write is strictly newer."""
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_instruments_round_trip(tmp_path, gilts):
+    json_path = write_json(tmp_path / "gilts.json", gilts)
+
+    assert storage.load_instruments(json_path) == gilts
+    assert os.path.exists(storage.npz_path(json_path))
+    # Second read comes from the archive
+    assert storage.load_instruments(json_path) == gilts
+
+
+def test_spot_rates_and_cashflows_round_trip(tmp_path):
+    spot = {"2024-05-31": synthetic_spot_list(4.05), "2024-06-03": synthetic_spot_list()[:-3]}
+    cashflows = {"GB00A": [{'Date': '2025-01-22', 'Amount': 2.125}, {'Date': '2025-07-22', 'Amount': 102.125}],
+                 "GB00B": []}
+
+    assert storage.load_spot_rates(write_json(tmp_path / "SpotRates.json", spot)) == spot
+    assert storage.load_cashflows(write_json(tmp_path / "cashflows.json", cashflows)) == cashflows
+
+
+def test_stale_archive_is_rebuilt(tmp_path):
+    json_path = write_json(tmp_path / "SpotRates.json", {"2024-06-03": synthetic_spot_list()})
+    storage.load_spot_rates(json_path)
+    age(storage.npz_path(json_path))
+
+    updated = {"2024-06-03": synthetic_spot_list(5.0)}
+    write_json(tmp_path / "SpotRates.json", updated)
+
+    assert storage.load_spot_rates(json_path) == updated
+
+
+def test_archive_without_json_is_used(tmp_path):
+    spot = {"2024-06-03": synthetic_spot_list()}
+    json_path = write_json(tmp_path / "SpotRates.json", spot)
+    storage.load_spot_rates(json_path)
+    os.remove(json_path)
+
+    assert storage.load_spot_rates(json_path) == spot
+
+
+def test_failed_save_keeps_previous_archive(tmp_path, monkeypatch):
+    path = str(tmp_path / "cashflows.npz")
+    storage.save_cashflows({"GB00A": [{'Date': '2025-01-22', 'Amount': 1.0}]}, path)
+
+    def interrupted(f, **columns):
+        f.write(b"PK\x03\x04 partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez", interrupted)
+    with pytest.raises(OSError):
+        storage.save_cashflows({"GB00B": []}, path)
+
+    assert os.listdir(tmp_path) == ["cashflows.npz"]
+    assert storage.columns_to_cashflows(storage._load(path)) == {"GB00A": [{'Date': '2025-01-22', 'Amount': 1.0}]}
@@ -0,0 +1,53 @@
+"""The vectorized yield solver and yield metrics against QuantLib's bond functions."""
+import numpy as np
+import QuantLib as ql
+from numpy.testing import assert_allclose
+
+from date_tables import settlement_date as uk_settlement_date
+from gilt_builders import build_fixed_rate_bond
+from yield_solver import solver_inputs, solve_yields, yield_metrics
+
+
+def priced_bonds(gilts, eval_date_ql, curve_handle):
+    calendar = ql.UnitedKingdom()
+    day_count = ql.ActualActual(ql.ActualActual.ISMA)
+    engine = ql.DiscountingBondEngine(curve_handle)
+    bonds = []
+    for gilt in gilts:
+        bond, error = build_fixed_rate_bond(gilt, eval_date_ql, calendar, day_count)
+        if error is None:
+            bond.setPricingEngine(engine)
+            bonds.append(bond)
+    return bonds, day_count
+
+
+def test_solved_yields_reprice_to_quantlib_clean_prices(gilts, evaluation_date, curve_handle):
+    bonds, day_count = priced_bonds(gilts, evaluation_date, curve_handle)
+    settlement = uk_settlement_date(evaluation_date)
+    times, amounts, accrued = solver_inputs(bonds, settlement, day_count)
+    clean = np.array([bond.cleanPrice() for bond in bonds])
+
+    yields, _ = solve_yields(times, amounts, accrued, clean)
+
+    repriced = [bond.cleanPrice(y, day_count, ql.Compounded, ql.Semiannual, settlement)
+                for bond, y in zip(bonds, yields)]
+    assert_allclose(repriced, clean, rtol=0, atol=1e-9)
+
+
+def test_yield_metrics_match_bond_functions(gilts, evaluation_date, curve_handle):
+    bonds, day_count = priced_bonds(gilts, evaluation_date, curve_handle)
+    settlement = uk_settlement_date(evaluation_date)
+    times, amounts, accrued = solver_inputs(bonds, settlement, day_count)
+    yields = np.linspace(0.01, 0.07, len(bonds))
+
+    metrics = yield_metrics(times, amounts, accrued, yields)
+
+    args = [(bond, ql.InterestRate(y, day_count, ql.Compounded, ql.Semiannual)) for bond, y in zip(bonds, yields)]
+    duration = [ql.BondFunctions.duration(b, r, ql.Duration.Modified, settlement) for b, r in args]
+    convexity = [ql.BondFunctions.convexity(b, r, settlement) for b, r in args]
+    clean = [b.cleanPrice(y, day_count, ql.Compounded, ql.Semiannual, settlement) for b, y in zip(bonds, yields)]
+    bumped = [b.cleanPrice(y - 0.0001, day_count, ql.Compounded, ql.Semiannual, settlement)
+              for b, y in zip(bonds, yields)]
+    assert_allclose(metrics['modified_duration'], duration, rtol=1e-12)
+    assert_allclose(metrics['convexity'], convexity, rtol=1e-12)
+    assert_allclose(metrics['pv01'], np.subtract(bumped, clean), rtol=1e-9, atol=1e-12)
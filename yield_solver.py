@@ -0,0 +1,125 @@
+"""
+Vectorized yield-to-maturity / price-from-yield for a whole universe.
+
+Bonds are described by padded (bonds x cashflows) matrices of discounting
+times and amounts (see bond_cashflows), yields are compounded `frequency`
+times a year, as in QuantLib's bondYield(..., ql.Compounded, ql.Semiannual).
+"""
+import json
+import os
+
+import numpy as np
+
+from bond_cashflows import remaining_cashflows, pad_cashflows
+
+
+def solver_inputs(bonds, settlement_date, day_count, extracted=None):
+    """
+    Padded times/amounts and accrued amounts for a list of QuantLib bonds.
+    extracted: the bonds' remaining_cashflows when the caller already has them.
+    """
+    if extracted is None:
+        extracted = [remaining_cashflows(bond, settlement_date, day_count) for bond in bonds]
+    times, amounts = pad_cashflows([e[1] for e in extracted], [e[2] for e in extracted])
+    accrued = np.array([bond.accruedAmount(settlement_date) for bond in bonds], dtype=float)
+    return times, amounts, accrued
+
+
+def dirty_price_from_yield(times, amounts, yields, frequency=2):
+    y = np.asarray(yields, dtype=float)[:, None]
+    return (amounts * (1 + y / frequency) ** (-frequency * times)).sum(axis=1)
+
+
+def clean_price_from_yield(times, amounts, accrued, yields, frequency=2):
+    return dirty_price_from_yield(times, amounts, yields, frequency) - accrued
+
+
+def solve_yields(times, amounts, accrued, clean_prices, initial_yields=None, frequency=2,
+                 tolerance=1e-12, max_iterations=50):
+    """
+    Newton iterations on all bonds at once with the analytic price derivative.
+    initial_yields (e.g. the previous day's yields) warm-start the solve; bonds
+    without one start at 5%. Returns (yields, iterations); bonds that fail to
+    converge come back as NaN.
+    """
+    target = np.asarray(clean_prices, dtype=float) + accrued
+    y = np.full(len(target), 0.05)
+    if initial_yields is not None:
+        initial_yields = np.asarray(initial_yields, dtype=float)
+        y = np.where(np.isfinite(initial_yields), initial_yields, y)
+
+    active = np.isfinite(target) & (amounts != 0).any(axis=1)
+    converged = ~active
+    iterations = 0
+
+    for iterations in range(1, max_iterations + 1):
+        idx = np.flatnonzero(~converged)
+        if idx.size == 0:
+            iterations -= 1
+            break
+        t, a, yi = times[idx], amounts[idx], y[idx, None]
+        base = 1 + yi / frequency
+        flows = a * base ** (-frequency * t)
+        price = flows.sum(axis=1)
+        derivative = -(flows * t).sum(axis=1) / base[:, 0]
+
+        step = (price - target[idx]) / derivative
+        y_new = y[idx] - step
+        # Stay inside the domain of (1 + y/f)^(-f t)
+        y_new = np.where(y_new <= -frequency, (y[idx] - frequency) / 2, y_new)
+        y[idx] = y_new
+        converged[idx] = np.abs(step) < tolerance
+
+    y[~converged | ~active] = np.nan
+    return y, iterations
+
+
+def yield_metrics(times, amounts, accrued, yields, frequency=2):
+    """
+    Clean/dirty price, modified duration, convexity and PV01 (price change for
+    a 1bp fall in yield) at the given yields, with QuantLib's conventions for
+    compounded yields.
+    """
+    y = np.asarray(yields, dtype=float)[:, None]
+    base = 1 + y / frequency
+    flows = amounts * base ** (-frequency * times)
+    dirty = flows.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = (flows * times).sum(axis=1) / base[:, 0] / dirty
+        convexity = (flows * times * (frequency * times + 1)).sum(axis=1) / (frequency * base[:, 0] ** 2) / dirty
+    clean = dirty - accrued
+    pv01 = clean_price_from_yield(times, amounts, accrued, y[:, 0] - 0.0001, frequency) - clean
+    return {
+        'clean_price': clean,
+        'dirty_price': dirty,
+        'modified_duration': duration,
+        'convexity': convexity,
+        'pv01': pv01,
+    }
+
+
+# --- Warm starts -----------------------------------------------------------
+
+def load_warm_start(path, eval_date_str, isins):
+    """Latest stored yields strictly before eval_date_str, aligned on isins (NaN when unknown)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        history = json.load(f)
+    previous = [d for d in history if d < eval_date_str]
+    if not previous:
+        return None
+    stored = history[max(previous)]
+    return np.array([stored.get(isin, np.nan) for isin in isins], dtype=float)
+
+
+def save_yields(path, eval_date_str, isins, yields, keep_dates=30):
+    history = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            history = json.load(f)
+    history[eval_date_str] = {isin: float(y) for isin, y in zip(isins, yields) if np.isfinite(y)}
+    history = {d: history[d] for d in sorted(history)[-keep_dates:]}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history, f)